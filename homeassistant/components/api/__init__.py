@@ -34,7 +34,6 @@ from homeassistant.const import (
 import homeassistant.core as ha
 from homeassistant.exceptions import ServiceNotFound, TemplateError, Unauthorized
 from homeassistant.helpers import template
-from homeassistant.helpers.json import JSONEncoder
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.helpers.state import AsyncTrackStates
 
@@ -114,7 +113,11 @@ class APIEventStream(HomeAssistantView):
             if event.event_type == EVENT_HOMEASSISTANT_STOP:
                 data = stop_obj
             else:
-                data = json.dumps(event, cls=JSONEncoder)
+                try:
+                    data = event.as_json()
+                except (ValueError, TypeError) as err:
+                    _LOGGER.error("Unable to serialize to JSON: %s\n%s", err, event)
+                    return
 
             await to_write.put(data)
 
@@ -204,7 +207,11 @@ class APIStatesView(HomeAssistantView):
             for state in request.app["hass"].states.async_all()
             if entity_perm(state.entity_id, "read")
         ]
-        return self.json(states)
+        try:
+            body = "[{}]".format(", ".join(state.as_json() for state in states))
+        except (ValueError, TypeError):
+            return self.json(states)
+        return self.json_encoded(body)
 
 
 class APIEntityStateView(HomeAssistantView):
@@ -222,7 +229,10 @@ class APIEntityStateView(HomeAssistantView):
 
         state = request.app["hass"].states.get(entity_id)
         if state:
-            return self.json(state)
+            try:
+                return self.json_encoded(state.as_json())
+            except (ValueError, TypeError):
+                return self.json(state)
         return self.json_message("Entity not found.", HTTP_NOT_FOUND)
 
     async def post(self, request, entity_id):
@@ -8,9 +8,11 @@ from numbers import Number
 import statistics
 from typing import Optional
 
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
 import voluptuous as vol
 
-from homeassistant.components import history
+from homeassistant.components import history, recorder
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
     ATTR_ENTITY_ID,
@@ -58,6 +60,9 @@ DEFAULT_PRECISION = 2
 DEFAULT_FILTER_RADIUS = 2.0
 DEFAULT_FILTER_TIME_CONSTANT = 10
 
+# Maximum number of values copied at once to compute moving medians
+MEDIAN_CHUNK_SIZE = 2 ** 20
+
 NAME_TEMPLATE = "{} filter"
 ICON = "mdi:chart-line-variant"
 
@@ -177,7 +182,7 @@ class SensorFilter(Entity):
         """Register callbacks."""
 
         @callback
-        def filter_sensor_state_listener(entity, old_state, new_state, update_ha=True):
+        def filter_sensor_state_listener(entity, old_state, new_state):
             """Handle device state changes."""
             if new_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]:
                 return
@@ -211,8 +216,7 @@ class SensorFilter(Entity):
                     ATTR_UNIT_OF_MEASUREMENT
                 )
 
-            if update_ha:
-                self.async_schedule_update_ha_state()
+            self.async_schedule_update_ha_state()
 
         if "recorder" in self.hass.config.components:
             history_list = []
@@ -234,7 +238,9 @@ class SensorFilter(Entity):
 
             # Retrieve the largest window_size of each type
             if largest_window_items > 0:
-                filter_history = await self.hass.async_add_job(
+                filter_history = await recorder.get_instance(
+                    self.hass
+                ).async_add_executor_job(
                     partial(
                         history.get_last_state_changes,
                         self.hass,
@@ -246,7 +252,9 @@ class SensorFilter(Entity):
                     history_list.extend(filter_history[self._entity])
             if largest_window_time > timedelta(seconds=0):
                 start = dt_util.utcnow() - largest_window_time
-                filter_history = await self.hass.async_add_job(
+                filter_history = await recorder.get_instance(
+                    self.hass
+                ).async_add_executor_job(
                     partial(
                         history.state_changes_during_period,
                         self.hass,
@@ -255,11 +263,14 @@ class SensorFilter(Entity):
                     )
                 )
                 if self._entity in filter_history:
+                    loaded = {
+                        (state.last_updated, state.state) for state in history_list
+                    }
                     history_list.extend(
                         [
                             state
                             for state in filter_history[self._entity]
-                            if state not in history_list
+                            if (state.last_updated, state.state) not in loaded
                         ]
                     )
 
@@ -270,14 +281,59 @@ class SensorFilter(Entity):
                 [(s.state, s.last_updated) for s in history_list],
             )
 
-            # Replay history through the filter chain
-            prev_state = None
-            for state in history_list:
-                filter_sensor_state_listener(self._entity, prev_state, state, False)
-                prev_state = state
+            self._replay_history(history_list)
 
         async_track_state_change(self.hass, self._entity, filter_sensor_state_listener)
 
+    def _replay_history(self, history_list):
+        """Run the recorded states through the filter chain as one batch."""
+        states = []
+        values = []
+        for state in history_list:
+            if state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]:
+                continue
+            try:
+                values.append(float(state.state))
+            except ValueError:
+                _LOGGER.error("Could not convert state: %s to number", state.state)
+                continue
+            states.append(state)
+
+        timestamps = [state.last_updated for state in states]
+        values = np.array(values, dtype=float)
+        indexes = np.arange(len(states))
+
+        for filt in self._filters:
+            if not indexes.size:
+                return
+            keep, values = filt.filter_states(timestamps, values)
+            _LOGGER.debug(
+                "%s(%s) kept %d of %d states",
+                filt.name,
+                self._entity,
+                np.count_nonzero(keep),
+                keep.size,
+            )
+            timestamps = [
+                timestamp for timestamp, kept in zip(timestamps, keep) if kept
+            ]
+            values = values[keep]
+            indexes = indexes[keep]
+
+        if not indexes.size:
+            return
+
+        self._state = float(values[-1])
+
+        first_state = states[indexes[0]]
+        if self._icon is None:
+            self._icon = first_state.attributes.get(ATTR_ICON, ICON)
+
+        if self._unit_of_measurement is None:
+            self._unit_of_measurement = first_state.attributes.get(
+                ATTR_UNIT_OF_MEASUREMENT
+            )
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -321,6 +377,14 @@ class FilterState:
         except ValueError:
             self.state = state.state
 
+    @classmethod
+    def from_value(cls, timestamp, value):
+        """Create a FilterState for a numeric value."""
+        filter_state = cls.__new__(cls)
+        filter_state.timestamp = timestamp
+        filter_state.state = float(value)
+        return filter_state
+
     def set_precision(self, precision):
         """Set precision of Number based states."""
         if isinstance(self.state, Number):
@@ -385,14 +449,50 @@ class Filter:
 
     def filter_state(self, new_state):
         """Implement a common interface for filters."""
-        filtered = self._filter_state(FilterState(new_state))
+        filtered = self._filter_one(FilterState(new_state))
+        new_state.state = filtered.state
+        return new_state
+
+    def _filter_one(self, new_state):
+        """Filter a FilterState and add it to the window."""
+        raw = copy(new_state)
+        filtered = self._filter_state(new_state)
         filtered.set_precision(self.precision)
         if self._store_raw:
-            self.states.append(copy(FilterState(new_state)))
+            self.states.append(raw)
         else:
             self.states.append(copy(filtered))
-        new_state.state = filtered.state
-        return new_state
+        return filtered
+
+    def filter_states(self, timestamps, values):
+        """Filter a batch of numeric states, oldest first.
+
+        Leaves the filter in the same state as filtering them one by one.
+        Return a mask of the states that are not skipped and the filtered values.
+        """
+        keep = np.ones(len(values), dtype=bool)
+        filtered = np.empty(len(values))
+        for index, (timestamp, value) in enumerate(zip(timestamps, values.tolist())):
+            new_state = FilterState.from_value(timestamp, value)
+            filtered[index] = self._filter_one(new_state).state
+            keep[index] = not self._skip_processing
+        return keep, filtered
+
+    def _round(self, values):
+        """Round filtered values like FilterState.set_precision."""
+        return np.fromiter(
+            (round(value, self.precision) for value in values.tolist()),
+            float,
+            len(values),
+        )
+
+    def _extend_window(self, timestamps, values):
+        """Add the last values of a batch to the window."""
+        size = self.states.maxlen
+        if not size:
+            return
+        for timestamp, value in zip(timestamps[-size:], values[-size:].tolist()):
+            self.states.append(FilterState.from_value(timestamp, value))
 
 
 @FILTERS.register(FILTER_NAME_RANGE)
@@ -448,6 +548,24 @@ class RangeFilter(Filter):
 
         return new_state
 
+    def filter_states(self, timestamps, values):
+        """Clip a batch of states to the range."""
+        filtered = values.copy()
+        if self._upper_bound is not None:
+            upper = values > self._upper_bound
+            filtered[upper] = self._upper_bound
+            self._stats_internal["erasures_up"] += int(np.count_nonzero(upper))
+        else:
+            upper = np.zeros(len(values), dtype=bool)
+        if self._lower_bound is not None:
+            lower = ~upper & (values < self._lower_bound)
+            filtered[lower] = self._lower_bound
+            self._stats_internal["erasures_low"] += int(np.count_nonzero(lower))
+
+        filtered = self._round(filtered)
+        self._extend_window(timestamps, filtered)
+        return np.ones(len(values), dtype=bool), filtered
+
 
 @FILTERS.register(FILTER_NAME_OUTLIER)
 class OutlierFilter(Filter):
@@ -485,6 +603,36 @@ class OutlierFilter(Filter):
             new_state.state = median
         return new_state
 
+    def filter_states(self, timestamps, values):
+        """Compare a batch of states with the moving median of the raw states."""
+        size = self.states.maxlen
+        previous = [state.state for state in self.states]
+        raw = np.concatenate((np.array(previous, dtype=float), values))
+        filtered = values.copy()
+
+        # Index of the first state of the batch that has a full window
+        start = max(size - len(previous), 0)
+        if start < len(values):
+            # Row i holds the window in front of raw state i + size
+            windows = as_strided(
+                raw,
+                shape=(len(raw) - size, size),
+                strides=(raw.strides[0], raw.strides[0]),
+            )[len(previous) + start - size :]
+            rows = max(MEDIAN_CHUNK_SIZE // size, 1)
+            medians = np.concatenate(
+                [
+                    np.median(windows[row : row + rows], axis=1)
+                    for row in range(0, len(windows), rows)
+                ]
+            )
+            outliers = np.abs(values[start:] - medians) > self._radius
+            filtered[start:][outliers] = medians[outliers]
+            self._stats_internal["erasures"] += int(np.count_nonzero(outliers))
+
+        self._extend_window(timestamps, values)
+        return np.ones(len(values), dtype=bool), self._round(filtered)
+
 
 @FILTERS.register(FILTER_NAME_LOWPASS)
 class LowPassFilter(Filter):
@@ -553,6 +701,64 @@ class TimeSMAFilter(Filter):
 
         return new_state
 
+    def filter_states(self, timestamps, values):
+        """Compute the moving averages of a batch of states.
+
+        The sums add up the same terms in the same order as _filter_state,
+        one position in the windows of all states at a time.
+        """
+        if not values.size:
+            return np.ones(0, dtype=bool), values
+
+        queued = len(self.queue)
+        all_timestamps = [state.timestamp for state in self.queue] + list(timestamps)
+        all_values = np.concatenate(
+            (np.array([state.state for state in self.queue], dtype=float), values)
+        )
+        origin = all_timestamps[0]
+        microseconds = np.array(
+            [
+                (timestamp - origin) // timedelta(microseconds=1)
+                for timestamp in all_timestamps
+            ],
+            dtype=np.int64,
+        )
+        window = self._time_window // timedelta(microseconds=1)
+
+        # Index of the first state in the window of each state of the batch
+        current = np.arange(queued, len(all_values))
+        first = np.searchsorted(microseconds, microseconds[current] - window, "right")
+
+        # The state before the window weighs in up to the first state in it
+        leaked = all_values[np.maximum(first - 1, 0)]
+        if self.last_leak is not None:
+            leaked[first == 0] = self.last_leak.state
+        else:
+            leaked[first == 0] = all_values[0]
+
+        moving_sum = (microseconds[first] - microseconds[current] + window) / 1e6
+        moving_sum *= leaked
+        for offset in range(1, int((current - first).max()) + 1):
+            index = first + offset
+            valid = index <= current
+            index = index[valid]
+            moving_sum[valid] += (
+                (microseconds[index] - microseconds[index - 1])
+                / 1e6
+                * all_values[index - 1]
+            )
+        filtered = self._round(moving_sum / self._time_window.total_seconds())
+
+        if first[-1] > 0:
+            self.last_leak = FilterState.from_value(
+                all_timestamps[first[-1] - 1], all_values[first[-1] - 1]
+            )
+        self.queue = deque(
+            FilterState.from_value(all_timestamps[index], all_values[index])
+            for index in range(first[-1], len(all_values))
+        )
+        return np.ones(len(values), dtype=bool), filtered
+
 
 @FILTERS.register(FILTER_NAME_THROTTLE)
 class ThrottleFilter(Filter):
@@ -575,6 +781,26 @@ class ThrottleFilter(Filter):
 
         return new_state
 
+    def filter_states(self, timestamps, values):
+        """Keep one state of every window_size states of a batch."""
+        size = self.states.maxlen
+        keep = np.zeros(len(values), dtype=bool)
+        if len(self.states) in (0, size):
+            keep[::size] = True
+        else:
+            keep[size - len(self.states) :: size] = True
+
+        filtered = self._round(values)
+        kept = np.flatnonzero(keep)
+        if kept.size:
+            self.states.clear()
+            self._extend_window(timestamps[kept[-1] :], filtered[kept[-1] :])
+        else:
+            self._extend_window(timestamps, filtered)
+        if keep.size:
+            self._skip_processing = not keep[-1]
+        return keep, filtered
+
 
 @FILTERS.register(FILTER_NAME_TIME_THROTTLE)
 class TimeThrottleFilter(Filter):
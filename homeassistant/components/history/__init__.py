@@ -1,16 +1,23 @@
 """Provide pre-made queries on top of the recorder component."""
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import timedelta
 from itertools import groupby
+import json
 import logging
 import time
 
+from aiohttp import web
 from sqlalchemy import and_, func
+from sqlalchemy.orm import joinedload
 import voluptuous as vol
 
 from homeassistant.components import recorder
 from homeassistant.components.http import HomeAssistantView
-from homeassistant.components.recorder.models import States
+from homeassistant.components.recorder.models import (
+    StateAttributes,
+    States,
+    process_timestamp,
+)
 from homeassistant.components.recorder.util import execute, session_scope
 from homeassistant.const import (
     ATTR_HIDDEN,
@@ -18,9 +25,11 @@ from homeassistant.const import (
     CONF_ENTITIES,
     CONF_EXCLUDE,
     CONF_INCLUDE,
+    CONTENT_TYPE_JSON,
     HTTP_BAD_REQUEST,
 )
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.json import JSONEncoder
 import homeassistant.util.dt as dt_util
 
 # mypy: allow-untyped-defs, no-check-untyped-defs
@@ -41,6 +50,12 @@ CONFIG_SCHEMA = vol.Schema(
 
 SIGNIFICANT_DOMAINS = ("thermostat", "climate", "water_heater")
 IGNORE_DOMAINS = ("zone", "scene")
+# Domains that need their attributes for every point of a minimal response
+NEED_ATTRIBUTE_DOMAINS = SIGNIFICANT_DOMAINS + ("script",)
+
+# Number of rows fetched from the database and states written per chunk
+# when streaming history.
+STREAM_BATCH_SIZE = 1000
 
 
 def get_significant_states(
@@ -50,6 +65,7 @@ def get_significant_states(
     entity_ids=None,
     filters=None,
     include_start_time_state=True,
+    minimal_response=False,
 ):
     """
     Return states changes during UTC period start_time - end_time.
@@ -57,25 +73,25 @@ def get_significant_states(
     Significant states are all states where there is a state change,
     as well as all states from certain domains (for instance
     thermostat so that we get current temperature in our graphs).
-    """
-    timer_start = time.perf_counter()
 
-    with session_scope(hass=hass) as session:
-        query = session.query(States).filter(
-            (
-                States.domain.in_(SIGNIFICANT_DOMAINS)
-                | (States.last_changed == States.last_updated)
-            )
-            & (States.last_updated > start_time)
+    With minimal_response only the first and last point of each entity
+    are full states, the others are dicts with state and last_changed.
+    """
+    if minimal_response:
+        return _get_significant_states_minimal(
+            hass, start_time, end_time, entity_ids, filters, include_start_time_state
         )
 
-        if filters:
-            query = filters.apply(query, entity_ids)
-
-        if end_time is not None:
-            query = query.filter(States.last_updated < end_time)
+    timer_start = time.perf_counter()
 
-        query = query.order_by(States.last_updated)
+    with session_scope(hass=hass) as session:
+        query = _significant_states_query(
+            session.query(States).options(joinedload(States.state_attributes)),
+            start_time,
+            end_time,
+            entity_ids,
+            filters,
+        ).order_by(States.last_updated)
 
         states = (
             state
@@ -92,13 +108,329 @@ def get_significant_states(
     )
 
 
+def stream_significant_states(
+    hass,
+    start_time,
+    end_time=None,
+    entity_ids=None,
+    filters=None,
+    include_start_time_state=True,
+    leading_entity_ids=(),
+):
+    """Yield the significant states during UTC period start_time - end_time.
+
+    Yields (entity_id, states) tuples ordered by entity_id, where states
+    holds at most STREAM_BATCH_SIZE states. Consecutive tuples of the same
+    entity continue its list of states. The entities in leading_entity_ids
+    come first, in that order. Rows are fetched in batches, so memory use
+    does not depend on the length of the period.
+
+    Every batch is queried in a session of its own, so the generator can be
+    advanced from any thread, as long as it is not advanced concurrently.
+    """
+    start_states = {}
+    if include_start_time_state:
+        for state in get_states(hass, start_time, entity_ids, filters=filters):
+            state.last_changed = start_time
+            state.last_updated = start_time
+            start_states[state.entity_id] = state
+
+    leading_entity_ids = list(dict.fromkeys(leading_entity_ids))
+    for leading_entity_id in leading_entity_ids:
+        leading_start_states = {}
+        if leading_entity_id in start_states:
+            leading_start_states[leading_entity_id] = start_states.pop(
+                leading_entity_id
+            )
+        yield from _stream_states(
+            hass,
+            start_time,
+            end_time,
+            entity_ids,
+            filters,
+            States.entity_id == leading_entity_id,
+            leading_start_states,
+        )
+
+    criterion = None
+    if leading_entity_ids:
+        criterion = ~States.entity_id.in_(leading_entity_ids)
+    yield from _stream_states(
+        hass, start_time, end_time, entity_ids, filters, criterion, start_states
+    )
+
+
+def _stream_states(
+    hass, start_time, end_time, entity_ids, filters, criterion, start_states
+):
+    """Yield the significant states matching criterion ordered by entity_id.
+
+    Entities in start_states are merged in by entity_id, with their start
+    state in front of their changes.
+    """
+    pending_start = deque(sorted(start_states))
+    after = None
+    batch_entity_id = None
+    batch = []
+    while True:
+        with session_scope(hass=hass) as session:
+            query = _significant_states_query(
+                session.query(States).options(joinedload(States.state_attributes)),
+                start_time,
+                end_time,
+                entity_ids,
+                filters,
+            )
+            if criterion is not None:
+                query = query.filter(criterion)
+            if after is not None:
+                query = query.filter(_after_row_criterion(*after))
+            rows = (
+                query.order_by(States.entity_id, States.last_updated, States.state_id)
+                .limit(STREAM_BATCH_SIZE)
+                .all()
+            )
+            if not rows:
+                break
+            after = (rows[-1].entity_id, rows[-1].last_updated, rows[-1].state_id)
+            states = [row.to_native() for row in rows]
+
+        for state in states:
+            if (
+                state is None
+                or not _is_significant(state)
+                or state.attributes.get(ATTR_HIDDEN, False)
+            ):
+                continue
+
+            if state.entity_id != batch_entity_id:
+                if batch:
+                    yield batch_entity_id, batch
+                batch_entity_id = state.entity_id
+                batch = []
+                # Entities without changes that sort before this one
+                while pending_start and pending_start[0] <= batch_entity_id:
+                    entity_id = pending_start.popleft()
+                    if entity_id == batch_entity_id:
+                        batch.append(start_states[entity_id])
+                    else:
+                        yield entity_id, [start_states[entity_id]]
+
+            batch.append(state)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield batch_entity_id, batch
+                batch = []
+
+    if batch:
+        yield batch_entity_id, batch
+
+    for entity_id in pending_start:
+        yield entity_id, [start_states[entity_id]]
+
+
+def _after_row_criterion(entity_id, last_updated, state_id):
+    """Match the rows that sort after the given row when streaming."""
+    return (States.entity_id > entity_id) | (
+        (States.entity_id == entity_id)
+        & (
+            (States.last_updated > last_updated)
+            | ((States.last_updated == last_updated) & (States.state_id > state_id))
+        )
+    )
+
+
+def _get_significant_states_minimal(
+    hass, start_time, end_time, entity_ids, filters, include_start_time_state
+):
+    """Return significant states, decoding attributes only where needed.
+
+    Only the state, last_changed and ids of the points are selected. Full
+    states are loaded for the first and last point of each entity, and for
+    every point of the domains in NEED_ATTRIBUTE_DOMAINS. Hidden points are
+    left out before the ends are picked.
+    """
+    timer_start = time.perf_counter()
+
+    start_states = []
+    if include_start_time_state:
+        start_states = get_states(hass, start_time, entity_ids, filters=filters)
+    has_start_state = {state.entity_id for state in start_states}
+
+    with session_scope(hass=hass) as session:
+        query = _significant_states_query(
+            session.query(
+                States.state_id,
+                States.entity_id,
+                States.domain,
+                States.state,
+                States.last_changed,
+                States.attributes_id,
+            ),
+            start_time,
+            end_time,
+            entity_ids,
+            filters,
+        ).order_by(States.last_updated)
+
+        rows = defaultdict(list)
+        for row in query:
+            rows[row.entity_id].append(row)
+
+        hidden_attributes_ids = _hidden_attributes_ids(
+            session,
+            {
+                row.attributes_id
+                for entity_rows in rows.values()
+                for row in entity_rows
+                if row.attributes_id is not None
+            },
+        )
+
+        full_state_ids = []
+        for ent_id in list(rows):
+            entity_rows = rows[ent_id] = [
+                row
+                for row in rows[ent_id]
+                if row.attributes_id not in hidden_attributes_ids
+            ]
+            if not entity_rows:
+                continue
+            if entity_rows[0].domain in NEED_ATTRIBUTE_DOMAINS:
+                full_state_ids.extend(row.state_id for row in entity_rows)
+                continue
+            # Rows stored before the shared attributes table can only be
+            # checked for the hidden attribute as full states
+            full_state_ids.extend(
+                row.state_id for row in entity_rows if row.attributes_id is None
+            )
+        full_states = _load_full_states(session, full_state_ids)
+
+        # The ends are picked from the points that are kept, so the first
+        # and last point of each entity are always full states
+        end_state_ids = []
+        for ent_id in list(rows):
+            entity_rows = rows[ent_id] = [
+                row
+                for row in rows[ent_id]
+                if row.state_id not in full_states
+                or _keep_minimal_state(full_states[row.state_id])
+            ]
+            if not entity_rows or entity_rows[0].domain in NEED_ATTRIBUTE_DOMAINS:
+                continue
+            if ent_id not in has_start_state:
+                end_state_ids.append(entity_rows[0].state_id)
+            end_state_ids.append(entity_rows[-1].state_id)
+        full_states.update(
+            _load_full_states(
+                session,
+                [state_id for state_id in end_state_ids if state_id not in full_states],
+            )
+        )
+
+    result = defaultdict(list)
+    # Set all entity IDs to empty lists in result set to maintain the order
+    if entity_ids is not None:
+        for ent_id in entity_ids:
+            result[ent_id] = []
+
+    for state in start_states:
+        state.last_changed = start_time
+        state.last_updated = start_time
+        result[state.entity_id].append(state)
+
+    for ent_id, entity_rows in rows.items():
+        entity_result = result[ent_id]
+        for row in entity_rows:
+            if row.state_id not in full_states:
+                entity_result.append(
+                    {
+                        "state": row.state,
+                        "last_changed": process_timestamp(row.last_changed),
+                    }
+                )
+                continue
+
+            state = full_states[row.state_id]
+            if _keep_minimal_state(state):
+                entity_result.append(state)
+
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        elapsed = time.perf_counter() - timer_start
+        _LOGGER.debug("get_significant_states minimal took %fs", elapsed)
+
+    # Filter out the empty lists if some states had 0 results.
+    return {key: val for key, val in result.items() if val}
+
+
+def _load_full_states(session, state_ids):
+    """Return the native states of the given state ids by state id."""
+    full_states = {}
+    # Stay below the SQLite limit of variables per query
+    for idx in range(0, len(state_ids), 500):
+        for db_state in (
+            session.query(States)
+            .options(joinedload(States.state_attributes))
+            .filter(States.state_id.in_(state_ids[idx : idx + 500]))
+        ):
+            full_states[db_state.state_id] = db_state.to_native()
+    return full_states
+
+
+def _keep_minimal_state(state):
+    """Return if a full state of a minimal response is kept."""
+    return (
+        state is not None
+        and _is_significant(state)
+        and not state.attributes.get(ATTR_HIDDEN, False)
+    )
+
+
+def _hidden_attributes_ids(session, attributes_ids):
+    """Return the ids of the shared attributes marked as hidden."""
+    attributes_ids = list(attributes_ids)
+    hidden = set()
+    for idx in range(0, len(attributes_ids), 500):
+        for attributes_id, shared_attrs in session.query(
+            StateAttributes.attributes_id, StateAttributes.shared_attrs
+        ).filter(StateAttributes.attributes_id.in_(attributes_ids[idx : idx + 500])):
+            # Only decode the attributes that can hold the hidden key
+            if '"hidden"' in shared_attrs and json.loads(shared_attrs).get(
+                ATTR_HIDDEN, False
+            ):
+                hidden.add(attributes_id)
+    return hidden
+
+
+def _significant_states_query(query, start_time, end_time, entity_ids, filters):
+    """Filter query on the significant states during a period."""
+    query = query.filter(
+        (
+            States.domain.in_(SIGNIFICANT_DOMAINS)
+            | (States.last_changed == States.last_updated)
+        )
+        & (States.last_updated > start_time)
+    )
+
+    if filters:
+        query = filters.apply(query, entity_ids)
+
+    if end_time is not None:
+        query = query.filter(States.last_updated < end_time)
+
+    return query
+
+
 def state_changes_during_period(hass, start_time, end_time=None, entity_id=None):
     """Return states changes during UTC period start_time - end_time."""
 
     with session_scope(hass=hass) as session:
-        query = session.query(States).filter(
-            (States.last_changed == States.last_updated)
-            & (States.last_updated > start_time)
+        query = (
+            session.query(States)
+            .options(joinedload(States.state_attributes))
+            .filter(
+                (States.last_changed == States.last_updated)
+                & (States.last_updated > start_time)
+            )
         )
 
         if end_time is not None:
@@ -120,8 +452,10 @@ def get_last_state_changes(hass, number_of_states, entity_id):
     start_time = dt_util.utcnow()
 
     with session_scope(hass=hass) as session:
-        query = session.query(States).filter(
-            (States.last_changed == States.last_updated)
+        query = (
+            session.query(States)
+            .options(joinedload(States.state_attributes))
+            .filter((States.last_changed == States.last_updated))
         )
 
         if entity_id is not None:
@@ -149,7 +483,7 @@ def get_states(hass, utc_point_in_time, entity_ids=None, run=None, filters=None)
             return []
 
     with session_scope(hass=hass) as session:
-        query = session.query(States)
+        query = session.query(States).options(joinedload(States.state_attributes))
 
         if entity_ids and len(entity_ids) == 1:
             # Use an entirely different (and extremely fast) query if we only
@@ -327,10 +661,31 @@ class HistoryPeriodView(HomeAssistantView):
         if entity_ids:
             entity_ids = entity_ids.lower().split(",")
         include_start_time_state = "skip_initial_state" not in request.query
+        minimal_response = "minimal_response" in request.query
 
         hass = request.app["hass"]
 
-        result = await hass.async_add_job(
+        if "stream" in request.query:
+            # Same entity order as the regular response
+            leading_entity_ids = []
+            if self.use_include_order:
+                leading_entity_ids.extend(self.filters.included_entities)
+            if entity_ids:
+                leading_entity_ids.extend(entity_ids)
+            batches = stream_significant_states(
+                hass,
+                start_time,
+                end_time,
+                entity_ids,
+                self.filters,
+                include_start_time_state,
+                leading_entity_ids,
+            )
+            if minimal_response:
+                batches = _minimal_batches(batches)
+            return await self._async_stream(request, batches)
+
+        result = await recorder.get_instance(hass).async_add_executor_job(
             get_significant_states,
             hass,
             start_time,
@@ -338,27 +693,109 @@ class HistoryPeriodView(HomeAssistantView):
             entity_ids,
             self.filters,
             include_start_time_state,
+            minimal_response,
         )
-        result = list(result.values())
         if _LOGGER.isEnabledFor(logging.DEBUG):
             elapsed = time.perf_counter() - timer_start
-            _LOGGER.debug("Extracted %d states in %fs", sum(map(len, result)), elapsed)
+            _LOGGER.debug(
+                "Extracted %d states in %fs", sum(map(len, result.values())), elapsed
+            )
 
         # Optionally reorder the result to respect the ordering given
         # by any entities explicitly included in the configuration.
         if self.use_include_order:
             sorted_result = []
             for order_entity in self.filters.included_entities:
-                for state_list in result:
-                    if state_list[0].entity_id == order_entity:
-                        sorted_result.append(state_list)
-                        result.remove(state_list)
-                        break
-            sorted_result.extend(result)
+                state_list = result.pop(order_entity, None)
+                if state_list is not None:
+                    sorted_result.append(state_list)
+            sorted_result.extend(result.values())
             result = sorted_result
+        else:
+            result = list(result.values())
 
         return await hass.async_add_job(self.json, result)
 
+    @staticmethod
+    async def _async_stream(request, batches):
+        """Stream the (entity_id, states) batches as chunked JSON.
+
+        The response has the same layout as the regular one. The batches are
+        generated in the read executor of the recorder.
+        """
+        hass = request.app["hass"]
+        instance = recorder.get_instance(hass)
+        response = web.StreamResponse(headers={"Content-Type": CONTENT_TYPE_JSON})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+
+        chunks = _json_chunks(batches)
+        try:
+            while True:
+                chunk = await instance.async_add_executor_job(next, chunks, None)
+                if chunk is None:
+                    break
+                await response.write(chunk)
+        finally:
+            chunks.close()
+
+        await response.write_eof()
+        return response
+
+
+def _minimal_batches(batches):
+    """Reduce streamed (entity_id, states) batches to minimal points.
+
+    Like get_significant_states with minimal_response, only the first and
+    last point of each entity and every point of the domains in
+    NEED_ATTRIBUTE_DOMAINS stay full states. The last state of an entity
+    is held back until the next entity or the end of the stream.
+    """
+    current_entity_id = None
+    held = None
+    held_first = True
+    for entity_id, states in batches:
+        if entity_id != current_entity_id:
+            if held is not None:
+                yield current_entity_id, [held]
+            current_entity_id = entity_id
+            held = None
+            held_first = True
+
+        points = []
+        for state in states:
+            if held is not None:
+                if held_first or held.domain in NEED_ATTRIBUTE_DOMAINS:
+                    points.append(held)
+                else:
+                    points.append(
+                        {"state": held.state, "last_changed": held.last_changed}
+                    )
+                held_first = False
+            held = state
+        if points:
+            yield entity_id, points
+
+    if held is not None:
+        yield current_entity_id, [held]
+
+
+def _json_chunks(batches):
+    """Encode (entity_id, states) batches as a JSON list of state lists."""
+    current_entity_id = None
+    yield b"["
+    for entity_id, states in batches:
+        encoded = ",".join(json.dumps(state, cls=JSONEncoder) for state in states)
+        if current_entity_id is None:
+            prefix = "["
+        elif entity_id == current_entity_id:
+            prefix = ","
+        else:
+            prefix = "],["
+        current_entity_id = entity_id
+        yield (prefix + encoded).encode("UTF-8")
+    yield b"]]" if current_entity_id is not None else b"]"
+
 
 class Filters:
     """Container for the configured include and exclude filters."""
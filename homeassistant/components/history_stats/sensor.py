@@ -5,7 +5,7 @@ import math
 
 import voluptuous as vol
 
-from homeassistant.components import history
+from homeassistant.components import history, recorder
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
     CONF_ENTITY_ID,
@@ -171,7 +171,7 @@ class HistoryStatsSensor(Entity):
         """Return the icon to use in the frontend, if any."""
         return ICON
 
-    def update(self):
+    async def async_update(self):
         """Get the latest data and updates the states."""
         # Get previous values of start and end
         p_start, p_end = self._period
@@ -204,22 +204,21 @@ class HistoryStatsSensor(Entity):
             return
 
         # Get history between start and end
-        history_list = history.state_changes_during_period(
-            self.hass, start, end, str(self._entity_id)
-        )
+        history_list, last_state = await recorder.get_instance(
+            self.hass
+        ).async_add_executor_job(self._get_history, start, end)
 
-        if self._entity_id not in history_list.keys():
+        if history_list is None:
             return
 
         # Get the first state
-        last_state = history.get_state(self.hass, start, self._entity_id)
         last_state = last_state is not None and last_state == self._entity_state
         last_time = start_timestamp
         elapsed = 0
         count = 0
 
         # Make calculations
-        for item in history_list.get(self._entity_id):
+        for item in history_list:
             current_state = item.state == self._entity_state
             current_time = item.last_changed.timestamp()
 
@@ -242,6 +241,23 @@ class HistoryStatsSensor(Entity):
         # Save counter
         self.count = count
 
+    def _get_history(self, start, end):
+        """Return the state changes during the period and the state at its start.
+
+        Runs in the executor of the recorder.
+        """
+        history_list = history.state_changes_during_period(
+            self.hass, start, end, str(self._entity_id)
+        )
+
+        if self._entity_id not in history_list:
+            return None, None
+
+        return (
+            history_list[self._entity_id],
+            history.get_state(self.hass, start, self._entity_id),
+        )
+
     def update_period(self):
         """Parse the templates and store a datetime tuple in _period."""
         start = None
@@ -250,7 +266,7 @@ class HistoryStatsSensor(Entity):
         # Parse start
         if self._start is not None:
             try:
-                start_rendered = self._start.render()
+                start_rendered = self._start.async_render()
             except (TemplateError, TypeError) as ex:
                 HistoryStatsHelper.handle_template_exception(ex, "start")
                 return
@@ -269,7 +285,7 @@ class HistoryStatsSensor(Entity):
         # Parse end
         if self._end is not None:
             try:
-                end_rendered = self._end.render()
+                end_rendered = self._end.async_render()
             except (TemplateError, TypeError) as ex:
                 HistoryStatsHelper.handle_template_exception(ex, "end")
                 return
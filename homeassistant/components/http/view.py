@@ -53,6 +53,13 @@ class HomeAssistantView:
         except (ValueError, TypeError) as err:
             _LOGGER.error("Unable to serialize to JSON: %s\n%s", err, result)
             raise HTTPInternalServerError
+        return HomeAssistantView.json_encoded(msg, status_code, headers)
+
+    @staticmethod
+    def json_encoded(msg, status_code=200, headers=None):
+        """Return a response for an already JSON encoded body."""
+        if isinstance(msg, str):
+            msg = msg.encode("UTF-8")
         response = web.Response(
             body=msg,
             content_type=CONTENT_TYPE_JSON,
@@ -1,4 +1,6 @@
 """Support for sending data to an Influx database."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
 import math
 import queue
@@ -29,6 +31,7 @@ from homeassistant.const import (
 from homeassistant.helpers import event as event_helper, state as state_helper
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity_values import EntityValues
+import homeassistant.util.dt as dt_util
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -41,6 +44,9 @@ CONF_COMPONENT_CONFIG = "component_config"
 CONF_COMPONENT_CONFIG_GLOB = "component_config_glob"
 CONF_COMPONENT_CONFIG_DOMAIN = "component_config_domain"
 CONF_RETRY_COUNT = "max_retries"
+CONF_BATCH_SIZE = "batch_size"
+CONF_BATCH_MAX_BYTES = "batch_max_bytes"
+CONF_WRITERS = "writers"
 
 DEFAULT_DATABASE = "home_assistant"
 DEFAULT_VERIFY_SSL = True
@@ -53,6 +59,14 @@ RETRY_INTERVAL = 60  # seconds
 
 BATCH_TIMEOUT = 1
 BATCH_BUFFER_SIZE = 100
+BATCH_MAX_BYTES = 1000000
+DEFAULT_WRITERS = 2
+
+# Number of cached line protocol prefixes before the cache is reset
+PREFIX_CACHE_SIZE = 4096
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_util.UTC)
+ONE_MICROSECOND = timedelta(microseconds=1)
 
 COMPONENT_CONFIG_SCHEMA_ENTRY = vol.Schema(
     {vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string}
@@ -86,6 +100,15 @@ CONFIG_SCHEMA = vol.Schema(
                     vol.Optional(CONF_PORT): cv.port,
                     vol.Optional(CONF_SSL): cv.boolean,
                     vol.Optional(CONF_RETRY_COUNT, default=0): cv.positive_int,
+                    vol.Optional(CONF_BATCH_SIZE, default=BATCH_BUFFER_SIZE): vol.All(
+                        vol.Coerce(int), vol.Range(min=1)
+                    ),
+                    vol.Optional(
+                        CONF_BATCH_MAX_BYTES, default=BATCH_MAX_BYTES
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Optional(CONF_WRITERS, default=DEFAULT_WRITERS): vol.All(
+                        vol.Coerce(int), vol.Range(min=1)
+                    ),
                     vol.Optional(CONF_DEFAULT_MEASUREMENT): cv.string,
                     vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string,
                     vol.Optional(CONF_TAGS, default={}): vol.Schema(
@@ -117,6 +140,39 @@ RE_DIGIT_TAIL = re.compile(r"^[^\.]*\d+\.?\d+[^\.]*$")
 RE_DECIMAL = re.compile(r"[^\d.]+")
 
 
+def _escape_key(key):
+    """Escape a measurement, tag key or field key for the line protocol."""
+    return (
+        key.replace("\\", "\\\\")
+        .replace(" ", "\\ ")
+        .replace(",", "\\,")
+        .replace("=", "\\=")
+        .replace("\n", "\\n")
+    )
+
+
+def _escape_tag_value(value):
+    """Escape a tag value for the line protocol."""
+    value = _escape_key(value)
+    if value.endswith("\\"):
+        value += " "
+    return value
+
+
+def _field_value(value):
+    """Return a float or string field value in line protocol format."""
+    if isinstance(value, str):
+        return '"{}"'.format(
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+    return repr(value)
+
+
+def _time_ns(time_fired):
+    """Return the nanoseconds since the epoch of an aware datetime."""
+    return (time_fired - EPOCH) // ONE_MICROSECOND * 1000
+
+
 def setup(hass, config):
     """Set up the InfluxDB component."""
 
@@ -175,8 +231,34 @@ def setup(hass, config):
         event_helper.call_later(hass, RETRY_INTERVAL, lambda _: setup(hass, config))
         return True
 
-    def event_to_json(event):
-        """Add an event to the outgoing Influx list."""
+    prefix_cache = {}
+
+    def line_prefix(state, measurement, tag_values):
+        """Return the escaped measurement and tags of a line."""
+        key = (state.entity_id, measurement, tag_values)
+        prefix = prefix_cache.get(key)
+        if prefix is not None:
+            return prefix
+
+        line_tags = {"domain": state.domain, "entity_id": state.object_id}
+        line_tags.update(tag_values)
+        line_tags.update(tags)
+        prefix = ",".join(
+            [_escape_key(measurement)]
+            + [
+                f"{_escape_key(tag)}={_escape_tag_value(value)}"
+                for tag, value in sorted(line_tags.items())
+                if tag and value
+            ]
+        )
+
+        if len(prefix_cache) >= PREFIX_CACHE_SIZE:
+            prefix_cache.clear()
+        prefix_cache[key] = prefix
+        return prefix
+
+    def event_to_line(event):
+        """Encode an event as a line of the Influx line protocol."""
         state = event.data.get("new_state")
         if (
             state is None
@@ -222,52 +304,68 @@ def setup(hass, config):
                 else:
                     include_uom = False
 
-        json = {
-            "measurement": measurement,
-            "tags": {"domain": state.domain, "entity_id": state.object_id},
-            "time": event.time_fired,
-            "fields": {},
-        }
+        tag_values = ()
+        fields = {}
         if _include_state:
-            json["fields"]["state"] = state.state
+            fields["state"] = state.state
         if _include_value:
-            json["fields"]["value"] = _state_as_value
+            fields["value"] = _state_as_value
 
         for key, value in state.attributes.items():
             if key in tags_attributes:
-                json["tags"][key] = value
+                if value is not None:
+                    tag_values += ((key, str(value)),)
             elif key != "unit_of_measurement" or include_uom:
                 # If the key is already in fields
-                if key in json["fields"]:
+                if key in fields:
                     key = key + "_"
                 # Prevent column data errors in influxDB.
                 # For each value we try to cast it as float
                 # But if we can not do it we store the value
                 # as string add "_str" postfix to the field key
                 try:
-                    json["fields"][key] = float(value)
+                    fields[key] = float(value)
                 except (ValueError, TypeError):
                     new_key = f"{key}_str"
                     new_value = str(value)
-                    json["fields"][new_key] = new_value
+                    fields[new_key] = new_value
 
                     if RE_DIGIT_TAIL.match(new_value):
-                        json["fields"][key] = float(RE_DECIMAL.sub("", new_value))
+                        fields[key] = float(RE_DECIMAL.sub("", new_value))
 
                 # Infinity and NaN are not valid floats in InfluxDB
                 try:
-                    if not math.isfinite(json["fields"][key]):
-                        del json["fields"][key]
+                    if not math.isfinite(fields[key]):
+                        del fields[key]
                 except (KeyError, TypeError):
                     pass
 
-        json["tags"].update(tags)
-
-        return json
+        field_set = ",".join(
+            f"{_escape_key(key)}={_field_value(value)}"
+            for key, value in fields.items()
+            if value != ""
+        )
+        if not field_set:
+            return
 
-    instance = hass.data[DOMAIN] = InfluxThread(hass, influx, event_to_json, max_tries)
+        prefix = line_prefix(state, measurement, tag_values)
+        return f"{prefix} {field_set} {_time_ns(event.time_fired)}"
+
+    instance = hass.data[DOMAIN] = InfluxThread(
+        hass,
+        influx,
+        event_to_line,
+        max_tries,
+        conf[CONF_BATCH_SIZE],
+        conf[CONF_BATCH_MAX_BYTES],
+        conf[CONF_WRITERS],
+    )
     instance.start()
 
+    hass.add_job(
+        hass.components.system_health.async_register_info, DOMAIN, system_health_info
+    )
+
     def shutdown(event):
         """Shut down the thread."""
         instance.queue.put(None)
@@ -279,18 +377,50 @@ def setup(hass, config):
     return True
 
 
-class InfluxThread(threading.Thread):
-    """A threaded event handler class."""
+async def system_health_info(hass):
+    """Get the state of the writer for the info page."""
+    return hass.data[DOMAIN].info()
+
 
-    def __init__(self, hass, influx, event_to_json, max_tries):
+class InfluxThread(threading.Thread):
+    """A threaded event handler class.
+
+    The thread encodes queued events as line protocol and hands batches of
+    lines to a small pool of writers, so encoding continues while a batch is
+    being sent.
+    """
+
+    def __init__(
+        self,
+        hass,
+        influx,
+        event_to_line,
+        max_tries,
+        batch_size=BATCH_BUFFER_SIZE,
+        batch_max_bytes=BATCH_MAX_BYTES,
+        writers=DEFAULT_WRITERS,
+    ):
         """Initialize the listener."""
         threading.Thread.__init__(self, name="InfluxDB")
         self.queue = queue.Queue()
         self.influx = influx
-        self.event_to_json = event_to_json
+        self.event_to_line = event_to_line
         self.max_tries = max_tries
+        self.batch_size = batch_size
+        self.batch_max_bytes = batch_max_bytes
         self.write_errors = 0
+        self.dropped_events = 0
+        self.lost_events = 0
+        self.written_events = 0
+        self.write_latency = None
+        self.max_write_latency = None
         self.shutdown = False
+        self._writers = ThreadPoolExecutor(
+            max_workers=writers, thread_name_prefix="InfluxDB Writer"
+        )
+        # Hold back encoding once every writer has a batch waiting
+        self._pending = threading.BoundedSemaphore(2 * writers)
+        self._lock = threading.Lock()
         hass.bus.listen(EVENT_STATE_CHANGED, self._event_listener)
 
     def _event_listener(self, event):
@@ -303,17 +433,22 @@ class InfluxThread(threading.Thread):
         """Return number of seconds to wait for more events."""
         return BATCH_TIMEOUT
 
-    def get_events_json(self):
-        """Return a batch of events formatted for writing."""
+    def get_events_lines(self):
+        """Return a batch of events encoded for writing."""
         queue_seconds = QUEUE_BACKLOG_SECONDS + self.max_tries * RETRY_DELAY
 
         count = 0
-        json = []
+        size = 0
+        lines = []
 
         dropped = 0
 
         try:
-            while len(json) < BATCH_BUFFER_SIZE and not self.shutdown:
+            while (
+                len(lines) < self.batch_size
+                and size < self.batch_max_bytes
+                and not self.shutdown
+            ):
                 timeout = None if count == 0 else self.batch_timeout()
                 item = self.queue.get(timeout=timeout)
                 count += 1
@@ -325,9 +460,10 @@ class InfluxThread(threading.Thread):
                     age = time.monotonic() - timestamp
 
                     if age < queue_seconds:
-                        event_json = self.event_to_json(event)
-                        if event_json:
-                            json.append(event_json)
+                        line = self.event_to_line(event)
+                        if line:
+                            lines.append(line)
+                            size += len(line) + 1
                     else:
                         dropped += 1
 
@@ -335,22 +471,34 @@ class InfluxThread(threading.Thread):
             pass
 
         if dropped:
+            with self._lock:
+                self.dropped_events += dropped
             _LOGGER.warning("Catching up, dropped %d old events", dropped)
 
-        return count, json
+        return count, lines
 
-    def write_to_influxdb(self, json):
-        """Write preprocessed events to influxdb, with retry."""
+    def write_to_influxdb(self, lines):
+        """Write encoded events to influxdb, with retry."""
 
         for retry in range(self.max_tries + 1):
             try:
-                self.influx.write_points(json)
-
-                if self.write_errors:
-                    _LOGGER.error("Resumed, lost %d events", self.write_errors)
-                    self.write_errors = 0
-
-                _LOGGER.debug("Wrote %d events", len(json))
+                start = time.monotonic()
+                self.influx.write_points(lines, protocol="line")
+                latency = time.monotonic() - start
+
+                with self._lock:
+                    self.written_events += len(lines)
+                    self.write_latency = latency
+                    if self.max_write_latency is None or latency > (
+                        self.max_write_latency
+                    ):
+                        self.max_write_latency = latency
+
+                    if self.write_errors:
+                        _LOGGER.error("Resumed, lost %d events", self.write_errors)
+                        self.write_errors = 0
+
+                _LOGGER.debug("Wrote %d events", len(lines))
                 break
             except (
                 exceptions.InfluxDBClientError,
@@ -360,18 +508,47 @@ class InfluxThread(threading.Thread):
                 if retry < self.max_tries:
                     time.sleep(RETRY_DELAY)
                 else:
-                    if not self.write_errors:
-                        _LOGGER.error("Write error: %s", err)
-                    self.write_errors += len(json)
+                    with self._lock:
+                        if not self.write_errors:
+                            _LOGGER.error("Write error: %s", err)
+                        self.write_errors += len(lines)
+                        self.lost_events += len(lines)
+
+    def _write_batch(self, lines, count):
+        """Write a batch in a writer thread and mark its events done."""
+        try:
+            self.write_to_influxdb(lines)
+        finally:
+            self._pending.release()
+            self._task_done(count)
+
+    def _task_done(self, count):
+        """Mark a number of queue items as processed."""
+        for _ in range(count):
+            self.queue.task_done()
 
     def run(self):
         """Process incoming events."""
         while not self.shutdown:
-            count, json = self.get_events_json()
-            if json:
-                self.write_to_influxdb(json)
-            for _ in range(count):
-                self.queue.task_done()
+            count, lines = self.get_events_lines()
+            if lines:
+                self._pending.acquire()
+                self._writers.submit(self._write_batch, lines, count)
+            else:
+                self._task_done(count)
+        self._writers.shutdown()
+
+    def info(self):
+        """Return the queue depth, drop counts and write latency."""
+        with self._lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "written_events": self.written_events,
+                "dropped_events": self.dropped_events,
+                "lost_events": self.lost_events,
+                "write_latency": self.write_latency,
+                "max_write_latency": self.max_write_latency,
+            }
 
     def block_till_done(self):
         """Block till all events processed."""
@@ -1,7 +1,9 @@
 """Event parser and human readable log generator."""
 from datetime import timedelta
 from itertools import groupby
+import json
 import logging
+import re
 import time
 
 from sqlalchemy.exc import SQLAlchemyError
@@ -16,7 +18,13 @@ from homeassistant.components.homekit.const import (
     EVENT_HOMEKIT_CHANGED,
 )
 from homeassistant.components.http import HomeAssistantView
-from homeassistant.components.recorder.models import Events, States
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import (
+    Events,
+    StateAttributes,
+    States,
+    process_timestamp,
+)
 from homeassistant.components.recorder.util import (
     QUERY_RETRY_WAIT,
     RETRIES,
@@ -25,6 +33,7 @@ from homeassistant.components.recorder.util import (
 from homeassistant.const import (
     ATTR_DOMAIN,
     ATTR_ENTITY_ID,
+    ATTR_FRIENDLY_NAME,
     ATTR_HIDDEN,
     ATTR_NAME,
     ATTR_SERVICE,
@@ -41,7 +50,13 @@ from homeassistant.const import (
     STATE_OFF,
     STATE_ON,
 )
-from homeassistant.core import DOMAIN as HA_DOMAIN, State, callback, split_entity_id
+from homeassistant.core import (
+    DOMAIN as HA_DOMAIN,
+    Context,
+    State,
+    callback,
+    split_entity_id,
+)
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entityfilter import generate_filter
 from homeassistant.loader import bind_hass
@@ -181,13 +196,11 @@ class LogbookView(HomeAssistantView):
         end_day = start_day + timedelta(days=period)
         hass = request.app["hass"]
 
-        def json_events():
-            """Fetch events and generate JSON."""
-            return self.json(
-                _get_events(hass, self.config, start_day, end_day, entity_id)
-            )
+        events = await get_instance(hass).async_add_executor_job(
+            _get_events, hass, self.config, start_day, end_day, entity_id
+        )
 
-        return await hass.async_add_job(json_events)
+        return await hass.async_add_job(self.json, events)
 
 
 def humanify(hass, events):
@@ -216,7 +229,7 @@ def humanify(hass, events):
         # Process events
         for event in events_batch:
             if event.event_type == EVENT_STATE_CHANGED:
-                entity_id = event.data.get("entity_id")
+                entity_id = _entity_id_from_state_event(event)
 
                 if entity_id.startswith(domain_prefixes):
                     last_sensor_event[entity_id] = event
@@ -237,7 +250,7 @@ def humanify(hass, events):
         for event in events_batch:
             if event.event_type == EVENT_STATE_CHANGED:
 
-                to_state = State.from_dict(event.data.get("new_state"))
+                to_state = _new_state_from_state_event(event)
 
                 domain = to_state.domain
 
@@ -379,6 +392,100 @@ def humanify(hass, events):
                 }
 
 
+def _entity_id_from_state_event(event):
+    """Return the entity id of a state changed event."""
+    if isinstance(event, LazyEventPartialState):
+        return event.entity_id
+    return event.data.get("entity_id")
+
+
+def _new_state_from_state_event(event):
+    """Return the new state of a state changed event."""
+    if isinstance(event, LazyEventPartialState):
+        # It carries the columns of the state row
+        return event
+    return State.from_dict(event.data.get("new_state"))
+
+
+class LazyEventPartialState:
+    """An event read from a logbook query row, decoded only on access.
+
+    State changes carry the columns of their state row, so they also act
+    as the new state and their event data is rarely decoded.
+    """
+
+    __slots__ = [
+        "_row",
+        "_data",
+        "_attributes",
+        "_attributes_cache",
+        "_context",
+        "event_type",
+        "entity_id",
+        "state",
+        "domain",
+        "time_fired",
+    ]
+
+    def __init__(self, row, attributes_cache=None):
+        """Initialize the event from a row."""
+        self._row = row
+        self._data = None
+        self._attributes = None
+        self._attributes_cache = (
+            attributes_cache if attributes_cache is not None else {}
+        )
+        self._context = None
+        self.event_type = row.event_type
+        self.entity_id = row.entity_id
+        self.state = row.state
+        self.domain = row.domain
+        self.time_fired = process_timestamp(row.time_fired)
+
+    @property
+    def data(self):
+        """Return the decoded event data."""
+        if self._data is None:
+            self._data = json.loads(self._row.event_data)
+        return self._data
+
+    @property
+    def context(self):
+        """Return the context of the event."""
+        if self._context is None:
+            self._context = Context(
+                id=self._row.context_id, user_id=self._row.context_user_id
+            )
+        return self._context
+
+    @property
+    def attributes(self):
+        """Return the decoded attributes of the new state."""
+        if self._attributes is None:
+            attributes = self._row.attributes or self._row.shared_attrs or "{}"
+            decoded = self._attributes_cache.get(attributes)
+            if decoded is None:
+                decoded = self._attributes_cache[attributes] = json.loads(attributes)
+            self._attributes = decoded
+        return self._attributes
+
+    @property
+    def name(self):
+        """Return the name of the new state."""
+        return self.attributes.get(ATTR_FRIENDLY_NAME) or split_entity_id(
+            self.entity_id
+        )[1].replace("_", " ")
+
+    def data_value_is_null(self, key):
+        """Return if a key of the event data is null.
+
+        The event data is only decoded if its JSON could hold a null value.
+        """
+        if not re.search(rf'"{re.escape(key)}"\s*:\s*null', self._row.event_data):
+            return False
+        return self.data.get(key) is None
+
+
 def _get_related_entity_ids(session, entity_filter):
     timer_start = time.perf_counter()
 
@@ -431,21 +538,38 @@ def _get_events(hass, config, start_day, end_day, entity_id=None):
 
     def yield_events(query):
         """Yield Events that are not filtered away."""
+        attributes_cache = {}
         for row in query.yield_per(500):
-            event = row.to_native()
-            if _keep_event(event, entities_filter):
+            event = LazyEventPartialState(row, attributes_cache)
+            if _keep_lazy_event(event, entities_filter):
                 yield event
 
     with session_scope(hass=hass) as session:
         if entity_id is not None:
-            entity_ids = [entity_id.lower()]
+            entity_id = entity_id.lower()
+            entity_ids = [entity_id] if entities_filter(entity_id) else []
         else:
             entity_ids = _get_related_entity_ids(session, entities_filter)
 
         query = (
-            session.query(Events)
+            session.query(
+                Events.event_type,
+                Events.event_data,
+                Events.time_fired,
+                Events.context_id,
+                Events.context_user_id,
+                States.state,
+                States.entity_id,
+                States.domain,
+                States.attributes,
+                StateAttributes.shared_attrs,
+            )
             .order_by(Events.time_fired)
             .outerjoin(States, (Events.event_id == States.event_id))
+            .outerjoin(
+                StateAttributes,
+                (States.attributes_id == StateAttributes.attributes_id),
+            )
             .filter(Events.event_type.in_(ALL_EVENT_TYPES))
             .filter((Events.time_fired > start_day) & (Events.time_fired < end_day))
             .filter(
@@ -460,6 +584,32 @@ def _get_events(hass, config, start_day, end_day, entity_id=None):
         return list(humanify(hass, yield_events(query)))
 
 
+def _keep_lazy_event(event, entities_filter):
+    """Return if an event read by the logbook query should be shown.
+
+    The query already limited state changes to the filtered entities and
+    to rows where the state itself changed.
+    """
+    if event.event_type != EVENT_STATE_CHANGED:
+        return _keep_event(event, entities_filter)
+
+    if event.entity_id is None:
+        return False
+
+    # Do not report on new entities or entity removal
+    if event.data_value_is_null("old_state") or event.data_value_is_null("new_state"):
+        return False
+
+    attributes = event.attributes
+
+    # Also filter auto groups.
+    if event.domain == "group" and attributes.get("auto", False):
+        return False
+
+    # exclude entities which are customized hidden
+    return not attributes.get(ATTR_HIDDEN, False)
+
+
 def _keep_event(event, entities_filter):
     domain, entity_id = None, None
 
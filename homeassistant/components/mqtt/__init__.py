@@ -11,7 +11,7 @@ import socket
 import ssl
 import sys
 import time
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import attr
 import requests.certs
@@ -701,6 +701,86 @@ class Subscription:
     encoding = attr.ib(type=str, default="utf-8")
 
 
+class _TopicNode:
+    """A topic level in the subscription trie."""
+
+    __slots__ = ("children", "subscriptions")
+
+    def __init__(self) -> None:
+        """Initialize the topic level."""
+        self.children: Dict[str, "_TopicNode"] = {}
+        self.subscriptions: List[Subscription] = []
+
+
+class SubscriptionMatcher:
+    """Find the subscriptions matching a topic.
+
+    Subscriptions are stored in a trie with one level per topic level, so
+    matching takes time proportional to the depth of the topic instead of
+    the number of subscriptions.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the matcher."""
+        self._root = _TopicNode()
+
+    def add(self, subscription: Subscription) -> None:
+        """Add a subscription."""
+        node = self._root
+        for level in subscription.topic.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                child = node.children[level] = _TopicNode()
+            node = child
+        node.subscriptions.append(subscription)
+
+    def remove(self, subscription: Subscription) -> None:
+        """Remove a subscription."""
+        path = []
+        node = self._root
+        for level in subscription.topic.split("/"):
+            path.append((node, level))
+            node = node.children[level]
+        node.subscriptions.remove(subscription)
+
+        # Prune the levels that no longer lead to a subscription
+        for parent, level in reversed(path):
+            child = parent.children[level]
+            if child.subscriptions or child.children:
+                break
+            del parent.children[level]
+
+    def match(self, topic: str) -> List[Subscription]:
+        """Return the subscriptions matching topic."""
+        levels = topic.split("/")
+        depth = len(levels)
+        # Wildcards at the first level don't match topics starting with $
+        wildcard_root = not topic.startswith("$")
+        matches: List[Subscription] = []
+        pending = [(self._root, 0)]
+
+        while pending:
+            node, index = pending.pop()
+            children = node.children
+            wildcards = index > 0 or wildcard_root
+
+            if wildcards and "#" in children:
+                matches.extend(children["#"].subscriptions)
+
+            if index == depth:
+                matches.extend(node.subscriptions)
+                continue
+
+            if wildcards and "+" in children:
+                pending.append((children["+"], index + 1))
+
+            child = children.get(levels[index])
+            if child is not None:
+                pending.append((child, index + 1))
+
+        return matches
+
+
 class MQTT:
     """Home Assistant MQTT client."""
 
@@ -733,6 +813,7 @@ class MQTT:
         self.port = port
         self.keepalive = keepalive
         self.subscriptions: List[Subscription] = []
+        self._matcher = SubscriptionMatcher()
         self.birth_message = birth_message
         self.connected = False
         self._mqttc: mqtt.Client = None
@@ -838,6 +919,7 @@ class MQTT:
 
         subscription = Subscription(topic, msg_callback, qos, encoding)
         self.subscriptions.append(subscription)
+        self._matcher.add(subscription)
 
         await self._async_perform_subscription(topic, qos)
 
@@ -847,6 +929,7 @@ class MQTT:
             if subscription not in self.subscriptions:
                 raise HomeAssistantError("Can't remove subscription twice")
             self.subscriptions.remove(subscription)
+            self._matcher.remove(subscription)
 
             if any(other.topic == topic for other in self.subscriptions):
                 # Other subscriptions on topic remaining - don't unsubscribe.
@@ -923,10 +1006,7 @@ class MQTT:
             msg.payload,
         )
 
-        for subscription in self.subscriptions:
-            if not _match_topic(subscription.topic, msg.topic):
-                continue
-
+        for subscription in self._matcher.match(msg.topic):
             payload: SubscribePayloadType = msg.payload
             if subscription.encoding is not None:
                 try:
@@ -986,20 +1066,6 @@ def _raise_on_error(result_code: int) -> None:
         )
 
 
-def _match_topic(subscription: str, topic: str) -> bool:
-    """Test if topic matches subscription."""
-    # pylint: disable=import-outside-toplevel
-    from paho.mqtt.matcher import MQTTMatcher
-
-    matcher = MQTTMatcher()
-    matcher[subscription] = True
-    try:
-        next(matcher.iter_match(topic))
-        return True
-    except StopIteration:
-        return False
-
-
 class MqttAttributes(Entity):
     """Mixin used for platforms that support JSON attributes."""
 
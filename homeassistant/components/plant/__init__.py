@@ -3,9 +3,11 @@ from collections import deque
 from datetime import datetime, timedelta
 import logging
 
+from sqlalchemy.orm import joinedload
 import voluptuous as vol
 
 from homeassistant.components import group
+from homeassistant.components.recorder import get_instance
 from homeassistant.components.recorder.models import States
 from homeassistant.components.recorder.util import execute, session_scope
 from homeassistant.const import (
@@ -300,26 +302,19 @@ class Plant(Entity):
             return
 
         _LOGGER.debug("Initializing values for %s from the database", self._name)
-        with session_scope(hass=self.hass) as session:
-            query = (
-                session.query(States)
-                .filter(
-                    (States.entity_id == entity_id.lower())
-                    and (States.last_updated > start_date)
+        states = await get_instance(self.hass).async_add_executor_job(
+            _load_states_from_db, self.hass, entity_id, start_date
+        )
+
+        for state in states:
+            # filter out all None, NaN and "unknown" states
+            # only keep real values
+            try:
+                self._brightness_history.add_measurement(
+                    int(state.state), state.last_updated
                 )
-                .order_by(States.last_updated.asc())
-            )
-            states = execute(query)
-
-            for state in states:
-                # filter out all None, NaN and "unknown" states
-                # only keep real values
-                try:
-                    self._brightness_history.add_measurement(
-                        int(state.state), state.last_updated
-                    )
-                except ValueError:
-                    pass
+            except ValueError:
+                pass
         _LOGGER.debug("Initializing from database completed")
         self.async_schedule_update_ha_state()
 
@@ -360,6 +355,24 @@ class Plant(Entity):
         return attrib
 
 
+def _load_states_from_db(hass, entity_id, start_date):
+    """Return the recorded states of an entity, oldest first.
+
+    Runs in the executor of the recorder.
+    """
+    with session_scope(hass=hass) as session:
+        query = (
+            session.query(States)
+            .options(joinedload(States.state_attributes))
+            .filter(
+                (States.entity_id == entity_id.lower())
+                and (States.last_updated > start_date)
+            )
+            .order_by(States.last_updated.asc())
+        )
+        return execute(query)
+
+
 class DailyHistory:
     """Stores one measurement per day for a maximum number of days.
 
@@ -4,6 +4,7 @@ import string
 
 from aiohttp import web
 import prometheus_client
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 import voluptuous as vol
 
 from homeassistant import core as hacore
@@ -14,6 +15,7 @@ from homeassistant.const import (
     ATTR_TEMPERATURE,
     ATTR_UNIT_OF_MEASUREMENT,
     CONTENT_TYPE_TEXT_PLAIN,
+    EVENT_HOMEASSISTANT_STOP,
     EVENT_STATE_CHANGED,
     TEMP_CELSIUS,
     TEMP_FAHRENHEIT,
@@ -35,6 +37,7 @@ CONF_COMPONENT_CONFIG_GLOB = "component_config_glob"
 CONF_COMPONENT_CONFIG_DOMAIN = "component_config_domain"
 CONF_DEFAULT_METRIC = "default_metric"
 CONF_OVERRIDE_METRIC = "override_metric"
+CONF_COLLECT_ON_SCRAPE = "collect_on_scrape"
 COMPONENT_CONFIG_SCHEMA_ENTRY = vol.Schema(
     {vol.Optional(CONF_OVERRIDE_METRIC): cv.string}
 )
@@ -47,6 +50,7 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional(CONF_PROM_NAMESPACE): cv.string,
                 vol.Optional(CONF_DEFAULT_METRIC): cv.string,
                 vol.Optional(CONF_OVERRIDE_METRIC): cv.string,
+                vol.Optional(CONF_COLLECT_ON_SCRAPE, default=False): cv.boolean,
                 vol.Optional(CONF_COMPONENT_CONFIG, default={}): vol.Schema(
                     {cv.entity_id: COMPONENT_CONFIG_SCHEMA_ENTRY}
                 ),
@@ -79,7 +83,7 @@ def setup(hass, config):
         conf[CONF_COMPONENT_CONFIG_GLOB],
     )
 
-    metrics = PrometheusMetrics(
+    args = (
         prometheus_client,
         entity_filter,
         namespace,
@@ -89,6 +93,18 @@ def setup(hass, config):
         default_metric,
     )
 
+    if conf[CONF_COLLECT_ON_SCRAPE]:
+        metrics = PrometheusCollector(hass, *args)
+        prometheus_client.REGISTRY.register(metrics)
+
+        def unregister(event):
+            """Remove the collector from the registry."""
+            prometheus_client.REGISTRY.unregister(metrics)
+
+        hass.bus.listen_once(EVENT_HOMEASSISTANT_STOP, unregister)
+    else:
+        metrics = PrometheusMetrics(*args)
+
     hass.bus.listen(EVENT_STATE_CHANGED, metrics.handle_event)
     return True
 
@@ -125,6 +141,7 @@ class PrometheusMetrics:
         else:
             self.metrics_prefix = ""
         self._metrics = {}
+        self._label_cache = {}
         self._climate_units = climate_units
 
     def handle_event(self, event):
@@ -148,7 +165,7 @@ class PrometheusMetrics:
         metric = self._metric(
             "state_change", self.prometheus_cli.Counter, "The number of state changes"
         )
-        metric.labels(**self._labels(state)).inc()
+        metric.labels(*self._labels(state)).inc()
 
     def _metric(self, metric, factory, documentation, labels=None):
         if labels is None:
@@ -184,13 +201,16 @@ class PrometheusMetrics:
             value = 0
         return value
 
-    @staticmethod
-    def _labels(state):
-        return {
-            "entity": state.entity_id,
-            "domain": state.domain,
-            "friendly_name": state.attributes.get("friendly_name"),
-        }
+    def _labels(self, state):
+        """Return the entity, friendly_name and domain label values."""
+        friendly_name = state.attributes.get("friendly_name")
+        cached = self._label_cache.get(state.entity_id)
+        if cached is not None and cached[0] == friendly_name:
+            return cached[1]
+
+        labels = (state.entity_id, str(friendly_name), state.domain)
+        self._label_cache[state.entity_id] = (friendly_name, labels)
+        return labels
 
     def _battery(self, state):
         if "battery_level" in state.attributes:
@@ -201,7 +221,7 @@ class PrometheusMetrics:
             )
             try:
                 value = float(state.attributes["battery_level"])
-                metric.labels(**self._labels(state)).set(value)
+                metric.labels(*self._labels(state)).set(value)
             except ValueError:
                 pass
 
@@ -212,7 +232,7 @@ class PrometheusMetrics:
             "State of the binary sensor (0/1)",
         )
         value = self.state_as_number(state)
-        metric.labels(**self._labels(state)).set(value)
+        metric.labels(*self._labels(state)).set(value)
 
     def _handle_input_boolean(self, state):
         metric = self._metric(
@@ -221,7 +241,7 @@ class PrometheusMetrics:
             "State of the input boolean (0/1)",
         )
         value = self.state_as_number(state)
-        metric.labels(**self._labels(state)).set(value)
+        metric.labels(*self._labels(state)).set(value)
 
     def _handle_device_tracker(self, state):
         metric = self._metric(
@@ -230,14 +250,14 @@ class PrometheusMetrics:
             "State of the device tracker (0/1)",
         )
         value = self.state_as_number(state)
-        metric.labels(**self._labels(state)).set(value)
+        metric.labels(*self._labels(state)).set(value)
 
     def _handle_person(self, state):
         metric = self._metric(
             "person_state", self.prometheus_cli.Gauge, "State of the person (0/1)"
         )
         value = self.state_as_number(state)
-        metric.labels(**self._labels(state)).set(value)
+        metric.labels(*self._labels(state)).set(value)
 
     def _handle_light(self, state):
         metric = self._metric(
@@ -250,7 +270,7 @@ class PrometheusMetrics:
             else:
                 value = self.state_as_number(state)
             value = value * 100
-            metric.labels(**self._labels(state)).set(value)
+            metric.labels(*self._labels(state)).set(value)
         except ValueError:
             pass
 
@@ -259,7 +279,7 @@ class PrometheusMetrics:
             "lock_state", self.prometheus_cli.Gauge, "State of the lock (0/1)"
         )
         value = self.state_as_number(state)
-        metric.labels(**self._labels(state)).set(value)
+        metric.labels(*self._labels(state)).set(value)
 
     def _handle_climate(self, state):
         temp = state.attributes.get(ATTR_TEMPERATURE)
@@ -271,7 +291,7 @@ class PrometheusMetrics:
                 self.prometheus_cli.Gauge,
                 "Temperature in degrees Celsius",
             )
-            metric.labels(**self._labels(state)).set(temp)
+            metric.labels(*self._labels(state)).set(temp)
 
         current_temp = state.attributes.get(ATTR_CURRENT_TEMPERATURE)
         if current_temp:
@@ -282,7 +302,7 @@ class PrometheusMetrics:
                 self.prometheus_cli.Gauge,
                 "Current Temperature in degrees Celsius",
             )
-            metric.labels(**self._labels(state)).set(current_temp)
+            metric.labels(*self._labels(state)).set(current_temp)
 
     def _handle_sensor(self, state):
         unit = self._unit_string(state.attributes.get(ATTR_UNIT_OF_MEASUREMENT))
@@ -301,7 +321,7 @@ class PrometheusMetrics:
                 value = self.state_as_number(state)
                 if unit == TEMP_FAHRENHEIT:
                     value = fahrenheit_to_celsius(value)
-                _metric.labels(**self._labels(state)).set(value)
+                _metric.labels(*self._labels(state)).set(value)
             except ValueError:
                 pass
 
@@ -359,7 +379,7 @@ class PrometheusMetrics:
 
         try:
             value = self.state_as_number(state)
-            metric.labels(**self._labels(state)).set(value)
+            metric.labels(*self._labels(state)).set(value)
         except ValueError:
             pass
 
@@ -373,7 +393,135 @@ class PrometheusMetrics:
             "Count of times an automation has been triggered",
         )
 
-        metric.labels(**self._labels(state)).inc()
+        metric.labels(*self._labels(state)).inc()
+
+
+class PrometheusCollector(PrometheusMetrics):
+    """Build the entity metrics from the state machine when scraped.
+
+    State changes only bump a per entity counter. The gauges are created
+    from the current states when the registry is collected.
+    """
+
+    def __init__(self, hass, *args):
+        """Initialize the Prometheus collector."""
+        super().__init__(*args)
+        self._hass = hass
+        self._included = {}
+        self._handlers = {}
+        self._metric_names = {}
+        self._families = {}
+        self._state_changes = {}
+
+    @hacore.callback
+    def handle_event(self, event):
+        """Count a state change of an included entity."""
+        state = event.data.get("new_state")
+        if state is None or not self._is_included(state.entity_id):
+            return
+
+        changes = self._state_changes.get(state.entity_id)
+        if changes is None:
+            self._state_changes[state.entity_id] = [1, state]
+        else:
+            changes[0] += 1
+            changes[1] = state
+
+    def _is_included(self, entity_id):
+        """Return if the filter includes an entity, memoized."""
+        included = self._included.get(entity_id)
+        if included is None:
+            included = self._included[entity_id] = self._filter(entity_id)
+        return included
+
+    def _metric(self, metric, factory, documentation, labels=None):
+        try:
+            return self._families[metric]
+        except KeyError:
+            pass
+
+        name = self._metric_names.get(metric)
+        if name is None:
+            name = self._metric_names[metric] = self._sanitize_metric_name(
+                f"{self.metrics_prefix}{metric}"
+            )
+
+        if factory is self.prometheus_cli.Counter:
+            family_factory = CounterMetricFamily
+        else:
+            family_factory = GaugeMetricFamily
+        family = family_factory(
+            name, documentation, labels=labels or ["entity", "friendly_name", "domain"]
+        )
+        self._families[metric] = _MetricFamily(family)
+        return self._families[metric]
+
+    def _handle_automation(self, state):
+        """Count triggers from the state changes of the automation."""
+
+    def describe(self):
+        """Return no metrics, so the registry doesn't collect on register."""
+        return []
+
+    def collect(self):
+        """Return the metric families of the current states."""
+        self._families = {}
+
+        for state in self._hass.states.async_all():
+            if not self._is_included(state.entity_id):
+                continue
+
+            domain = state.domain
+            try:
+                handler = self._handlers[domain]
+            except KeyError:
+                handler = self._handlers[domain] = getattr(
+                    self, f"_handle_{domain}", None
+                )
+            if handler is None:
+                continue
+
+            try:
+                handler(state)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error collecting metrics for %s", state.entity_id)
+
+        for count, state in self._state_changes.values():
+            labels = self._labels(state)
+            self._metric(
+                "state_change",
+                self.prometheus_cli.Counter,
+                "The number of state changes",
+            ).labels(*labels).set(count)
+
+            if state.domain == "automation":
+                self._metric(
+                    "automation_triggered_count",
+                    self.prometheus_cli.Counter,
+                    "Count of times an automation has been triggered",
+                ).labels(*labels).set(count)
+
+        families = [metric.family for metric in self._families.values()]
+        self._families = {}
+        return families
+
+
+class _MetricFamily:
+    """Add samples to a metric family like setting a labelled metric."""
+
+    def __init__(self, family):
+        """Initialize the metric family."""
+        self.family = family
+        self._labels = None
+
+    def labels(self, *labels):
+        """Select the label values of the next sample."""
+        self._labels = labels
+        return self
+
+    def set(self, value):
+        """Add a sample with the selected label values."""
+        self.family.add_metric(self._labels, float(value))
 
 
 class PrometheusView(HomeAssistantView):
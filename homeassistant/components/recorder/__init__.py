@@ -8,7 +8,7 @@ import queue
 from sqlite3 import Connection
 import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar, cast
 
 from sqlalchemy import create_engine, exc
 from sqlalchemy.engine import Engine
@@ -17,7 +17,7 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import StaticPool
 import voluptuous as vol
 
-from homeassistant.components import persistent_notification
+from homeassistant.components import persistent_notification, websocket_api
 from homeassistant.const import (
     ATTR_ENTITY_ID,
     CONF_DOMAINS,
@@ -30,19 +30,22 @@ from homeassistant.const import (
     EVENT_TIME_CHANGED,
     MATCH_ALL,
 )
-from homeassistant.core import CoreState, HomeAssistant, callback
+from homeassistant.core import CoreState, Event, HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entityfilter import generate_filter
 from homeassistant.helpers.typing import ConfigType
+from homeassistant.util.async_ import run_callback_threadsafe
 import homeassistant.util.dt as dt_util
 
 from . import migration, purge
 from .const import DATA_INSTANCE
-from .models import Base, Events, RecorderRuns, States
+from .models import Base, Events, RecorderRuns, StateAttributes, States
 from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 DOMAIN = "recorder"
 
 SERVICE_PURGE = "purge"
@@ -63,10 +66,27 @@ DEFAULT_DB_FILE = "home-assistant_v2.db"
 CONF_DB_URL = "db_url"
 CONF_PURGE_KEEP_DAYS = "purge_keep_days"
 CONF_PURGE_INTERVAL = "purge_interval"
+CONF_PURGE_REPACK_THRESHOLD = "purge_repack_threshold"
 CONF_EVENT_TYPES = "event_types"
+CONF_COMMIT_INTERVAL = "commit_interval"
+CONF_COMMIT_BATCH_SIZE = "commit_batch_size"
+CONF_QUEUE_LIMIT = "queue_limit"
+CONF_QUEUE_OVERFLOW = "queue_overflow"
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_COALESCE = "coalesce"
+
+DEFAULT_COMMIT_INTERVAL = 0
+DEFAULT_COMMIT_BATCH_SIZE = 100
 
 CONNECT_RETRY_WAIT = 3
 
+# Number of shared attribute ids the recorder keeps in memory
+ATTRIBUTES_CACHE_SIZE = 2048
+
+# Number of threads running database queries for integrations
+DB_READ_WORKERS = 4
+
 FILTER_SCHEMA = vol.Schema(
     {
         vol.Optional(CONF_EXCLUDE, default={}): vol.Schema(
@@ -95,7 +115,22 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional(CONF_PURGE_INTERVAL, default=1): vol.All(
                     vol.Coerce(int), vol.Range(min=0)
                 ),
+                vol.Optional(CONF_PURGE_REPACK_THRESHOLD, default=0): vol.All(
+                    vol.Coerce(int), vol.Range(min=0)
+                ),
                 vol.Optional(CONF_DB_URL): cv.string,
+                vol.Optional(
+                    CONF_COMMIT_INTERVAL, default=DEFAULT_COMMIT_INTERVAL
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_COMMIT_BATCH_SIZE, default=DEFAULT_COMMIT_BATCH_SIZE
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(CONF_QUEUE_LIMIT, default=0): vol.All(
+                    vol.Coerce(int), vol.Range(min=0)
+                ),
+                vol.Optional(CONF_QUEUE_OVERFLOW, default=OVERFLOW_DROP): vol.In(
+                    [OVERFLOW_DROP, OVERFLOW_COALESCE]
+                ),
             }
         )
     },
@@ -103,6 +138,11 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 
+def get_instance(hass: HomeAssistant) -> "Recorder":
+    """Return the recorder instance."""
+    return cast(Recorder, hass.data[DATA_INSTANCE])
+
+
 def run_information(hass, point_in_time: Optional[datetime] = None):
     """Return information about current run.
 
@@ -133,6 +173,11 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     conf = config[DOMAIN]
     keep_days = conf.get(CONF_PURGE_KEEP_DAYS)
     purge_interval = conf.get(CONF_PURGE_INTERVAL)
+    purge_repack_threshold = conf[CONF_PURGE_REPACK_THRESHOLD]
+    queue_limit = conf[CONF_QUEUE_LIMIT]
+    queue_overflow = conf[CONF_QUEUE_OVERFLOW]
+    commit_interval = conf[CONF_COMMIT_INTERVAL]
+    commit_batch_size = conf[CONF_COMMIT_BATCH_SIZE]
 
     db_url = conf.get(CONF_DB_URL, None)
     if not db_url:
@@ -147,6 +192,11 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
         uri=db_url,
         include=include,
         exclude=exclude,
+        commit_interval=commit_interval,
+        commit_batch_size=commit_batch_size,
+        purge_repack_threshold=purge_repack_threshold,
+        queue_limit=queue_limit,
+        queue_overflow=queue_overflow,
     )
     instance.async_initialize()
     instance.start()
@@ -158,12 +208,115 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     hass.services.async_register(
         DOMAIN, SERVICE_PURGE, async_handle_purge_service, schema=SERVICE_PURGE_SCHEMA
     )
+    websocket_api.async_register_command(hass, websocket_info)
 
     return await instance.async_db_ready
 
 
 PurgeTask = namedtuple("PurgeTask", ["keep_days", "repack"])
 
+# Ask the recorder thread to commit pending events without waiting for
+# the commit interval to pass.
+FLUSH_TASK = object()
+
+
+def _is_evictable(item: Any) -> bool:
+    """Return if a full queue may give up item for a state change."""
+    return isinstance(item, Event) and item.event_type != EVENT_STATE_CHANGED
+
+
+class RecorderQueue(queue.Queue):
+    """Queue of the recorder that keeps count of its evictable events."""
+
+    def _init(self, maxsize: int) -> None:
+        """Initialize the queue."""
+        super()._init(maxsize)
+        self.evictable = 0
+
+    def _put(self, item: Any) -> None:
+        """Put an item at the end of the queue."""
+        if _is_evictable(item):
+            self.evictable += 1
+        super()._put(item)
+
+    def _get(self) -> Any:
+        """Get the first item of the queue."""
+        item = super()._get()
+        if _is_evictable(item):
+            self.evictable -= 1
+        return item
+
+    def replace_evictable(self, item: Any) -> Any:
+        """Replace the oldest evictable event with item at the end.
+
+        Return the evicted event, or None if no event could be evicted.
+        """
+        with self.mutex:
+            if not self.evictable:
+                return None
+            for index, queued in enumerate(self.queue):
+                if _is_evictable(queued):
+                    break
+            del self.queue[index]
+            self.evictable -= 1
+            self._put(item)
+            self.not_empty.notify()
+            return queued
+
+
+class CommitStats:
+    """Counters describing the batched commits of the recorder."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.commits = 0
+        self.events = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def record(self, batch_size: int, latency: float, lag: float = 0.0) -> None:
+        """Record a commit of batch_size events that took latency seconds.
+
+        The lag is how long ago the oldest event of the batch was fired.
+        """
+        self.commits += 1
+        self.events += batch_size
+        self.last_batch_size = batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters as a dictionary."""
+        return {
+            "commits": self.commits,
+            "events": self.events,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "mean_batch_size": self.events / self.commits if self.commits else 0,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "mean_latency": self.total_latency / self.commits if self.commits else 0,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
+
+
+@websocket_api.websocket_command({vol.Required("type"): "recorder/info"})
+@websocket_api.require_admin
+@callback
+def websocket_info(hass, connection, msg):
+    """Return the state of the recorder queue."""
+    connection.send_result(msg["id"], hass.data[DATA_INSTANCE].async_queue_info())
+
 
 class Recorder(threading.Thread):
     """A threaded recorder class."""
@@ -176,6 +329,11 @@ class Recorder(threading.Thread):
         uri: str,
         include: Dict,
         exclude: Dict,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        commit_batch_size: int = DEFAULT_COMMIT_BATCH_SIZE,
+        purge_repack_threshold: int = 0,
+        queue_limit: int = 0,
+        queue_overflow: str = OVERFLOW_DROP,
     ) -> None:
         """Initialize the recorder."""
         threading.Thread.__init__(self, name="Recorder")
@@ -183,7 +341,19 @@ class Recorder(threading.Thread):
         self.hass = hass
         self.keep_days = keep_days
         self.purge_interval = purge_interval
-        self.queue: Any = queue.Queue()
+        self.purge_repack_threshold = purge_repack_threshold
+        self.purge_progress = purge.PurgeProgress()
+        self.commit_interval = commit_interval
+        self.commit_batch_size = commit_batch_size
+        self.commit_stats = CommitStats()
+        self.attributes_ids: Dict[str, int] = {}
+        self.queue: Any = RecorderQueue()
+        self.queue_limit = queue_limit
+        self.queue_overflow = queue_overflow
+        self.dropped_events = 0
+        self.coalesced_events = 0
+        # Latest state change of each entity that did not fit in the queue
+        self._overflow: Dict[str, Any] = {}
         self.recording_start = dt_util.utcnow()
         self.db_url = uri
         self.async_db_ready = asyncio.Future()
@@ -200,6 +370,14 @@ class Recorder(threading.Thread):
 
         self.get_session = None
 
+        # An in-memory database has a single connection shared by all threads
+        read_workers = DB_READ_WORKERS
+        if self.db_url == "sqlite://" or ":memory:" in self.db_url:
+            read_workers = 1
+        self._db_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=read_workers, thread_name_prefix="Recorder Read"
+        )
+
     @callback
     def async_initialize(self):
         """Initialize the recorder."""
@@ -212,6 +390,28 @@ class Recorder(threading.Thread):
 
         self.queue.put(PurgeTask(keep_days, repack))
 
+    def async_add_executor_job(
+        self, target: Callable[..., T], *args: Any
+    ) -> Awaitable[T]:
+        """Run a database query in the executor of the recorder.
+
+        Queries of integrations must run here instead of in the event loop.
+        """
+        return self.hass.loop.run_in_executor(self._db_executor, target, *args)
+
+    @callback
+    def async_queue_info(self) -> Dict[str, Any]:
+        """Return the queue depth, overflow counters and commit statistics."""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_limit": self.queue_limit,
+            "queue_overflow": self.queue_overflow,
+            "overflow_pending": len(self._overflow),
+            "dropped_events": self.dropped_events,
+            "coalesced_events": self.coalesced_events,
+            "commits": self.commit_stats.as_dict(),
+        }
+
     def run(self):
         """Start processing events to save."""
         tries = 1
@@ -261,8 +461,10 @@ class Recorder(threading.Thread):
                 """Shut down the Recorder."""
                 if not hass_started.done():
                     hass_started.set_result(shutdown_task)
+                self._flush_overflow()
                 self.queue.put(None)
                 self.join()
+                self._db_executor.shutdown()
 
             self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, shutdown)
 
@@ -310,19 +512,40 @@ class Recorder(threading.Thread):
 
             self.hass.helpers.event.track_point_in_time(async_purge, run)
 
+        # Events are collected until the batch is full or commit_interval
+        # has passed since the first pending event, and are then written
+        # in a single transaction.
+        pending = []
+        commit_deadline = 0.0
         while True:
-            event = self.queue.get()
+            timeout = None
+            if pending:
+                timeout = max(commit_deadline - time.monotonic(), 0)
+
+            try:
+                event = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self._commit_events(pending)
+                pending = []
+                continue
 
             if event is None:
+                self._commit_events(pending)
                 self._close_run()
                 self._close_connection()
                 self.queue.task_done()
                 return
-            if isinstance(event, PurgeTask):
-                purge.purge_old_data(self, event.keep_days, event.repack)
+            if event is FLUSH_TASK:
+                self._commit_events(pending)
+                pending = []
                 self.queue.task_done()
                 continue
-            if event.event_type == EVENT_TIME_CHANGED:
+            if isinstance(event, PurgeTask):
+                self._commit_events(pending)
+                pending = []
+                if not purge.purge_old_data(self, event.keep_days, event.repack):
+                    # Let the events queued meanwhile in before the next batch
+                    self.queue.put(event)
                 self.queue.task_done()
                 continue
             if event.event_type in self.exclude_t:
@@ -335,62 +558,220 @@ class Recorder(threading.Thread):
                     self.queue.task_done()
                     continue
 
-            tries = 1
-            updated = False
-            while not updated and tries <= 10:
-                if tries != 1:
-                    time.sleep(CONNECT_RETRY_WAIT)
-                try:
-                    with session_scope(session=self.get_session()) as session:
-                        try:
-                            dbevent = Events.from_event(event)
-                            session.add(dbevent)
-                            session.flush()
-                        except (TypeError, ValueError):
-                            _LOGGER.warning("Event is not JSON serializable: %s", event)
-
-                        if event.event_type == EVENT_STATE_CHANGED:
-                            try:
-                                dbstate = States.from_event(event)
-                                dbstate.event_id = dbevent.event_id
-                                session.add(dbstate)
-                            except (TypeError, ValueError):
-                                _LOGGER.warning(
-                                    "State is not JSON serializable: %s",
-                                    event.data.get("new_state"),
-                                )
-
-                    updated = True
-
-                except exc.OperationalError as err:
-                    _LOGGER.error(
-                        "Error in database connectivity: %s. "
-                        "(retrying in %s seconds)",
-                        err,
-                        CONNECT_RETRY_WAIT,
-                    )
-                    tries += 1
+            if not pending:
+                commit_deadline = time.monotonic() + self.commit_interval
+            pending.append(event)
 
-                except exc.SQLAlchemyError:
-                    updated = True
-                    _LOGGER.exception("Error saving event: %s", event)
+            if len(pending) >= self.commit_batch_size:
+                self._commit_events(pending)
+                pending = []
 
-            if not updated:
+    def _commit_events(self, events):
+        """Write events and their states to the database in one transaction."""
+        if not events:
+            return
+
+        timer_start = time.perf_counter()
+        tries = 1
+        updated = False
+        while not updated and tries <= 10:
+            if tries != 1:
+                time.sleep(CONNECT_RETRY_WAIT)
+            try:
+                with session_scope(session=self.get_session()) as session:
+                    new_attributes_ids = self._add_events(session, events)
+
+                updated = True
+                if len(self.attributes_ids) > ATTRIBUTES_CACHE_SIZE:
+                    self.attributes_ids.clear()
+                self.attributes_ids.update(new_attributes_ids)
+
+            except exc.OperationalError as err:
                 _LOGGER.error(
-                    "Error in database update. Could not save "
-                    "after %d tries. Giving up",
-                    tries,
+                    "Error in database connectivity: %s. (retrying in %s seconds)",
+                    err,
+                    CONNECT_RETRY_WAIT,
                 )
+                tries += 1
+
+            except exc.SQLAlchemyError:
+                updated = True
+                if len(events) == 1:
+                    _LOGGER.exception("Error saving event: %s", events[0])
+                else:
+                    _LOGGER.exception(
+                        "Error saving %d events in one transaction, "
+                        "saving them one by one",
+                        len(events),
+                    )
+                    self._commit_events_separately(events)
 
+        if updated:
+            elapsed = time.perf_counter() - timer_start
+            lag = (dt_util.utcnow() - events[0].time_fired).total_seconds()
+            self.commit_stats.record(len(events), elapsed, lag)
+            _LOGGER.debug("Committed %d events in %fs", len(events), elapsed)
+        else:
+            _LOGGER.error(
+                "Error in database update. Could not save after %d tries. Giving up",
+                tries,
+            )
+
+        for _ in events:
             self.queue.task_done()
 
+        if self._overflow:
+            self.hass.add_job(self._async_drain_overflow)
+
+    def _commit_events_separately(self, events):
+        """Write each event in its own transaction.
+
+        Used when a batch failed, so a bad event only loses itself.
+        """
+        # A cached attributes row may be the cause of the failure
+        self.attributes_ids.clear()
+        for event in events:
+            try:
+                with session_scope(session=self.get_session()) as session:
+                    new_attributes_ids = self._add_events(session, [event])
+                self.attributes_ids.update(new_attributes_ids)
+            except exc.SQLAlchemyError:
+                _LOGGER.exception("Error saving event: %s", event)
+
+    def _add_events(self, session, events):
+        """Add the rows for events to session.
+
+        Returns the ids of the shared attributes linked in this batch.
+        """
+        added = []
+        for event in events:
+            try:
+                dbevent = Events.from_event(event)
+            except (TypeError, ValueError):
+                _LOGGER.warning("Event is not JSON serializable: %s", event)
+                continue
+            session.add(dbevent)
+            added.append((event, dbevent))
+
+        # A single flush assigns the ids of all events in the batch
+        session.flush()
+
+        pending_attributes = {}
+        for event, dbevent in added:
+            if event.event_type != EVENT_STATE_CHANGED:
+                continue
+            try:
+                dbstate = States.from_event(event)
+                dbstate.event_id = dbevent.event_id
+                self._link_shared_attributes(session, dbstate, pending_attributes)
+                session.add(dbstate)
+            except (TypeError, ValueError):
+                _LOGGER.warning(
+                    "State is not JSON serializable: %s", event.data.get("new_state")
+                )
+
+        if not pending_attributes:
+            return {}
+
+        session.flush()
+        return {
+            shared_attrs: dbattributes.attributes_id
+            for shared_attrs, dbattributes in pending_attributes.items()
+        }
+
+    def _link_shared_attributes(self, session, dbstate, pending_attributes):
+        """Move the attributes of a state to a shared attributes row."""
+        shared_attrs = dbstate.attributes
+        dbstate.attributes = None
+
+        attributes_id = self.attributes_ids.get(shared_attrs)
+        if attributes_id is not None:
+            dbstate.attributes_id = attributes_id
+            return
+
+        dbattributes = pending_attributes.get(shared_attrs)
+        if dbattributes is None:
+            attributes_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+            dbattributes = (
+                session.query(StateAttributes)
+                .filter(
+                    (StateAttributes.hash == attributes_hash)
+                    & (StateAttributes.shared_attrs == shared_attrs)
+                )
+                .first()
+            )
+            if dbattributes is None:
+                dbattributes = StateAttributes(
+                    hash=attributes_hash, shared_attrs=shared_attrs
+                )
+            pending_attributes[shared_attrs] = dbattributes
+
+        dbstate.state_attributes = dbattributes
+
     @callback
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
+        if event.event_type == EVENT_TIME_CHANGED:
+            return
+        if self._overflow and event.event_type == EVENT_STATE_CHANGED:
+            entity_id = event.data.get(ATTR_ENTITY_ID)
+            # A newer state must not be written before a pending older one
+            if entity_id in self._overflow:
+                self.coalesced_events += 1
+                self._overflow[entity_id] = event
+                return
+        if self.queue_limit and self.queue.qsize() >= self.queue_limit:
+            self._async_handle_overflow(event)
+            return
         self.queue.put(event)
 
+    @callback
+    def _async_handle_overflow(self, event):
+        """Handle an event that does not fit in the queue."""
+        if self.queue_overflow == OVERFLOW_COALESCE:
+            entity_id = event.data.get(ATTR_ENTITY_ID)
+            if event.event_type == EVENT_STATE_CHANGED and entity_id is not None:
+                if entity_id in self._overflow:
+                    self.coalesced_events += 1
+                self._overflow[entity_id] = event
+                return
+
+        elif event.event_type == EVENT_STATE_CHANGED:
+            # State changes matter more for history than other events
+            evicted = self.queue.replace_evictable(event)
+            if evicted is not None:
+                event = evicted
+
+        if not self.dropped_events % 1000:
+            _LOGGER.warning(
+                "Recorder queue is full with %d events, dropping %s",
+                self.queue_limit,
+                event.event_type,
+            )
+        self.dropped_events += 1
+
+    @callback
+    def _async_drain_overflow(self, flush=False):
+        """Move coalesced state changes into the queue.
+
+        Only while there is room, unless flush is set.
+        """
+        while self._overflow and (flush or self.queue.qsize() < self.queue_limit):
+            entity_id = next(iter(self._overflow))
+            self.queue.put(self._overflow.pop(entity_id))
+
+    def _flush_overflow(self):
+        """Move all coalesced state changes into the queue from another thread."""
+        if self._overflow:
+            run_callback_threadsafe(
+                self.hass.loop, self._async_drain_overflow, True
+            ).result()
+
     def block_till_done(self):
         """Block till all events processed."""
+        self._flush_overflow()
+        if self.commit_interval and self.is_alive():
+            self.queue.put(FLUSH_TASK)
         self.queue.join()
 
     def _setup_connection(self):
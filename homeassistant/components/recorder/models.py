@@ -1,9 +1,13 @@
 """Models for SQLAlchemy."""
 from datetime import datetime
+from functools import lru_cache
 import json
 import logging
+from types import MappingProxyType
+import zlib
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -15,6 +19,7 @@ from sqlalchemy import (
     distinct,
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 from sqlalchemy.orm.session import Session
 
 from homeassistant.core import Context, Event, EventOrigin, State, split_entity_id
@@ -25,7 +30,7 @@ import homeassistant.util.dt as dt_util
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 7
+SCHEMA_VERSION = 8
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -65,7 +70,7 @@ class Events(Base):  # type: ignore
                 self.event_type,
                 json.loads(self.event_data),
                 EventOrigin(self.origin),
-                _process_timestamp(self.time_fired),
+                process_timestamp(self.time_fired),
                 context=context,
             )
         except ValueError:
@@ -74,6 +79,20 @@ class Events(Base):  # type: ignore
             return None
 
 
+class StateAttributes(Base):  # type: ignore
+    """State attribute data shared between states."""
+
+    __tablename__ = "state_attributes"
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the hash of json encoded shared attributes."""
+        return zlib.crc32(shared_attrs.encode("utf-8"))
+
+
 class States(Base):  # type: ignore
     """State change history."""
 
@@ -84,6 +103,9 @@ class States(Base):  # type: ignore
     state = Column(String(255))
     attributes = Column(Text)
     event_id = Column(Integer, ForeignKey("events.event_id"), index=True)
+    attributes_id = Column(
+        Integer, ForeignKey("state_attributes.attributes_id"), index=True
+    )
     last_changed = Column(DateTime(timezone=True), default=datetime.utcnow)
     last_updated = Column(DateTime(timezone=True), default=datetime.utcnow, index=True)
     created = Column(DateTime(timezone=True), default=datetime.utcnow)
@@ -97,6 +119,9 @@ class States(Base):  # type: ignore
         Index("ix_states_entity_id_last_updated", "entity_id", "last_updated"),
     )
 
+    # Queries that convert rows to native states load this with joinedload
+    state_attributes = relationship(StateAttributes)
+
     @staticmethod
     def from_event(event):
         """Create object from a state_changed event."""
@@ -130,12 +155,18 @@ class States(Base):  # type: ignore
         """Convert to an HA state object."""
         context = Context(id=self.context_id, user_id=self.context_user_id)
         try:
+            if self.attributes is not None:
+                attributes = json.loads(self.attributes)
+            elif self.state_attributes is not None:
+                attributes = _decode_shared_attrs(self.state_attributes.shared_attrs)
+            else:
+                attributes = {}
             return State(
                 self.entity_id,
                 self.state,
-                json.loads(self.attributes),
-                _process_timestamp(self.last_changed),
-                _process_timestamp(self.last_updated),
+                attributes,
+                process_timestamp(self.last_changed),
+                process_timestamp(self.last_updated),
                 context=context,
                 # Temp, because database can still store invalid entity IDs
                 # Remove with 1.0 or in 2020.
@@ -194,7 +225,16 @@ class SchemaChanges(Base):  # type: ignore
     changed = Column(DateTime(timezone=True), default=datetime.utcnow)
 
 
-def _process_timestamp(ts):
+@lru_cache(maxsize=1024)
+def _decode_shared_attrs(shared_attrs):
+    """Decode shared attributes, reusing the result for identical rows.
+
+    The result is read-only, as the states of all those rows share it.
+    """
+    return MappingProxyType(json.loads(shared_attrs))
+
+
+def process_timestamp(ts):
     """Process a timestamp into datetime object."""
     if ts is None:
         return None
@@ -2,41 +2,127 @@
 from datetime import timedelta
 import logging
 
+from sqlalchemy import exists
 from sqlalchemy.exc import SQLAlchemyError
 
 import homeassistant.util.dt as dt_util
 
-from .models import Events, States
+from .models import Events, StateAttributes, States
 from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Maximum number of rows deleted from a table before the recorder gets
+# to process its queue again
+PURGE_BATCH_SIZE = 1000
+
+
+class PurgeProgress:
+    """Progress of an incremental purge."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.batches = 0
+        self.states = 0
+        self.events = 0
+        self.rows_since_repack = 0
+
+    def reset(self) -> None:
+        """Reset the counters of the current purge."""
+        self.batches = 0
+        self.states = 0
+        self.events = 0
+
 
 def purge_old_data(instance, purge_days, repack):
-    """Purge events and states older than purge_days ago."""
+    """Purge one batch of events and states older than purge_days ago.
+
+    Return True when nothing older is left, so the purge is finished.
+    """
     purge_before = dt_util.utcnow() - timedelta(days=purge_days)
+    progress = instance.purge_progress
     _LOGGER.debug("Purging events before %s", purge_before)
 
     try:
         with session_scope(session=instance.get_session()) as session:
-            deleted_rows = (
-                session.query(States)
-                .filter((States.last_updated < purge_before))
-                .delete(synchronize_session=False)
+            deleted_rows, finished = _purge_batch(
+                session, States, States.state_id, States.last_updated < purge_before
             )
+            progress.states += deleted_rows
             _LOGGER.debug("Deleted %s states", deleted_rows)
 
-            deleted_rows = (
-                session.query(Events)
-                .filter((Events.time_fired < purge_before))
-                .delete(synchronize_session=False)
+            # Events are only deleted when no old state refers to them anymore
+            if finished:
+                deleted_rows, finished = _purge_batch(
+                    session, Events, Events.event_id, Events.time_fired < purge_before
+                )
+                progress.events += deleted_rows
+                _LOGGER.debug("Deleted %s events", deleted_rows)
+
+            if finished:
+                deleted_rows, finished = _purge_batch(
+                    session,
+                    StateAttributes,
+                    StateAttributes.attributes_id,
+                    ~exists().where(
+                        States.attributes_id == StateAttributes.attributes_id
+                    ),
+                )
+                instance.attributes_ids.clear()
+                _LOGGER.debug("Deleted %s shared attributes", deleted_rows)
+
+        progress.batches += 1
+        if not finished:
+            _LOGGER.debug(
+                "Purged %s states and %s events so far",
+                progress.states,
+                progress.events,
             )
-            _LOGGER.debug("Deleted %s events", deleted_rows)
+            return False
+
+        _LOGGER.info(
+            "Purged %s states and %s events in %s batches",
+            progress.states,
+            progress.events,
+            progress.batches,
+        )
+        progress.rows_since_repack += progress.states + progress.events
+        progress.reset()
+
+        threshold = instance.purge_repack_threshold
+        if threshold and progress.rows_since_repack >= threshold:
+            repack = True
 
         # Execute sqlite vacuum command to free up space on disk
         if repack and instance.engine.driver in ("pysqlite", "postgresql"):
             _LOGGER.debug("Vacuuming SQL DB to free space")
             instance.engine.execute("VACUUM")
+            progress.rows_since_repack = 0
 
     except SQLAlchemyError as err:
         _LOGGER.warning("Error purging history: %s.", err)
+        progress.reset()
+
+    return True
+
+
+def _purge_batch(session, table, id_column, criterion):
+    """Delete the rows of a table matching criterion up to the batch size.
+
+    Rows are deleted in the order of id_column. Return the number of
+    deleted rows and whether no matching rows are left.
+    """
+    last_id = (
+        session.query(id_column)
+        .filter(criterion)
+        .order_by(id_column)
+        .offset(PURGE_BATCH_SIZE - 1)
+        .limit(1)
+        .scalar()
+    )
+
+    query = session.query(table).filter(criterion)
+    if last_id is not None:
+        query = query.filter(id_column <= last_id)
+
+    return query.delete(synchronize_session=False), last_id is None
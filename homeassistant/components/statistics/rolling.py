@@ -0,0 +1,113 @@
+"""Rolling window statistics for the statistics sensor."""
+from bisect import bisect_left, insort
+from collections import deque
+import math
+from typing import Deque, List, Optional
+
+
+class RollingStatistics:
+    """Statistics of a window of values that are removed in insertion order.
+
+    The total, mean and variance are updated for each added and removed value
+    (Welford's algorithm). A sorted copy of the window gives the median,
+    minimum and maximum. The running sums are recomputed from the window once
+    every window length of removals, so rounding errors can't build up.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None) -> None:
+        """Initialize an empty window holding at most maxlen values."""
+        self.maxlen = maxlen
+        self.values: Deque[float] = deque()
+        self._sorted: List[float] = []
+        self._total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._removed = 0
+
+    def __len__(self) -> int:
+        """Return the number of values in the window."""
+        return len(self.values)
+
+    def append(self, value: float) -> None:
+        """Add a value, removing the oldest one if the window is full."""
+        if self.maxlen is not None and len(self.values) >= self.maxlen:
+            self.popleft()
+
+        self.values.append(value)
+        insort(self._sorted, value)
+        self._total += value
+        delta = value - self._mean
+        self._mean += delta / len(self.values)
+        self._m2 += delta * (value - self._mean)
+
+    def popleft(self) -> float:
+        """Remove and return the oldest value."""
+        value = self.values.popleft()
+        del self._sorted[bisect_left(self._sorted, value)]
+
+        count = len(self.values)
+        self._removed += 1
+        if self._removed >= count:
+            self._recompute()
+            return value
+
+        self._total -= value
+        delta = value - self._mean
+        self._mean -= delta / count
+        self._m2 -= delta * (value - self._mean)
+        return value
+
+    def _recompute(self) -> None:
+        """Compute the running sums from the values in the window."""
+        self._removed = 0
+        if not self.values:
+            self._total = self._mean = self._m2 = 0.0
+            return
+
+        self._total = math.fsum(self.values)
+        self._mean = self._total / len(self.values)
+        self._m2 = math.fsum((value - self._mean) ** 2 for value in self.values)
+
+    @property
+    def total(self) -> float:
+        """Return the sum of the values."""
+        return self._total
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Return the mean, or None if the window is empty."""
+        return self._mean if self.values else None
+
+    @property
+    def median(self) -> Optional[float]:
+        """Return the median, or None if the window is empty."""
+        count = len(self._sorted)
+        if not count:
+            return None
+        middle = count // 2
+        if count % 2:
+            return self._sorted[middle]
+        return (self._sorted[middle - 1] + self._sorted[middle]) / 2
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Return the sample variance, or None with less than two values."""
+        if len(self.values) < 2:
+            return None
+        return max(self._m2, 0.0) / (len(self.values) - 1)
+
+    @property
+    def stdev(self) -> Optional[float]:
+        """Return the sample standard deviation, or None with less than two values."""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    @property
+    def min(self) -> Optional[float]:
+        """Return the smallest value, or None if the window is empty."""
+        return self._sorted[0] if self._sorted else None
+
+    @property
+    def max(self) -> Optional[float]:
+        """Return the largest value, or None if the window is empty."""
+        return self._sorted[-1] if self._sorted else None
@@ -1,10 +1,12 @@
 """Support for statistics for sensor values."""
 from collections import deque
 import logging
-import statistics
+import math
 
+from sqlalchemy.orm import joinedload
 import voluptuous as vol
 
+from homeassistant.components.recorder import get_instance
 from homeassistant.components.recorder.models import States
 from homeassistant.components.recorder.util import execute, session_scope
 from homeassistant.components.sensor import PLATFORM_SCHEMA
@@ -22,6 +24,8 @@ from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import async_track_state_change
 from homeassistant.util import dt as dt_util
 
+from .rolling import RollingStatistics
+
 _LOGGER = logging.getLogger(__name__)
 
 ATTR_AVERAGE_CHANGE = "average_change"
@@ -88,7 +92,12 @@ class StatisticsSensor(Entity):
         self._max_age = max_age
         self._precision = precision
         self._unit_of_measurement = None
-        self.states = deque(maxlen=self._sampling_size)
+        self._stats = None
+        if self.is_binary:
+            self.states = deque(maxlen=self._sampling_size)
+        else:
+            self._stats = RollingStatistics(self._sampling_size)
+            self.states = self._stats.values
         self.ages = deque(maxlen=self._sampling_size)
 
         self.count = 0
@@ -137,7 +146,10 @@ class StatisticsSensor(Entity):
             if self.is_binary:
                 self.states.append(new_state.state)
             else:
-                self.states.append(float(new_state.state))
+                value = float(new_state.state)
+                if not math.isfinite(value):
+                    raise ValueError
+                self._stats.append(value)
 
             self.ages.append(new_state.last_updated)
         except ValueError:
@@ -212,7 +224,10 @@ class StatisticsSensor(Entity):
                 (now - self.ages[0]),
             )
             self.ages.popleft()
-            self.states.popleft()
+            if self.is_binary:
+                self.states.popleft()
+            else:
+                self._stats.popleft()
 
     async def async_update(self):
         """Get the latest data and updates the states."""
@@ -223,24 +238,26 @@ class StatisticsSensor(Entity):
         self.count = len(self.states)
 
         if not self.is_binary:
-            try:  # require only one data point
-                self.mean = round(statistics.mean(self.states), self._precision)
-                self.median = round(statistics.median(self.states), self._precision)
-            except statistics.StatisticsError as err:
-                _LOGGER.debug("%s: %s", self.entity_id, err)
+            stats = self._stats
+
+            if stats.mean is not None:  # require only one data point
+                self.mean = round(stats.mean, self._precision)
+                self.median = round(stats.median, self._precision)
+            else:
+                _LOGGER.debug("%s: no data points", self.entity_id)
                 self.mean = self.median = STATE_UNKNOWN
 
-            try:  # require at least two data points
-                self.stdev = round(statistics.stdev(self.states), self._precision)
-                self.variance = round(statistics.variance(self.states), self._precision)
-            except statistics.StatisticsError as err:
-                _LOGGER.debug("%s: %s", self.entity_id, err)
+            if stats.variance is not None:  # require at least two data points
+                self.stdev = round(stats.stdev, self._precision)
+                self.variance = round(stats.variance, self._precision)
+            else:
+                _LOGGER.debug("%s: less than two data points", self.entity_id)
                 self.stdev = self.variance = STATE_UNKNOWN
 
             if self.states:
-                self.total = round(sum(self.states), self._precision)
-                self.min = round(min(self.states), self._precision)
-                self.max = round(max(self.states), self._precision)
+                self.total = round(stats.total, self._precision)
+                self.min = round(stats.min, self._precision)
+                self.max = round(stats.max, self._precision)
 
                 self.min_age = self.ages[0]
                 self.max_age = self.ages[-1]
@@ -279,9 +296,27 @@ class StatisticsSensor(Entity):
 
         _LOGGER.debug("%s: initializing values from the database", self.entity_id)
 
+        states = await get_instance(self.hass).async_add_executor_job(
+            self._load_states_from_database
+        )
+
+        for state in reversed(states):
+            self._add_state_to_queue(state)
+
+        self.async_schedule_update_ha_state(True)
+
+        _LOGGER.debug("%s: initializing from database completed", self.entity_id)
+
+    def _load_states_from_database(self):
+        """Return the most recent states of the source sensor, newest first.
+
+        Runs in the executor of the recorder.
+        """
         with session_scope(hass=self.hass) as session:
-            query = session.query(States).filter(
-                States.entity_id == self._entity_id.lower()
+            query = (
+                session.query(States)
+                .options(joinedload(States.state_attributes))
+                .filter(States.entity_id == self._entity_id.lower())
             )
 
             if self._max_age is not None:
@@ -298,11 +333,4 @@ class StatisticsSensor(Entity):
             query = query.order_by(States.last_updated.desc()).limit(
                 self._sampling_size
             )
-            states = execute(query)
-
-        for state in reversed(states):
-            self._add_state_to_queue(state)
-
-        self.async_schedule_update_ha_state(True)
-
-        _LOGGER.debug("%s: initializing from database completed", self.entity_id)
+            return execute(query)
@@ -20,15 +20,17 @@ from homeassistant.const import (
     CONF_SENSORS,
     CONF_VALUE_TEMPLATE,
     EVENT_HOMEASSISTANT_START,
-    MATCH_ALL,
 )
 from homeassistant.core import callback
 from homeassistant.exceptions import TemplateError
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import Entity, async_generate_entity_id
-from homeassistant.helpers.event import async_track_state_change
+from homeassistant.helpers.event import (
+    async_track_state_change,
+    async_track_template_result,
+)
 
-from . import extract_entities, initialise_templates
+from . import initialise_templates
 from .const import CONF_AVAILABILITY_TEMPLATE
 
 CONF_ATTRIBUTE_TEMPLATES = "attribute_templates"
@@ -81,13 +83,7 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
         }
 
         initialise_templates(hass, templates, attribute_templates)
-        entity_ids = extract_entities(
-            device,
-            "sensor",
-            device_config.get(ATTR_ENTITY_ID),
-            templates,
-            attribute_templates,
-        )
+        entity_ids = device_config.get(ATTR_ENTITY_ID)
 
         sensors.append(
             SensorTemplate(
@@ -149,6 +145,7 @@ class SensorTemplate(Entity):
         self._available = True
         self._attribute_templates = attribute_templates
         self._attributes = {}
+        self._results = {}
 
     async def async_added_to_hass(self):
         """Register callbacks."""
@@ -158,14 +155,32 @@ class SensorTemplate(Entity):
             """Handle device state changes."""
             self.async_schedule_update_ha_state(True)
 
+        def template_listener(template):
+            """Return a listener that keeps the result of a template."""
+
+            @callback
+            def template_sensor_template_listener(event, result):
+                """Handle a changed state the template accessed."""
+                self._results[template] = result
+                self.async_schedule_update_ha_state(True)
+
+            return template_sensor_template_listener
+
         @callback
         def template_sensor_startup(event):
             """Update template on startup."""
-            if self._entities != MATCH_ALL:
-                # Track state change only for valid templates
+            if self._entities is not None:
                 async_track_state_change(
                     self.hass, self._entities, template_sensor_state_listener
                 )
+            else:
+                # Follow the states the templates access while rendering
+                for template in self._templates():
+                    self.async_on_remove(
+                        async_track_template_result(
+                            self.hass, template, template_listener(template)
+                        )
+                    )
 
             self.async_schedule_update_ha_state(True)
 
@@ -173,6 +188,27 @@ class SensorTemplate(Entity):
             EVENT_HOMEASSISTANT_START, template_sensor_startup
         )
 
+    def _templates(self):
+        """Return all templates of the sensor."""
+        templates = [
+            self._template,
+            self._icon_template,
+            self._entity_picture_template,
+            self._friendly_name_template,
+            self._availability_template,
+            *self._attribute_templates.values(),
+        ]
+        return [template for template in templates if template is not None]
+
+    def _render(self, template):
+        """Return the result the tracker rendered or render the template."""
+        result = self._results.pop(template, None)
+        if result is None:
+            return template.async_render()
+        if isinstance(result, TemplateError):
+            raise result
+        return result
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -221,7 +257,7 @@ class SensorTemplate(Entity):
     async def async_update(self):
         """Update the state from the template."""
         try:
-            self._state = self._template.async_render()
+            self._state = self._render(self._template)
             self._available = True
         except TemplateError as ex:
             self._available = False
@@ -239,7 +275,7 @@ class SensorTemplate(Entity):
         attrs = {}
         for key, value in self._attribute_templates.items():
             try:
-                attrs[key] = value.async_render()
+                attrs[key] = self._render(value)
             except TemplateError as err:
                 _LOGGER.error("Error rendering attribute %s: %s", key, err)
 
@@ -257,7 +293,7 @@ class SensorTemplate(Entity):
                 continue
 
             try:
-                value = template.async_render()
+                value = self._render(template)
                 if property_name == "_available":
                     value = value.lower() == "true"
                 setattr(self, property_name, value)
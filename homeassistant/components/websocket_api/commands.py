@@ -21,10 +21,12 @@ def async_register_commands(hass, async_reg):
     async_reg(hass, handle_unsubscribe_events)
     async_reg(hass, handle_call_service)
     async_reg(hass, handle_get_states)
+    async_reg(hass, handle_subscribe_entities)
     async_reg(hass, handle_get_services)
     async_reg(hass, handle_get_config)
     async_reg(hass, handle_ping)
     async_reg(hass, handle_render_template)
+    async_reg(hass, handle_supported_features)
 
 
 def pong_message(iden):
@@ -32,6 +34,18 @@ def pong_message(iden):
     return {"id": iden, "type": "pong"}
 
 
+def _event_message(iden, event):
+    """Return an event message, reusing the cached JSON of the event.
+
+    Events that cannot be serialized are passed on as a dict so the
+    connection writer reports the error to the client.
+    """
+    try:
+        return messages.event_json_message(iden, event)
+    except (ValueError, TypeError):
+        return messages.event_message(iden, event.as_dict())
+
+
 @callback
 @decorators.websocket_command(
     {
@@ -58,12 +72,17 @@ def handle_subscribe_events(hass, connection, msg):
         @callback
         def forward_events(event):
             """Forward state changed events to websocket."""
-            if not connection.user.permissions.check_entity(
-                event.data["entity_id"], POLICY_READ
-            ):
+            entity_id = event.data["entity_id"]
+            if not connection.user.permissions.check_entity(entity_id, POLICY_READ):
                 return
 
-            connection.send_message(messages.event_message(msg["id"], event))
+            supersede_key = None
+            if connection.supported_features.get(const.FEATURE_SUPERSEDE_STATES):
+                supersede_key = (msg["id"], entity_id)
+
+            connection.send_message(
+                _event_message(msg["id"], event), supersede_key=supersede_key
+            )
 
     else:
 
@@ -73,7 +92,7 @@ def handle_subscribe_events(hass, connection, msg):
             if event.event_type == EVENT_TIME_CHANGED:
                 return
 
-            connection.send_message(messages.event_message(msg["id"], event.as_dict()))
+            connection.send_message(_event_message(msg["id"], event))
 
     connection.subscriptions[msg["id"]] = hass.bus.async_listen(
         event_type, forward_events
@@ -178,7 +197,92 @@ def handle_get_states(hass, connection, msg):
             if entity_perm(state.entity_id, "read")
         ]
 
-    connection.send_message(messages.result_message(msg["id"], states))
+    # Reuse the JSON each state caches for all connections
+    try:
+        states_json = "[{}]".format(",".join(state.as_json() for state in states))
+    except (ValueError, TypeError):
+        # Let the connection writer report the error to the client
+        connection.send_message(messages.result_message(msg["id"], states))
+        return
+
+    connection.send_message(messages.result_json_message(msg["id"], states_json))
+
+
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "subscribe_entities",
+        vol.Optional("entity_ids"): cv.entity_ids,
+    }
+)
+def handle_subscribe_entities(hass, connection, msg):
+    """Handle subscribe entities command.
+
+    Sends a compressed snapshot of the states followed by only the fields
+    that changed. Read permission is checked once per entity for the
+    lifetime of the subscription.
+
+    Async friendly.
+    """
+    entity_ids = msg.get("entity_ids")
+    if entity_ids is not None:
+        entity_ids = set(entity_ids)
+    check_entity = connection.user.permissions.check_entity
+    allowed = {}
+
+    @callback
+    def can_read(entity_id):
+        """Return if the user may read the entity, checking it only once."""
+        readable = allowed.get(entity_id)
+        if readable is None:
+            readable = allowed[entity_id] = (
+                entity_ids is None or entity_id in entity_ids
+            ) and check_entity(entity_id, POLICY_READ)
+        return readable
+
+    @callback
+    def forward_entity_changes(event):
+        """Forward the changed fields of an entity to websocket."""
+        entity_id = event.data["entity_id"]
+        if not can_read(entity_id):
+            return
+
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+
+        if new_state is None:
+            change = {messages.ENTITY_EVENT_REMOVE: [entity_id]}
+        elif old_state is None:
+            change = {
+                messages.ENTITY_EVENT_ADD: {
+                    entity_id: messages.compressed_state_dict(new_state)
+                }
+            }
+        else:
+            change = {
+                messages.ENTITY_EVENT_CHANGE: {
+                    entity_id: messages.compressed_state_diff(old_state, new_state)
+                }
+            }
+
+        connection.send_message(messages.event_message(msg["id"], change))
+
+    connection.subscriptions[msg["id"]] = hass.bus.async_listen(
+        EVENT_STATE_CHANGED, forward_entity_changes
+    )
+    connection.send_message(messages.result_message(msg["id"]))
+    connection.send_message(
+        messages.event_message(
+            msg["id"],
+            {
+                messages.ENTITY_EVENT_ADD: {
+                    state.entity_id: messages.compressed_state_dict(state)
+                    for state in hass.states.async_all()
+                    if can_read(state.entity_id)
+                }
+            },
+        )
+    )
 
 
 @decorators.async_response
@@ -202,6 +306,19 @@ def handle_get_config(hass, connection, msg):
     connection.send_message(messages.result_message(msg["id"], hass.config.as_dict()))
 
 
+@callback
+@decorators.websocket_command(
+    {vol.Required("type"): "supported_features", vol.Required("features"): {str: int}}
+)
+def handle_supported_features(hass, connection, msg):
+    """Handle setting the features the client supports.
+
+    Async friendly.
+    """
+    connection.supported_features = msg["features"]
+    connection.send_result(msg["id"])
+
+
 @callback
 @decorators.websocket_command({vol.Required("type"): "ping"})
 def handle_ping(hass, connection, msg):
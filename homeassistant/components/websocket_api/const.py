@@ -1,10 +1,9 @@
 """Websocket constants."""
 import asyncio
 from concurrent import futures
-from functools import partial
-import json
 
-from homeassistant.helpers.json import JSONEncoder
+# pylint: disable=unused-import
+from homeassistant.util.json import JSON_DUMP  # noqa: F401
 
 DOMAIN = "websocket_api"
 URL = "/api/websocket"
@@ -33,4 +32,7 @@ SIGNAL_WEBSOCKET_DISCONNECTED = "websocket_disconnected"
 # Data used to store the current connection list
 DATA_CONNECTIONS = DOMAIN + ".connections"
 
-JSON_DUMP = partial(json.dumps, cls=JSONEncoder, allow_nan=False)
+# Features a client can opt in to with the supported_features command
+FEATURE_COALESCE_MESSAGES = "coalesce_messages"
+# Only the latest pending state_changed event of an entity is sent
+FEATURE_SUPERSEDE_STATES = "supersede_states"
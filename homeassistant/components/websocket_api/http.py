@@ -2,7 +2,7 @@
 import asyncio
 from contextlib import suppress
 import logging
-from typing import Optional
+from typing import Dict, Hashable, List, Optional
 
 from aiohttp import WSMsgType, web
 import async_timeout
@@ -16,6 +16,7 @@ from .const import (
     CANCELLATION_ERRORS,
     DATA_CONNECTIONS,
     ERR_UNKNOWN_ERROR,
+    FEATURE_COALESCE_MESSAGES,
     JSON_DUMP,
     MAX_PENDING_MSG,
     SIGNAL_WEBSOCKET_CONNECTED,
@@ -49,6 +50,8 @@ class WebSocketHandler:
         self.request = request
         self.wsock: Optional[web.WebSocketResponse] = None
         self._to_write: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_MSG)
+        self._superseded: Dict[Hashable, List] = {}
+        self._connection = None
         self._handle_task = None
         self._writer_task = None
         self._logger = logging.getLogger("{}.connection.{}".format(__name__, id(self)))
@@ -58,39 +61,75 @@ class WebSocketHandler:
         # Exceptions if Socket disconnected or cancelled by connection handler
         with suppress(RuntimeError, ConnectionResetError, *CANCELLATION_ERRORS):
             while not self.wsock.closed:
-                message = await self._to_write.get()
+                message = self._unwrap(await self._to_write.get())
                 if message is None:
                     break
 
-                self._logger.debug("Sending %s", message)
+                dumped = self._dump(message)
 
-                if isinstance(message, str):
-                    await self.wsock.send_str(message)
-                    continue
-
-                try:
-                    dumped = JSON_DUMP(message)
-                except (ValueError, TypeError) as err:
-                    self._logger.error(
-                        "Unable to serialize to JSON: %s\n%s", err, message
-                    )
-                    await self.wsock.send_json(
-                        error_message(
-                            message["id"], ERR_UNKNOWN_ERROR, "Invalid JSON in response"
-                        )
+                if self._to_write.empty() or not (
+                    self._connection is not None
+                    and self._connection.supported_features.get(
+                        FEATURE_COALESCE_MESSAGES
                     )
+                ):
+                    await self.wsock.send_str(dumped)
                     continue
 
-                await self.wsock.send_str(dumped)
+                # Send everything that is pending as one JSON array
+                coalesced = [dumped]
+                while not self._to_write.empty():
+                    message = self._unwrap(self._to_write.get_nowait())
+                    if message is None:
+                        break
+                    coalesced.append(self._dump(message))
+
+                await self.wsock.send_str("[{}]".format(",".join(coalesced)))
+
+                if message is None:
+                    break
+
+    def _unwrap(self, message):
+        """Return a queued message, resolving superseded state messages."""
+        if isinstance(message, list):
+            message, key = message
+            self._superseded.pop(key)
+        return message
+
+    def _dump(self, message):
+        """Return a message serialized to JSON."""
+        self._logger.debug("Sending %s", message)
+
+        if isinstance(message, str):
+            return message
+
+        try:
+            return JSON_DUMP(message)
+        except (ValueError, TypeError) as err:
+            self._logger.error("Unable to serialize to JSON: %s\n%s", err, message)
+            return JSON_DUMP(
+                error_message(
+                    message["id"], ERR_UNKNOWN_ERROR, "Invalid JSON in response"
+                )
+            )
 
     @callback
-    def _send_message(self, message):
+    def _send_message(self, message, supersede_key=None):
         """Send a message to the client.
 
-        Closes connection if the client is not reading the messages.
+        A message with a supersede key replaces a message with the same key
+        that is still waiting to be written, like an older state of the same
+        entity. Closes connection if the client is not reading the messages.
 
         Async friendly.
         """
+        if supersede_key is not None:
+            pending = self._superseded.get(supersede_key)
+            if pending is not None:
+                pending[0] = message
+                return
+            message = self._superseded[supersede_key] = [message, supersede_key]
+
         try:
             self._to_write.put_nowait(message)
         except asyncio.QueueFull:
@@ -159,7 +198,7 @@ class WebSocketHandler:
                 raise Disconnect
 
             self._logger.debug("Received %s", msg_data)
-            connection = await auth.async_handle(msg_data)
+            connection = self._connection = await auth.async_handle(msg_data)
             self.hass.data[DATA_CONNECTIONS] = (
                 self.hass.data.get(DATA_CONNECTIONS, 0) + 1
             )
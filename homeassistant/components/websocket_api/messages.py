@@ -8,6 +8,22 @@ from . import const
 
 # mypy: allow-untyped-defs
 
+# Keys of the compressed states sent to entity subscriptions
+COMPRESSED_STATE_STATE = "s"
+COMPRESSED_STATE_ATTRIBUTES = "a"
+COMPRESSED_STATE_CONTEXT = "c"
+COMPRESSED_STATE_LAST_CHANGED = "lc"
+COMPRESSED_STATE_LAST_UPDATED = "lu"
+
+# Keys of the entity subscription events
+ENTITY_EVENT_ADD = "a"
+ENTITY_EVENT_CHANGE = "c"
+ENTITY_EVENT_REMOVE = "r"
+
+# Keys of a compressed state diff
+STATE_DIFF_ADDITIONS = "+"
+STATE_DIFF_REMOVALS = "-"
+
 # Minimal requirements of a message
 MINIMAL_MESSAGE_SCHEMA = vol.Schema(
     {vol.Required("id"): cv.positive_int, vol.Required("type"): cv.string},
@@ -23,6 +39,13 @@ def result_message(iden, result=None):
     return {"id": iden, "type": const.TYPE_RESULT, "success": True, "result": result}
 
 
+def result_json_message(iden, result_json):
+    """Return a success result message with the result JSON already encoded."""
+    return '{{"id": {}, "type": "{}", "success": true, "result": {}}}'.format(
+        iden, const.TYPE_RESULT, result_json
+    )
+
+
 def error_message(iden, code, message):
     """Return an error result message."""
     return {
@@ -36,3 +59,70 @@ def error_message(iden, code, message):
 def event_message(iden, event):
     """Return an event message."""
     return {"id": iden, "type": "event", "event": event}
+
+
+def event_json_message(iden, event):
+    """Return an event message with the event JSON already encoded.
+
+    The event itself is only serialized once, no matter how many
+    connections it is forwarded to.
+    """
+    return '{{"id": {}, "type": "event", "event": {}}}'.format(iden, event.as_json())
+
+
+def compressed_state_dict(state):
+    """Return a compact dict of a state for entity subscriptions.
+
+    Timestamps are sent as seconds since the epoch and last_updated is
+    left out when it equals last_changed.
+    """
+    compressed = {
+        COMPRESSED_STATE_STATE: state.state,
+        COMPRESSED_STATE_ATTRIBUTES: dict(state.attributes),
+        COMPRESSED_STATE_CONTEXT: _compressed_context(state.context),
+        COMPRESSED_STATE_LAST_CHANGED: state.last_changed.timestamp(),
+    }
+    if state.last_updated != state.last_changed:
+        compressed[COMPRESSED_STATE_LAST_UPDATED] = state.last_updated.timestamp()
+    return compressed
+
+
+def compressed_state_diff(old_state, new_state):
+    """Return the fields that changed between two states of an entity."""
+    additions = {}
+    diff = {STATE_DIFF_ADDITIONS: additions}
+
+    if old_state.state != new_state.state:
+        additions[COMPRESSED_STATE_STATE] = new_state.state
+    if old_state.last_changed != new_state.last_changed:
+        additions[COMPRESSED_STATE_LAST_CHANGED] = new_state.last_changed.timestamp()
+    elif old_state.last_updated != new_state.last_updated:
+        additions[COMPRESSED_STATE_LAST_UPDATED] = new_state.last_updated.timestamp()
+    if old_state.context != new_state.context:
+        additions[COMPRESSED_STATE_CONTEXT] = _compressed_context(new_state.context)
+
+    old_attributes = old_state.attributes
+    new_attributes = new_state.attributes
+    if old_attributes is new_attributes:
+        return diff
+
+    changed = {
+        key: value
+        for key, value in new_attributes.items()
+        if key not in old_attributes or old_attributes[key] != value
+    }
+    if changed:
+        additions[COMPRESSED_STATE_ATTRIBUTES] = changed
+
+    removed = [key for key in old_attributes if key not in new_attributes]
+    if removed:
+        diff[STATE_DIFF_REMOVALS] = {COMPRESSED_STATE_ATTRIBUTES: removed}
+
+    return diff
+
+
+def _compressed_context(context):
+    """Return the context id, or the full context if it carries more."""
+    if context.parent_id is None and context.user_id is None:
+        return context.id
+    return context.as_dict()
@@ -13,7 +13,7 @@ import logging
 import os
 import pathlib
 import threading
-from time import monotonic
+from time import monotonic, perf_counter
 from types import MappingProxyType
 from typing import (
     TYPE_CHECKING,
@@ -28,7 +28,6 @@ from typing import (
     Set,
     TypeVar,
 )
-import uuid
 
 from async_timeout import timeout
 import attr
@@ -66,6 +65,8 @@ from homeassistant.exceptions import (
 from homeassistant.util import location, slugify
 from homeassistant.util.async_ import fire_coroutine_threadsafe, run_callback_threadsafe
 import homeassistant.util.dt as dt_util
+from homeassistant.util.json import JSON_DUMP
+from homeassistant.util.read_only_dict import ReadOnlyDict
 from homeassistant.util.unit_system import IMPERIAL_SYSTEM, METRIC_SYSTEM, UnitSystem
 
 # Typing imports that create a circular dependency
@@ -95,6 +96,9 @@ SOURCE_YAML = "yaml"
 # How long to wait till things that run on startup have to finish.
 TIMEOUT_EVENT_START = 15
 
+# Listeners run inside async_fire that take longer than this are logged
+SLOW_LISTENER_WARNING = 0.1  # seconds
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -127,6 +131,51 @@ def is_callback(func: Callable[..., Any]) -> bool:
     return getattr(func, "_hass_callback", False) is True
 
 
+class HassJobType(enum.Enum):
+    """Represent a job type."""
+
+    Coroutine = 1
+    Coroutinefunction = 2
+    Callback = 3
+    Executor = 4
+
+
+class HassJob:
+    """Represent a job to be run later.
+
+    We check the callable type in advance
+    so we can avoid checking it every time
+    we run the job.
+    """
+
+    __slots__ = ["job_type", "target"]
+
+    def __init__(self, target: Callable) -> None:
+        """Create a job object."""
+        self.target = target
+        self.job_type = _get_callable_job_type(target)
+
+    def __repr__(self) -> str:
+        """Return the job."""
+        return f"<Job {self.job_type} {self.target}>"
+
+
+def _get_callable_job_type(target: Callable) -> HassJobType:
+    """Determine the job type from the callable."""
+    # Check for partials to properly determine if coroutine function
+    check_target = target
+    while isinstance(check_target, functools.partial):
+        check_target = check_target.func
+
+    if asyncio.iscoroutine(check_target):
+        return HassJobType.Coroutine
+    if is_callback(check_target):
+        return HassJobType.Callback
+    if asyncio.iscoroutinefunction(check_target):
+        return HassJobType.Coroutinefunction
+    return HassJobType.Executor
+
+
 @callback
 def async_loop_exception_handler(_: Any, context: Dict) -> None:
     """Handle all exception inside the core loop."""
@@ -289,22 +338,30 @@ class HomeAssistant:
         target: target to call.
         args: parameters for method to call.
         """
+        return self.async_add_hass_job(HassJob(target), *args)
+
+    @callback
+    def async_add_hass_job(
+        self, hassjob: HassJob, *args: Any
+    ) -> Optional[asyncio.Future]:
+        """Add a HassJob from within the event loop.
+
+        This method must be run in the event loop.
+
+        hassjob: HassJob to call.
+        args: parameters for method to call.
+        """
         task = None
 
-        # Check for partials to properly determine if coroutine function
-        check_target = target
-        while isinstance(check_target, functools.partial):
-            check_target = check_target.func
-
-        if asyncio.iscoroutine(check_target):
-            task = self.loop.create_task(target)  # type: ignore
-        elif is_callback(check_target):
-            self.loop.call_soon(target, *args)
-        elif asyncio.iscoroutinefunction(check_target):
-            task = self.loop.create_task(target(*args))
+        if hassjob.job_type == HassJobType.Coroutine:
+            task = self.loop.create_task(hassjob.target)  # type: ignore
+        elif hassjob.job_type == HassJobType.Callback:
+            self.loop.call_soon(hassjob.target, *args)
+        elif hassjob.job_type == HassJobType.Coroutinefunction:
+            task = self.loop.create_task(hassjob.target(*args))
         else:
             task = self.loop.run_in_executor(  # type: ignore
-                None, target, *args
+                None, hassjob.target, *args
             )
 
         # If a task is scheduled
@@ -365,6 +422,20 @@ class HomeAssistant:
         else:
             self.async_add_job(target, *args)
 
+    @callback
+    def async_run_hass_job(self, hassjob: HassJob, *args: Any) -> None:
+        """Run a HassJob from within the event loop.
+
+        This method must be run in the event loop.
+
+        hassjob: HassJob to call.
+        args: parameters for method to call.
+        """
+        if hassjob.job_type == HassJobType.Callback:
+            hassjob.target(*args)
+        else:
+            self.async_add_hass_job(hassjob, *args)
+
     def block_till_done(self) -> None:
         """Block till all pending work is done."""
         asyncio.run_coroutine_threadsafe(
@@ -437,7 +508,7 @@ class Context:
 
     user_id = attr.ib(type=str, default=None)
     parent_id = attr.ib(type=Optional[str], default=None)
-    id = attr.ib(type=str, default=attr.Factory(lambda: uuid.uuid4().hex))
+    id = attr.ib(type=str, factory=util.random_uuid_hex)
 
     def as_dict(self) -> dict:
         """Return a dictionary representation of the context."""
@@ -458,7 +529,7 @@ class EventOrigin(enum.Enum):
 class Event:
     """Representation of an event within the bus."""
 
-    __slots__ = ["event_type", "data", "origin", "time_fired", "context"]
+    __slots__ = ["event_type", "data", "origin", "time_fired", "context", "_as_json"]
 
     def __init__(
         self,
@@ -474,6 +545,7 @@ class Event:
         self.origin = origin
         self.time_fired = time_fired or dt_util.utcnow()
         self.context: Context = context or Context()
+        self._as_json: Optional[str] = None
 
     def as_dict(self) -> Dict:
         """Create a dict representation of this Event.
@@ -488,6 +560,18 @@ class Event:
             "context": self.context.as_dict(),
         }
 
+    def as_json(self) -> str:
+        """Return the JSON representation of this Event.
+
+        The event is encoded on first use and the result is shared by all
+        consumers, so the data should not be changed after it is fired.
+
+        Async friendly.
+        """
+        if self._as_json is None:
+            self._as_json = JSON_DUMP(self.as_dict())
+        return self._as_json
+
     def __repr__(self) -> str:
         """Return the representation."""
         # pylint: disable=maybe-no-member
@@ -510,12 +594,26 @@ class Event:
         )
 
 
+class _ListenerTiming:
+    """Time spent by a listener that runs inside async_fire."""
+
+    __slots__ = ["calls", "total", "max"]
+
+    def __init__(self) -> None:
+        """Initialize the timing."""
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
 class EventBus:
     """Allow the firing of and listening for events."""
 
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize a new event bus."""
-        self._listeners: Dict[str, List[Callable]] = {}
+        self._listeners: Dict[str, List[HassJob]] = {}
+        # Listeners that are run immediately instead of being scheduled
+        self._immediate: Dict[HassJob, _ListenerTiming] = {}
         self._hass = hass
 
     @callback
@@ -526,6 +624,28 @@ class EventBus:
         """
         return {key: len(self._listeners[key]) for key in self._listeners}
 
+    @callback
+    def async_listener_timings(self) -> List[Dict[str, Any]]:
+        """Return the time spent by listeners that run immediately.
+
+        The slowest listeners come first.
+
+        This method must be run in the event loop.
+        """
+        return sorted(
+            (
+                {
+                    "listener": repr(job.target),
+                    "calls": timing.calls,
+                    "total": timing.total,
+                    "max": timing.max,
+                }
+                for job, timing in self._immediate.items()
+            ),
+            key=lambda item: item["total"],  # type: ignore
+            reverse=True,
+        )
+
     @property
     def listeners(self) -> Dict[str, int]:
         """Return dictionary with events and the number of listeners."""
@@ -563,6 +683,9 @@ class EventBus:
         match_all_listeners = self._listeners.get(MATCH_ALL)
         if match_all_listeners is not None and event_type != EVENT_HOMEASSISTANT_CLOSE:
             listeners = match_all_listeners + listeners
+        else:
+            # Immediate listeners may add or remove listeners while we iterate
+            listeners = list(listeners)
 
         event = Event(event_type, event_data, origin, None, context)
 
@@ -572,8 +695,37 @@ class EventBus:
         if not listeners:
             return
 
-        for func in listeners:
-            self._hass.async_add_job(func, event)
+        immediate = self._immediate
+        for job in listeners:
+            timing = immediate.get(job)
+            if timing is None:
+                self._hass.async_add_hass_job(job, event)
+            else:
+                self._async_run_immediately(job, timing, event)
+
+    @callback
+    def _async_run_immediately(
+        self, job: HassJob, timing: _ListenerTiming, event: Event
+    ) -> None:
+        """Run a callback listener, keeping errors away from other listeners."""
+        start = perf_counter()
+        try:
+            job.target(event)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error running listener %s for %s", job.target, event)
+        elapsed = perf_counter() - start
+
+        timing.calls += 1
+        timing.total += elapsed
+        if elapsed > timing.max:
+            timing.max = elapsed
+        if elapsed > SLOW_LISTENER_WARNING:
+            _LOGGER.warning(
+                "Listener %s took %.3f seconds to handle %s",
+                job.target,
+                elapsed,
+                event.event_type,
+            )
 
     def listen(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
         """Listen for all events or events of a specific type.
@@ -592,22 +744,46 @@ class EventBus:
         return remove_listener
 
     @callback
-    def async_listen(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
+    def async_listen(
+        self, event_type: str, listener: Callable, run_immediately: bool = False
+    ) -> CALLBACK_TYPE:
         """Listen for all events or events of a specific type.
 
         To listen to all events specify the constant ``MATCH_ALL``
         as event_type.
 
+        Set run_immediately to run a callback listener inside async_fire
+        instead of scheduling it on the event loop. Exceptions it raises
+        are logged and the time it takes is tracked.
+
+        This method must be run in the event loop.
+        """
+        job = HassJob(listener)
+
+        if run_immediately:
+            if job.job_type != HassJobType.Callback:
+                raise HomeAssistantError(
+                    f"Event listener {listener} is not a callback and can't "
+                    "be run immediately"
+                )
+            self._immediate[job] = _ListenerTiming()
+
+        return self._async_listen_job(event_type, job)
+
+    @callback
+    def _async_listen_job(self, event_type: str, hassjob: HassJob) -> CALLBACK_TYPE:
+        """Listen for events of a specific type with a HassJob.
+
         This method must be run in the event loop.
         """
         if event_type in self._listeners:
-            self._listeners[event_type].append(listener)
+            self._listeners[event_type].append(hassjob)
         else:
-            self._listeners[event_type] = [listener]
+            self._listeners[event_type] = [hassjob]
 
         def remove_listener() -> None:
             """Remove the listener."""
-            self._async_remove_listener(event_type, listener)
+            self._async_remove_listener(event_type, hassjob)
 
         return remove_listener
 
@@ -640,6 +816,8 @@ class EventBus:
 
         This method must be run in the event loop.
         """
+        job: Optional[HassJob] = None
+        listener_job = HassJob(listener)
 
         @callback
         def onetime_listener(event: Event) -> None:
@@ -652,19 +830,22 @@ class EventBus:
             # multiple times as well.
             # This will make sure the second time it does nothing.
             setattr(onetime_listener, "run", True)
-            self._async_remove_listener(event_type, onetime_listener)
-            self._hass.async_run_job(listener, event)
+            self._async_remove_listener(event_type, job)  # type: ignore
+            self._hass.async_run_hass_job(listener_job, event)
+
+        job = HassJob(onetime_listener)
 
-        return self.async_listen(event_type, onetime_listener)
+        return self._async_listen_job(event_type, job)
 
     @callback
-    def _async_remove_listener(self, event_type: str, listener: Callable) -> None:
+    def _async_remove_listener(self, event_type: str, hassjob: HassJob) -> None:
         """Remove a listener of a specific event_type.
 
         This method must be run in the event loop.
         """
+        self._immediate.pop(hassjob, None)
         try:
-            self._listeners[event_type].remove(listener)
+            self._listeners[event_type].remove(hassjob)
 
             # delete event_type list if empty
             if not self._listeners[event_type]:
@@ -672,7 +853,7 @@ class EventBus:
         except (KeyError, ValueError):
             # KeyError is key event_type listener did not exist
             # ValueError if listener did not exist within event_type
-            _LOGGER.warning("Unable to remove unknown listener %s", listener)
+            _LOGGER.warning("Unable to remove unknown listener %s", hassjob)
 
 
 class State:
@@ -693,6 +874,8 @@ class State:
         "last_changed",
         "last_updated",
         "context",
+        "_as_dict",
+        "_as_json",
     ]
 
     def __init__(
@@ -728,10 +911,16 @@ class State:
 
         self.entity_id = entity_id.lower()
         self.state = state
-        self.attributes = MappingProxyType(attributes or {})
+        # Reuse the read-only attributes of a previous state
+        if isinstance(attributes, MappingProxyType):
+            self.attributes = attributes
+        else:
+            self.attributes = MappingProxyType(attributes or {})
         self.last_updated = last_updated or dt_util.utcnow()
         self.last_changed = last_changed or self.last_updated
         self.context = context or Context()
+        self._as_dict: Optional[ReadOnlyDict] = None
+        self._as_json: Optional[str] = None
 
     @property
     def domain(self) -> str:
@@ -750,22 +939,38 @@ class State:
             "_", " "
         )
 
-    def as_dict(self) -> Dict:
-        """Return a dict representation of the State.
+    def as_dict(self) -> ReadOnlyDict:
+        """Return a read-only dict representation of the State.
 
         Async friendly.
 
-        To be used for JSON serialization.
+        To be used for JSON serialization. The dict is created once and
+        shared by all callers, copy it to make changes.
         Ensures: state == State.from_dict(state.as_dict())
         """
-        return {
-            "entity_id": self.entity_id,
-            "state": self.state,
-            "attributes": dict(self.attributes),
-            "last_changed": self.last_changed,
-            "last_updated": self.last_updated,
-            "context": self.context.as_dict(),
-        }
+        if self._as_dict is None:
+            self._as_dict = ReadOnlyDict(
+                {
+                    "entity_id": self.entity_id,
+                    "state": self.state,
+                    "attributes": ReadOnlyDict(self.attributes),
+                    "last_changed": self.last_changed,
+                    "last_updated": self.last_updated,
+                    "context": ReadOnlyDict(self.context.as_dict()),
+                }
+            )
+        return self._as_dict
+
+    def as_json(self) -> str:
+        """Return the JSON representation of the State.
+
+        Encoded on first use and shared by every websocket and REST client.
+
+        Async friendly.
+        """
+        if self._as_json is None:
+            self._as_json = JSON_DUMP(self.as_dict())
+        return self._as_json
 
     @classmethod
     def from_dict(cls, json_dict: Dict) -> Any:
@@ -833,6 +1038,12 @@ class StateMachine:
         self._states: Dict[str, State] = {}
         self._bus = bus
         self._loop = loop
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """Return a number that changes whenever a state is set or removed."""
+        return self._version
 
     def entity_ids(self, domain_filter: Optional[str] = None) -> List[str]:
         """List of entity ids that are being tracked."""
@@ -910,6 +1121,7 @@ class StateMachine:
         if old_state is None:
             return False
 
+        self._version += 1
         self._bus.async_fire(
             EVENT_STATE_CHANGED,
             {"entity_id": entity_id, "old_state": old_state, "new_state": None},
@@ -969,17 +1181,23 @@ class StateMachine:
             last_changed = None
         else:
             same_state = old_state.state == new_state and not force_update
-            same_attr = old_state.attributes == MappingProxyType(attributes)
+            same_attr = old_state.attributes == attributes
             last_changed = old_state.last_changed if same_state else None
 
         if same_state and same_attr:
             return
 
+        if same_attr:
+            # Share the attributes with the old state instead of wrapping
+            # an equal dict again
+            attributes = old_state.attributes  # type: ignore
+
         if context is None:
             context = Context()
 
         state = State(entity_id, new_state, attributes, last_changed, None, context)
         self._states[entity_id] = state
+        self._version += 1
         self._bus.async_fire(
             EVENT_STATE_CHANGED,
             {"entity_id": entity_id, "old_state": old_state, "new_state": state},
@@ -991,7 +1209,7 @@ class StateMachine:
 class Service:
     """Representation of a callable service."""
 
-    __slots__ = ["func", "schema", "is_callback", "is_coroutinefunction"]
+    __slots__ = ["func", "job", "schema"]
 
     def __init__(
         self,
@@ -1001,12 +1219,8 @@ class Service:
     ) -> None:
         """Initialize a service."""
         self.func = func
+        self.job = HassJob(func)
         self.schema = schema
-        # Properly detect wrapped functions
-        while isinstance(func, functools.partial):
-            func = func.func
-        self.is_callback = is_callback(func)
-        self.is_coroutinefunction = asyncio.iscoroutinefunction(func)
 
 
 class ServiceCall:
@@ -1251,9 +1465,9 @@ class ServiceRegistry:
         self, handler: Service, service_call: ServiceCall
     ) -> None:
         """Execute a service."""
-        if handler.is_callback:
+        if handler.job.job_type == HassJobType.Callback:
             handler.func(service_call)
-        elif handler.is_coroutinefunction:
+        elif handler.job.job_type == HassJobType.Coroutinefunction:
             await handler.func(service_call)
         else:
             await self._hass.async_add_executor_job(handler.func, service_call)
@@ -1,7 +1,20 @@
 """Helpers for listening to events."""
 from datetime import datetime, timedelta
 import functools as ft
-from typing import Any, Callable, Dict, Iterable, Optional, Union, cast
+import heapq
+import logging
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 
 import attr
 
@@ -14,13 +27,31 @@ from homeassistant.const import (
     SUN_EVENT_SUNRISE,
     SUN_EVENT_SUNSET,
 )
-from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    HassJob,
+    HomeAssistant,
+    State,
+    callback,
+)
+from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.sun import get_astral_event_next
-from homeassistant.helpers.template import Template
+from homeassistant.helpers.template import RenderInfo, Template
 from homeassistant.loader import bind_hass
 from homeassistant.util import dt as dt_util
 from homeassistant.util.async_ import run_callback_threadsafe
 
+DATA_TIME_SCHEDULER = "time_scheduler"
+TRACK_STATE_CHANGE_CALLBACKS = "track_state_change_callbacks"
+TRACK_STATE_CHANGE_LISTENER = "track_state_change_listener"
+
+# Default minimum seconds between renders of templates that iterate states
+ALL_STATES_RATE_LIMIT = 1
+DOMAIN_STATES_RATE_LIMIT = 1
+
+_LOGGER = logging.getLogger(__name__)
+
 # PyLint does not like the use of threaded_listener_factory
 # pylint: disable=invalid-name
 
@@ -78,15 +109,11 @@ def async_track_state_change(
     else:
         entity_ids = tuple(entity_id.lower() for entity_id in entity_ids)
 
+    job = HassJob(action)
+
     @callback
     def state_change_listener(event: Event) -> None:
         """Handle specific state changes."""
-        if (
-            entity_ids != MATCH_ALL
-            and cast(str, event.data.get("entity_id")) not in entity_ids
-        ):
-            return
-
         old_state = event.data.get("old_state")
         if old_state is not None:
             old_state = old_state.state
@@ -96,14 +123,85 @@ def async_track_state_change(
             new_state = new_state.state
 
         if match_from_state(old_state) and match_to_state(new_state):
-            hass.async_run_job(
-                action,
+            hass.async_run_hass_job(
+                job,
                 event.data.get("entity_id"),
                 event.data.get("old_state"),
                 event.data.get("new_state"),
             )
 
-    return hass.bus.async_listen(EVENT_STATE_CHANGED, state_change_listener)
+    if entity_ids == MATCH_ALL:
+        return hass.bus.async_listen(EVENT_STATE_CHANGED, state_change_listener)
+
+    return _async_track_entity_state_change(
+        hass, cast(Iterable[str], entity_ids), state_change_listener
+    )
+
+
+@callback
+def _async_track_entity_state_change(
+    hass: HomeAssistant, entity_ids: Iterable[str], listener: Callable[[Event], None]
+) -> CALLBACK_TYPE:
+    """Call listener with the state changed events of entity_ids.
+
+    All listeners share a single bus listener which looks up the interested
+    listeners by entity_id, so a state write only reaches the listeners
+    that track that entity.
+
+    listener must be a callback. Returns a function that can be called to
+    remove the listener.
+    """
+    entity_callbacks: Dict[str, List[Callable[[Event], None]]] = hass.data.setdefault(
+        TRACK_STATE_CHANGE_CALLBACKS, {}
+    )
+
+    if TRACK_STATE_CHANGE_LISTENER not in hass.data:
+
+        @callback
+        def state_change_dispatcher(event: Event) -> None:
+            """Dispatch state changes by entity_id."""
+            entity_id = event.data.get("entity_id")
+            listeners = entity_callbacks.get(entity_id)
+            if not listeners:
+                return
+
+            for entity_listener in listeners[:]:
+                try:
+                    entity_listener(event)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception(
+                        "Error while processing state changed for %s", entity_id
+                    )
+
+        hass.data[TRACK_STATE_CHANGE_LISTENER] = hass.bus.async_listen(
+            EVENT_STATE_CHANGED, state_change_dispatcher, run_immediately=True
+        )
+
+    # Remove duplicates so the listener is called once per event
+    entity_ids = tuple(dict.fromkeys(entity_ids))
+    for entity_id in entity_ids:
+        entity_callbacks.setdefault(entity_id, []).append(listener)
+
+    @callback
+    def remove_listener() -> None:
+        """Remove the state change listener."""
+        unknown = False
+        for entity_id in entity_ids:
+            listeners = entity_callbacks.get(entity_id)
+            if listeners is None or listener not in listeners:
+                unknown = True
+                continue
+            listeners.remove(listener)
+            if not listeners:
+                del entity_callbacks[entity_id]
+
+        if unknown:
+            _LOGGER.warning("Unable to remove unknown listener %s", listener)
+
+        if not entity_callbacks and TRACK_STATE_CHANGE_LISTENER in hass.data:
+            hass.data.pop(TRACK_STATE_CHANGE_LISTENER)()
+
+    return remove_listener
 
 
 track_state_change = threaded_listener_factory(async_track_state_change)
@@ -118,32 +216,209 @@ def async_track_template(
     variables: Optional[Dict[str, Any]] = None,
 ) -> CALLBACK_TYPE:
     """Add a listener that track state changes with template condition."""
-    from . import condition
-
     # Local variable to keep track of if the action has already been triggered
     already_triggered = False
+    job = HassJob(action)
 
     @callback
-    def template_condition_listener(entity_id: str, from_s: State, to_s: State) -> None:
+    def template_condition_listener(
+        event: Event, result: Union[str, TemplateError]
+    ) -> None:
         """Check if condition is correct and run action."""
         nonlocal already_triggered
-        template_result = condition.async_template(hass, template, variables)
+        if isinstance(result, TemplateError):
+            _LOGGER.error("Error during template condition: %s", result)
+            template_result = False
+        else:
+            template_result = result.lower() == "true"
 
         # Check to see if template returns true
         if template_result and not already_triggered:
             already_triggered = True
-            hass.async_run_job(action, entity_id, from_s, to_s)
+            hass.async_run_hass_job(
+                job,
+                event.data.get("entity_id"),
+                event.data.get("old_state"),
+                event.data.get("new_state"),
+            )
         elif not template_result:
             already_triggered = False
 
-    return async_track_state_change(
-        hass, template.extract_entities(variables), template_condition_listener
+    # Every render counts for triggers, a rate limit could skip a short pulse
+    return async_track_template_result(
+        hass, template, template_condition_listener, variables, rate_limit=0
     )
 
 
 track_template = threaded_listener_factory(async_track_template)
 
 
+@callback
+@bind_hass
+def async_track_template_result(
+    hass: HomeAssistant,
+    template: Template,
+    action: Callable[[Event, Union[str, TemplateError]], None],
+    variables: Optional[Dict[str, Any]] = None,
+    rate_limit: Optional[float] = None,
+) -> CALLBACK_TYPE:
+    """Re-render a template when a state it accessed changes.
+
+    The template is rendered right away. After every render the listeners
+    are updated to exactly the entities the render accessed, plus entities
+    being added or removed when it iterated a domain or all states. A
+    template that accessed no states at all, like one based on now(), is
+    rendered again on every state change. The action is called with the state changed event and the new result, or
+    the TemplateError the render raised.
+
+    Renders are at least rate_limit seconds apart. Without one, templates
+    that iterate all states or a domain default to ALL_STATES_RATE_LIMIT
+    and DOMAIN_STATES_RATE_LIMIT, other templates are not limited.
+
+    Returns a function that can be called to remove the listeners.
+    """
+    tracker = _TrackTemplateResultInfo(hass, template, action, variables, rate_limit)
+    tracker.async_setup()
+    return tracker.async_remove
+
+
+class _TrackTemplateResultInfo:
+    """Listeners of a template, updated after every render."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        template: Template,
+        action: Callable[[Event, Union[str, TemplateError]], None],
+        variables: Optional[Dict[str, Any]],
+        rate_limit: Optional[float],
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._template = template
+        self._job = HassJob(action)
+        self._variables = variables
+        self._rate_limit = rate_limit
+        self._info: Optional[RenderInfo] = None
+        self._last_render: Optional[datetime] = None
+        self._pending_event: Optional[Event] = None
+        self._unsub_entities: Optional[CALLBACK_TYPE] = None
+        self._unsub_lifecycle: Optional[CALLBACK_TYPE] = None
+        self._unsub_refresh: Optional[CALLBACK_TYPE] = None
+
+    @callback
+    def async_setup(self) -> None:
+        """Render the template for the first time and listen."""
+        self._render()
+
+    @callback
+    def async_remove(self) -> None:
+        """Remove all listeners."""
+        for unsub in (self._unsub_entities, self._unsub_lifecycle, self._unsub_refresh):
+            if unsub is not None:
+                unsub()
+        self._unsub_entities = self._unsub_lifecycle = self._unsub_refresh = None
+
+    @callback
+    def _render(self) -> RenderInfo:
+        """Render the template and follow the states it accessed."""
+        info = self._template.async_render_to_info(self._variables)
+        self._last_render = dt_util.utcnow()
+
+        if self._info is None or self._info.entities != info.entities:
+            if self._unsub_entities is not None:
+                self._unsub_entities()
+                self._unsub_entities = None
+            if info.entities:
+                self._unsub_entities = _async_track_entity_state_change(
+                    self.hass, info.entities, self._refresh
+                )
+
+        if not (info.tracks_lifecycle or self._tracks_all(info)):
+            if self._unsub_lifecycle is not None:
+                self._unsub_lifecycle()
+                self._unsub_lifecycle = None
+        elif self._unsub_lifecycle is None:
+            self._unsub_lifecycle = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._lifecycle_changed
+            )
+
+        self._info = info
+        return info
+
+    @staticmethod
+    def _tracks_all(info: RenderInfo) -> bool:
+        """Return if the render accessed no states and follows all changes."""
+        return not info.entities and not info.tracks_lifecycle
+
+    @callback
+    def _lifecycle_changed(self, event: Event) -> None:
+        """Refresh when an entity of a tracked domain is added or removed.
+
+        Templates that accessed no states are refreshed on every change.
+        """
+        assert self._info is not None
+        if self._tracks_all(self._info):
+            self._refresh(event)
+            return
+
+        if (
+            event.data.get("old_state") is not None
+            and event.data.get("new_state") is not None
+        ):
+            return
+
+        entity_id = event.data.get("entity_id")
+        # Accessed entities are refreshed by their own listener
+        if entity_id in self._info.entities:
+            return
+        if self._info.filter_lifecycle(entity_id):
+            self._refresh(event)
+
+    @callback
+    def _refresh(self, event: Event) -> None:
+        """Render the template again and pass the result to the action."""
+        self._pending_event = event
+        if self._unsub_refresh is not None:
+            return
+
+        assert self._info is not None and self._last_render is not None
+        rate_limit = self._rate_limit
+        if rate_limit is None:
+            if self._info.all_states:
+                rate_limit = ALL_STATES_RATE_LIMIT
+            elif self._info.tracks_lifecycle:
+                rate_limit = DOMAIN_STATES_RATE_LIMIT
+
+        if rate_limit:
+            delay = rate_limit - (dt_util.utcnow() - self._last_render).total_seconds()
+            if delay > 0:
+                self._unsub_refresh = async_call_later(
+                    self.hass, delay, self._scheduled_refresh
+                )
+                return
+
+        self._run_action()
+
+    @callback
+    def _scheduled_refresh(self, now: datetime) -> None:
+        """Run a refresh that was held back by the rate limit."""
+        self._unsub_refresh = None
+        self._run_action()
+
+    @callback
+    def _run_action(self) -> None:
+        """Render and call the action with the last state change."""
+        event = self._pending_event
+        self._pending_event = None
+        info = self._render()
+        try:
+            result: Union[str, TemplateError] = info.result
+        except TemplateError as ex:
+            result = ex
+        self.hass.async_run_hass_job(self._job, event, result)
+
+
 @callback
 @bind_hass
 def async_track_same_state(
@@ -160,6 +435,7 @@ def async_track_same_state(
     """
     async_remove_state_for_cancel: Optional[CALLBACK_TYPE] = None
     async_remove_state_for_listener: Optional[CALLBACK_TYPE] = None
+    job = HassJob(action)
 
     @callback
     def clear_listener() -> None:
@@ -179,7 +455,7 @@ def async_track_same_state(
         nonlocal async_remove_state_for_listener
         async_remove_state_for_listener = None
         clear_listener()
-        hass.async_run_job(action)
+        hass.async_run_hass_job(job)
 
     @callback
     def state_for_cancel_listener(
@@ -203,6 +479,123 @@ def async_track_same_state(
 track_same_state = threaded_listener_factory(async_track_same_state)
 
 
+class _ScheduledAction:
+    """An action waiting in the time scheduler."""
+
+    __slots__ = ("job", "done")
+
+    def __init__(self, job: HassJob) -> None:
+        """Initialize the scheduled action."""
+        self.job = job
+        self.done = False
+
+
+class TimeScheduler:
+    """Run actions once a point in UTC time has passed.
+
+    Pending actions are kept in a heap ordered by their point in time. A
+    single time changed listener looks at the head of the heap, so every
+    tick only wakes the actions that are due instead of all of them.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the time scheduler."""
+        self.hass = hass
+        self._heap: List[Tuple[datetime, int, _ScheduledAction]] = []
+        self._counter = 0
+        self._cancelled = 0
+        self._last_now: Optional[datetime] = None
+        self._rollback_listeners: Set[Callable[[datetime], None]] = set()
+        hass.bus.async_listen(
+            EVENT_TIME_CHANGED, self._async_time_changed, run_immediately=True
+        )
+
+    @callback
+    def async_schedule(
+        self,
+        point_in_time: datetime,
+        action: Union[HassJob, Callable[[datetime], None]],
+    ) -> CALLBACK_TYPE:
+        """Call action with the current time once point_in_time has passed.
+
+        Returns a function that can be called to cancel the action.
+        """
+        if not isinstance(action, HassJob):
+            action = HassJob(action)
+        scheduled = _ScheduledAction(action)
+        self._counter += 1
+        heapq.heappush(self._heap, (point_in_time, self._counter, scheduled))
+
+        @callback
+        def async_cancel() -> None:
+            """Cancel the scheduled action."""
+            if scheduled.done:
+                return
+            scheduled.done = True
+            self._cancelled += 1
+            # Cancelled entries are dropped lazily; rebuild the heap once
+            # they make up most of it.
+            if self._cancelled > len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if not entry[2].done]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+        return async_cancel
+
+    @callback
+    def async_listen_rollback(
+        self, listener: Callable[[datetime], None], now: datetime
+    ) -> CALLBACK_TYPE:
+        """Call listener with the new time when the clock jumps backwards.
+
+        now is the time the listener based its schedule on.
+        """
+        if self._last_now is None or self._last_now < now:
+            self._last_now = now
+        self._rollback_listeners.add(listener)
+
+        @callback
+        def async_remove() -> None:
+            """Remove the rollback listener."""
+            self._rollback_listeners.discard(listener)
+
+        return async_remove
+
+    @callback
+    def _async_time_changed(self, event: Event) -> None:
+        """Run the actions that became due."""
+        now = dt_util.as_utc(event.data[ATTR_NOW])
+
+        if self._last_now is not None and now < self._last_now:
+            for listener in list(self._rollback_listeners):
+                listener(now)
+        self._last_now = now
+
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            scheduled = heapq.heappop(heap)[2]
+            if scheduled.done:
+                self._cancelled -= 1
+                continue
+            scheduled.done = True
+            due.append(scheduled.job)
+
+        # Actions may schedule new actions, those have to wait for the
+        # next time changed event.
+        for job in due:
+            self.hass.async_run_hass_job(job, now)
+
+
+@callback
+def _async_get_time_scheduler(hass: HomeAssistant) -> TimeScheduler:
+    """Return the time scheduler, creating it when needed."""
+    scheduler = hass.data.get(DATA_TIME_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DATA_TIME_SCHEDULER] = TimeScheduler(hass)
+    return cast(TimeScheduler, scheduler)
+
+
 @callback
 @bind_hass
 def async_track_point_in_time(
@@ -210,11 +603,12 @@ def async_track_point_in_time(
 ) -> CALLBACK_TYPE:
     """Add a listener that fires once after a specific point in time."""
     utc_point_in_time = dt_util.as_utc(point_in_time)
+    job = HassJob(action)
 
     @callback
     def utc_converter(utc_now: datetime) -> None:
         """Convert passed in UTC now to local now."""
-        hass.async_run_job(action, dt_util.as_local(utc_now))
+        hass.async_run_hass_job(job, dt_util.as_local(utc_now))
 
     return async_track_point_in_utc_time(hass, utc_converter, utc_point_in_time)
 
@@ -231,27 +625,7 @@ def async_track_point_in_utc_time(
     # Ensure point_in_time is UTC
     point_in_time = dt_util.as_utc(point_in_time)
 
-    @callback
-    def point_in_time_listener(event: Event) -> None:
-        """Listen for matching time_changed events."""
-        now = event.data[ATTR_NOW]
-
-        if now < point_in_time or hasattr(point_in_time_listener, "run"):
-            return
-
-        # Set variable so that we will never run twice.
-        # Because the event bus might have to wait till a thread comes
-        # available to execute this listener it might occur that the
-        # listener gets lined up twice to be executed. This will make
-        # sure the second time it does nothing.
-        setattr(point_in_time_listener, "run", True)
-        async_unsub()
-
-        hass.async_run_job(action, now)
-
-    async_unsub = hass.bus.async_listen(EVENT_TIME_CHANGED, point_in_time_listener)
-
-    return async_unsub
+    return _async_get_time_scheduler(hass).async_schedule(point_in_time, action)
 
 
 track_point_in_utc_time = threaded_listener_factory(async_track_point_in_utc_time)
@@ -278,6 +652,7 @@ def async_track_time_interval(
 ) -> CALLBACK_TYPE:
     """Add a listener that fires repetitively at every timedelta interval."""
     remove = None
+    job = HassJob(action)
 
     def next_interval() -> datetime:
         """Return the next interval."""
@@ -288,7 +663,7 @@ def async_track_time_interval(
         """Handle elapsed intervals."""
         nonlocal remove
         remove = async_track_point_in_utc_time(hass, interval_listener, next_interval())
-        hass.async_run_job(action, now)
+        hass.async_run_hass_job(job, now)
 
     remove = async_track_point_in_utc_time(hass, interval_listener, next_interval())
 
@@ -312,6 +687,11 @@ class SunListener:
     offset: Optional[timedelta] = attr.ib()
     _unsub_sun: Optional[CALLBACK_TYPE] = attr.ib(default=None)
     _unsub_config: Optional[CALLBACK_TYPE] = attr.ib(default=None)
+    _job: HassJob = attr.ib(init=False)
+
+    def __attrs_post_init__(self) -> None:
+        """Classify the action once."""
+        self._job = HassJob(self.action)
 
     @callback
     def async_attach(self) -> None:
@@ -351,7 +731,7 @@ class SunListener:
         """Handle solar event."""
         self._unsub_sun = None
         self._listen_next_sun_event()
-        self.hass.async_run_job(self.action)
+        self.hass.async_run_hass_job(self._job)
 
     @callback
     def _handle_config_event(self, _event: Any) -> None:
@@ -403,12 +783,13 @@ def async_track_utc_time_change(
     """Add a listener that will fire if time matches a pattern."""
     # We do not have to wrap the function with time pattern matching logic
     # if no pattern given
+    job = HassJob(action)
     if all(val is None for val in (hour, minute, second)):
 
         @callback
         def time_change_listener(event: Event) -> None:
             """Fire every time event that comes in."""
-            hass.async_run_job(action, event.data[ATTR_NOW])
+            hass.async_run_hass_job(job, event.data[ATTR_NOW])
 
         return hass.bus.async_listen(EVENT_TIME_CHANGED, time_change_listener)
 
@@ -416,42 +797,49 @@ def async_track_utc_time_change(
     matching_minutes = dt_util.parse_time_expression(minute, 0, 59)
     matching_hours = dt_util.parse_time_expression(hour, 0, 23)
 
-    next_time = None
+    scheduler = _async_get_time_scheduler(hass)
+    async_cancel: Optional[CALLBACK_TYPE] = None
 
-    def calculate_next(now: datetime) -> None:
-        """Calculate and set the next time the trigger should fire."""
-        nonlocal next_time
+    @callback
+    def schedule_next(now: datetime) -> None:
+        """Schedule the next time the trigger should fire."""
+        nonlocal async_cancel
 
         localized_now = dt_util.as_local(now) if local else now
         next_time = dt_util.find_next_time_expression_time(
             localized_now, matching_seconds, matching_minutes, matching_hours
         )
-
-    # Make sure rolling back the clock doesn't prevent the timer from
-    # triggering.
-    last_now: Optional[datetime] = None
+        async_cancel = scheduler.async_schedule(dt_util.as_utc(next_time), pattern_job)
 
     @callback
-    def pattern_time_change_listener(event: Event) -> None:
-        """Listen for matching time_changed events."""
-        nonlocal next_time, last_now
+    def pattern_time_change_listener(now: datetime) -> None:
+        """Fire the action and schedule the next match."""
+        hass.async_run_hass_job(job, dt_util.as_local(now) if local else now)
+        schedule_next(now + timedelta(seconds=1))
 
-        now = event.data[ATTR_NOW]
+    pattern_job = HassJob(pattern_time_change_listener)
 
-        if last_now is None or now < last_now:
-            # Time rolled back or next time not yet calculated
-            calculate_next(now)
+    # Make sure rolling back the clock doesn't prevent the timer from
+    # triggering, reschedule from the new time when it jumps backwards.
+    @callback
+    def time_rolled_back(now: datetime) -> None:
+        """Reschedule the next match after the clock jumped backwards."""
+        assert async_cancel is not None
+        async_cancel()
+        schedule_next(now)
 
-        last_now = now
+    now = dt_util.utcnow()
+    schedule_next(now)
+    remove_rollback = scheduler.async_listen_rollback(time_rolled_back, now)
 
-        if next_time <= now:
-            hass.async_run_job(action, dt_util.as_local(now) if local else now)
-            calculate_next(now + timedelta(seconds=1))
+    @callback
+    def async_remove() -> None:
+        """Remove the pattern time change listener."""
+        assert async_cancel is not None
+        async_cancel()
+        remove_rollback()
 
-    # We can't use async_track_point_in_utc_time here because it would
-    # break in the case that the system time abruptly jumps backwards.
-    # Our custom last_now logic takes care of resolving that scenario.
-    return hass.bus.async_listen(EVENT_TIME_CHANGED, pattern_time_change_listener)
+    return async_remove
 
 
 track_utc_time_change = threaded_listener_factory(async_track_utc_time_change)
@@ -1,13 +1,13 @@
 """Template helper methods for rendering strings with Home Assistant data."""
 import base64
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 import json
 import logging
 import math
 import random
 import re
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Union
 
 import jinja2
 from jinja2 import contextfilter, contextfunction
@@ -39,6 +39,10 @@ DATE_STR_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 _RENDER_INFO = "template.render_info"
 _ENVIRONMENT = "template.environment"
+_SORTED_STATES = "template.sorted_states"
+
+# Number of compiled template sources kept for reuse
+COMPILE_CACHE_SIZE = 1024
 
 _RE_NONE_ENTITIES = re.compile(r"distance\(|closest\(", re.I | re.M)
 _RE_GET_ENTITIES = re.compile(
@@ -139,6 +143,21 @@ class RenderInfo:
             or entity_id in self._entities
         )
 
+    @property
+    def entities(self) -> FrozenSet[str]:
+        """Entities the template accessed while rendering."""
+        return self._entities
+
+    @property
+    def all_states(self) -> bool:
+        """Return if the template iterated over all states."""
+        return self._all_states
+
+    @property
+    def tracks_lifecycle(self) -> bool:
+        """Return if entities being added or removed can change the result."""
+        return self._all_states or hasattr(self, "_domains")
+
     @property
     def result(self) -> str:
         """Results of the template computation."""
@@ -187,7 +206,7 @@ class Template:
             return
 
         try:
-            self._compiled_code = self._env.compile(self.template)
+            self._compiled_code = self._env.compile_cached(self.template)
         except jinja2.exceptions.TemplateSyntaxError as err:
             raise TemplateError(err)
 
@@ -341,12 +360,7 @@ class AllStates:
     def __iter__(self):
         """Return all states."""
         self._collect_all()
-        return iter(
-            _wrap_state(self._hass, state)
-            for state in sorted(
-                self._hass.states.async_all(), key=lambda state: state.entity_id
-            )
-        )
+        return iter(_sorted_states(self._hass))
 
     def __len__(self):
         """Return number of states."""
@@ -387,16 +401,7 @@ class DomainStates:
     def __iter__(self):
         """Return the iteration over all the states."""
         self._collect_domain()
-        return iter(
-            sorted(
-                (
-                    _wrap_state(self._hass, state)
-                    for state in self._hass.states.async_all()
-                    if state.domain == self._domain
-                ),
-                key=lambda state: state.entity_id,
-            )
-        )
+        return iter(_sorted_states(self._hass, self._domain))
 
     def __len__(self):
         """Return number of states."""
@@ -461,6 +466,37 @@ def _collect_state(hass, entity_id):
         entity_collect._entities.append(entity_id)
 
 
+def _sorted_states(hass, domain=None):
+    """Return the wrapped states sorted by entity id, optionally of a domain.
+
+    The result is shared by all renders until the next state change, so
+    templates iterating the states do not each sort them again.
+    """
+    version, cache = hass.data.get(_SORTED_STATES, (None, None))
+    if version != hass.states.version:
+        cache = {}
+        hass.data[_SORTED_STATES] = (hass.states.version, cache)
+
+    states = cache.get(domain)
+    if states is None:
+        if domain is None:
+            states = tuple(
+                _wrap_state(hass, state)
+                for state in sorted(
+                    hass.states.async_all(), key=lambda state: state.entity_id
+                )
+            )
+        else:
+            prefix = f"{domain}."
+            states = tuple(
+                state
+                for state in _sorted_states(hass)
+                if state.entity_id.startswith(prefix)
+            )
+        cache[domain] = states
+    return states
+
+
 def _wrap_state(hass, state):
     """Wrap a state."""
     return None if state is None else TemplateState(hass, state)
@@ -919,6 +955,10 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
         """Initialise template environment."""
         super().__init__()
         self.hass = hass
+        # Compiled code is shared by every template with the same source.
+        # It lives on the environment, as the generated code depends on
+        # which filters it provides, and goes away together with it.
+        self.compile_cached = lru_cache(maxsize=COMPILE_CACHE_SIZE)(self.compile)
         self.filters["round"] = forgiving_round
         self.filters["multiply"] = multiply
         self.filters["log"] = logarithm
@@ -39,9 +39,12 @@ _LOGGER = logging.getLogger(__name__)
 DATA_COMPONENTS = "components"
 DATA_INTEGRATIONS = "integrations"
 DATA_CUSTOM_COMPONENTS = "custom_components"
+DATA_MANIFEST_INDEX = "manifest_index"
 PACKAGE_CUSTOM_COMPONENTS = "custom_components"
 PACKAGE_BUILTIN = "homeassistant.components"
 LOOKUP_PATHS = [PACKAGE_CUSTOM_COMPONENTS, PACKAGE_BUILTIN]
+BUILTIN_PATH = pathlib.Path(__file__).parent / "components"
+MANIFEST_INDEX_PATH = pathlib.Path(__file__).parent / "generated" / "manifests.json"
 CUSTOM_WARNING = (
     "You are using a custom integration for %s which has not "
     "been tested by Home Assistant. This component might "
@@ -142,6 +145,49 @@ async def async_get_config_flows(hass: "HomeAssistant") -> Set[str]:
     return flows
 
 
+def _load_manifest_index(
+    index_path: pathlib.Path, components_path: pathlib.Path
+) -> Dict[str, Dict[str, Any]]:
+    """Load the generated index of built-in manifests.
+
+    Manifests that changed after the index was generated are left out, so they
+    are read from disk instead.
+    """
+    try:
+        index_mtime = index_path.stat().st_mtime
+        index = json.loads(index_path.read_text())
+    except (OSError, ValueError) as err:
+        _LOGGER.debug("Unable to load manifest index %s: %s", index_path, err)
+        return {}
+
+    manifests = {}
+
+    for domain, manifest in index.items():
+        try:
+            manifest_mtime = (
+                (components_path / domain / "manifest.json").stat().st_mtime
+            )
+        except OSError:
+            continue
+
+        if manifest_mtime <= index_mtime:
+            manifests[domain] = manifest
+
+    return manifests
+
+
+async def _async_get_manifest_index(hass: "HomeAssistant") -> Dict[str, Dict]:
+    """Return the index of built-in manifests, loading it once."""
+    index = hass.data.get(DATA_MANIFEST_INDEX)
+
+    if index is None:
+        index = hass.data[DATA_MANIFEST_INDEX] = hass.async_add_executor_job(
+            _load_manifest_index, MANIFEST_INDEX_PATH, BUILTIN_PATH
+        )
+
+    return cast(Dict[str, Dict], await index)
+
+
 class Integration:
     """An integration in Home Assistant."""
 
@@ -300,6 +346,15 @@ async def async_get_integration(hass: "HomeAssistant", domain: str) -> Integrati
         event.set()
         return integration
 
+    manifest = (await _async_get_manifest_index(hass)).get(domain)
+    if manifest is not None:
+        integration = Integration(
+            hass, f"{PACKAGE_BUILTIN}.{domain}", BUILTIN_PATH / domain, manifest
+        )
+        cache[domain] = integration
+        event.set()
+        return integration
+
     from homeassistant import components
 
     integration = await hass.async_add_executor_job(
@@ -1,14 +1,17 @@
 """Script to run benchmarks."""
 import argparse
 import asyncio
+from collections import namedtuple
 from contextlib import suppress
 from datetime import datetime
+import json
 import logging
 from timeit import default_timer as timer
 from typing import Callable, Dict
 
 from homeassistant import core
 from homeassistant.const import ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED
+from homeassistant.helpers.json import JSONEncoder
 from homeassistant.util import dt as dt_util
 
 # mypy: allow-untyped-calls, allow-untyped-defs, no-check-untyped-defs
@@ -16,6 +19,19 @@ from homeassistant.util import dt as dt_util
 
 BENCHMARKS: Dict[str, Callable] = {}
 
+LOGBOOK_ROW_COLUMNS = [
+    "event_type",
+    "event_data",
+    "time_fired",
+    "context_id",
+    "context_user_id",
+    "state",
+    "entity_id",
+    "domain",
+    "attributes",
+    "shared_attrs",
+]
+
 
 def run(args):
     """Handle benchmark commandline script."""
@@ -77,6 +93,48 @@ async def async_million_events(hass):
     return timer() - start
 
 
+@benchmark
+async def async_million_add_job(hass):
+    """Run a million callbacks through async_add_job."""
+    return await _million_jobs(hass, False)
+
+
+@benchmark
+async def async_million_add_hass_job(hass):
+    """Run a million callbacks through a pre-classified HassJob."""
+    return await _million_jobs(hass, True)
+
+
+async def _million_jobs(hass, use_hass_job):
+    """Dispatch a callback a million times and wait for the last run."""
+    count = 0
+    event = asyncio.Event()
+
+    @core.callback
+    def listener(_):
+        """Handle job."""
+        nonlocal count
+        count += 1
+
+        if count == 10 ** 6:
+            event.set()
+
+    job = core.HassJob(listener)
+
+    start = timer()
+
+    if use_hass_job:
+        for _ in range(10 ** 6):
+            hass.async_add_hass_job(job, None)
+    else:
+        for _ in range(10 ** 6):
+            hass.async_add_job(listener, None)
+
+    await event.wait()
+
+    return timer() - start
+
+
 @benchmark
 async def async_million_time_changed_helper(hass):
     """Run a million events through time changed helper."""
@@ -138,6 +196,96 @@ async def async_million_state_changed_helper(hass):
     return timer() - start
 
 
+@benchmark
+async def async_state_changed_fan_out_10(hass):
+    """Run state changes with 10 state change trackers."""
+    return await _state_changed_fan_out(hass, 10)
+
+
+@benchmark
+async def async_state_changed_fan_out_100(hass):
+    """Run state changes with 100 state change trackers."""
+    return await _state_changed_fan_out(hass, 100)
+
+
+@benchmark
+async def async_state_changed_fan_out_1000(hass):
+    """Run state changes with 1000 state change trackers."""
+    return await _state_changed_fan_out(hass, 1000)
+
+
+async def _state_changed_fan_out(hass, trackers):
+    """Fire and handle 10k state changes of one entity while tracking others."""
+    count = 0
+    entity_id = "light.kitchen"
+    event = asyncio.Event()
+
+    @core.callback
+    def listener(*args):
+        """Handle state change."""
+        nonlocal count
+        count += 1
+
+        if count == 10 ** 4:
+            event.set()
+
+    for idx in range(trackers - 1):
+        hass.helpers.event.async_track_state_change(f"light.other_{idx}", listener)
+    hass.helpers.event.async_track_state_change(entity_id, listener)
+    event_data = {
+        "entity_id": entity_id,
+        "old_state": core.State(entity_id, "off"),
+        "new_state": core.State(entity_id, "on"),
+    }
+
+    start = timer()
+
+    for _ in range(10 ** 4):
+        hass.bus.async_fire(EVENT_STATE_CHANGED, event_data)
+
+    await event.wait()
+
+    return timer() - start
+
+
+@benchmark
+async def mqtt_match_100_subscriptions(hass):
+    """Match MQTT messages against 100 subscriptions."""
+    return _mqtt_match(100)
+
+
+@benchmark
+async def mqtt_match_1000_subscriptions(hass):
+    """Match MQTT messages against 1000 subscriptions."""
+    return _mqtt_match(1000)
+
+
+@benchmark
+async def mqtt_match_10000_subscriptions(hass):
+    """Match MQTT messages against 10000 subscriptions."""
+    return _mqtt_match(10000)
+
+
+def _mqtt_match(subscriptions):
+    """Match 10k messages against the subscriptions."""
+    from homeassistant.components import mqtt
+
+    matcher = mqtt.SubscriptionMatcher()
+    matcher.add(mqtt.Subscription("homeassistant/#", None))
+    matcher.add(mqtt.Subscription("zigbee2mqtt/+/availability", None))
+    for idx in range(subscriptions - 2):
+        matcher.add(mqtt.Subscription(f"zigbee2mqtt/device_{idx}", None))
+
+    topics = [f"zigbee2mqtt/device_{idx % subscriptions}" for idx in range(10 ** 4)]
+
+    start = timer()
+
+    for topic in topics:
+        matcher.match(topic)
+
+    return timer() - start
+
+
 @benchmark
 @asyncio.coroutine
 def logbook_filtering_state(hass):
@@ -185,3 +333,59 @@ def _logbook_filtering(hass, last_changed, last_updated):
     list(logbook.humanify(None, yield_events(event)))
 
     return timer() - start
+
+
+@benchmark
+async def logbook_filtering_state_rows(hass):
+    """Filter state changes read from logbook query rows."""
+    return _logbook_filtering_rows(hass, {})
+
+
+@benchmark
+async def logbook_filtering_hidden_rows(hass):
+    """Filter hidden state changes read from logbook query rows."""
+    return _logbook_filtering_rows(hass, {"hidden": True})
+
+
+def _logbook_filtering_rows(hass, attributes):
+    """Filter 10^5 rows the way the logbook query reads them."""
+    # pylint: disable=protected-access
+    from homeassistant.components import logbook
+
+    entity_id = "test.entity"
+    state = core.State(entity_id, "on", attributes)
+    event_data = json.dumps(
+        {
+            "entity_id": entity_id,
+            "old_state": core.State(entity_id, "off", attributes).as_dict(),
+            "new_state": state.as_dict(),
+        },
+        cls=JSONEncoder,
+    )
+    Row = namedtuple("Row", LOGBOOK_ROW_COLUMNS)
+    row = Row(
+        EVENT_STATE_CHANGED,
+        event_data,
+        dt_util.utcnow(),
+        state.context.id,
+        None,
+        "on",
+        entity_id,
+        "test",
+        None,
+        json.dumps(attributes),
+    )
+
+    def yield_events():
+        entities_filter = logbook._generate_filter_from_config({})
+        attributes_cache = {}
+        for _ in range(10 ** 5):
+            event = logbook.LazyEventPartialState(row, attributes_cache)
+            if logbook._keep_lazy_event(event, entities_filter):
+                yield event
+
+    start = timer()
+
+    list(logbook.humanify(None, yield_events()))
+
+    return timer() - start
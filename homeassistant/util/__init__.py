@@ -119,6 +119,15 @@ def get_random_string(length: int = 10) -> str:
     return "".join(generator.choice(source_chars) for _ in range(length))
 
 
+def random_uuid_hex() -> str:
+    """Return a random 32 character hex string, like uuid4().hex.
+
+    Cheaper than uuid4 as it does not read from os.urandom. Not meant
+    for secrets, use get_random_string or the secrets module for those.
+    """
+    return "%032x" % random.getrandbits(128)
+
+
 class OrderedEnum(enum.Enum):
     """Taken from Python 3.4.0 docs."""
 
@@ -1,9 +1,11 @@
 """JSON utility functions."""
+from datetime import datetime
+from functools import partial
 import json
 import logging
 import os
 import tempfile
-from typing import Dict, List, Optional, Type, Union
+from typing import Any, Dict, List, Optional, Type, Union
 
 from homeassistant.exceptions import HomeAssistantError
 
@@ -18,6 +20,29 @@ class WriteError(HomeAssistantError):
     """Error writing the data."""
 
 
+class JSONEncoder(json.JSONEncoder):
+    """JSONEncoder that supports Home Assistant objects."""
+
+    # pylint: disable=method-hidden
+    def default(self, o: Any) -> Any:
+        """Convert Home Assistant objects.
+
+        Hand other objects to the original method.
+        """
+        if isinstance(o, datetime):
+            return o.isoformat()
+        if isinstance(o, set):
+            return list(o)
+        if hasattr(o, "as_dict"):
+            return o.as_dict()
+
+        return json.JSONEncoder.default(self, o)
+
+
+# Encode data sent to clients, which do not accept NaN
+JSON_DUMP = partial(json.dumps, cls=JSONEncoder, allow_nan=False)
+
+
 def load_json(
     filename: str, default: Union[List, Dict, None] = None
 ) -> Union[List, Dict]:
@@ -8,6 +8,7 @@ from . import (
     dependencies,
     json,
     manifest,
+    manifest_index,
     services,
     ssdp,
     zeroconf,
@@ -20,6 +21,7 @@ PLUGINS = [
     config_flow,
     dependencies,
     manifest,
+    manifest_index,
     services,
     ssdp,
     zeroconf,
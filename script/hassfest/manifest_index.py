@@ -0,0 +1,51 @@
+"""Generate the manifest index file."""
+import json
+from typing import Dict
+
+from .model import Config, Integration
+
+# Manifest keys that are not needed at runtime
+SKIPPED_KEYS = {"codeowners"}
+
+
+def generate_and_validate(integrations: Dict[str, Integration]):
+    """Validate and generate the manifest index."""
+    lines = []
+
+    for domain in sorted(integrations):
+        integration = integrations[domain]
+
+        if not integration.manifest:
+            continue
+
+        manifest = {
+            key: value
+            for key, value in integration.manifest.items()
+            if key not in SKIPPED_KEYS
+        }
+        lines.append(f"  {json.dumps(domain)}: {json.dumps(manifest, sort_keys=True)}")
+
+    return "{\n" + ",\n".join(lines) + "\n}"
+
+
+def validate(integrations: Dict[str, Integration], config: Config):
+    """Validate manifest index file."""
+    index_path = config.root / "homeassistant/generated/manifests.json"
+    config.cache["manifest_index"] = content = generate_and_validate(integrations)
+
+    with open(str(index_path), "r") as fp:
+        if fp.read().strip() != content:
+            config.add_error(
+                "manifest_index",
+                "File manifests.json is not up to date. "
+                "Run python3 -m script.hassfest",
+                fixable=True,
+            )
+        return
+
+
+def generate(integrations: Dict[str, Integration], config: Config):
+    """Generate manifest index file."""
+    index_path = config.root / "homeassistant/generated/manifests.json"
+    with open(str(index_path), "w") as fp:
+        fp.write(config.cache["manifest_index"] + "\n")
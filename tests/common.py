@@ -815,7 +815,7 @@ def mock_restore_cache(hass, states):
 
     last_states = {}
     for state in states:
-        restored_state = state.as_dict()
+        restored_state = dict(state.as_dict())
         restored_state["attributes"] = json.loads(
             json.dumps(restored_state["attributes"], cls=JSONEncoder)
         )
@@ -1,8 +1,12 @@
 """The test for the data filter sensor platform."""
+from copy import copy
 from datetime import timedelta
+import random
 import unittest
 from unittest.mock import patch
 
+import numpy as np
+
 from homeassistant.components.filter.sensor import (
     LowPassFilter,
     OutlierFilter,
@@ -279,3 +283,107 @@ class TestFilterSensor(unittest.TestCase):
         for state in self.values:
             filtered = filt.filter_state(state)
         assert 21.5 == filtered.state
+
+    def random_states(self, count=500):
+        """Return states with random values at irregular times."""
+        rnd = random.Random(count)
+        timestamp = dt_util.utcnow()
+        states = []
+        for _ in range(count):
+            states.append(
+                ha.State(
+                    "sensor.test_monitored",
+                    round(rnd.gauss(20, 5), 1),
+                    last_updated=timestamp,
+                )
+            )
+            timestamp += rnd.choice(
+                [timedelta(seconds=30), timedelta(minutes=1), timedelta(seconds=97)]
+            )
+        return states
+
+    def assert_batch_matches(self, make_filter, states):
+        """Assert filtering a batch matches filtering state by state."""
+        single = make_filter()
+        batch = make_filter()
+        history, last = states[:-1], states[-1]
+
+        expected = []
+        for state in history:
+            filtered = single.filter_state(copy(state))
+            if not single.skip_processing:
+                expected.append(filtered.state)
+
+        keep, values = batch.filter_states(
+            [state.last_updated for state in history],
+            np.array([float(state.state) for state in history]),
+        )
+        assert values[keep].tolist() == expected
+
+        # Both continue from the same window
+        assert (
+            single.filter_state(copy(last)).state
+            == batch.filter_state(copy(last)).state
+        )
+        assert single.skip_processing == batch.skip_processing
+
+    def test_batch_outlier(self):
+        """Test filtering a batch with the outlier filter."""
+        for window_size in (1, 4, 5):
+            self.assert_batch_matches(
+                lambda: OutlierFilter(
+                    window_size=window_size, precision=2, entity=None, radius=4.0
+                ),
+                self.random_states(),
+            )
+
+    def test_batch_lowpass(self):
+        """Test filtering a batch with the lowpass filter."""
+        self.assert_batch_matches(
+            lambda: LowPassFilter(
+                window_size=1, precision=2, entity=None, time_constant=10
+            ),
+            self.random_states(),
+        )
+
+    def test_batch_range(self):
+        """Test filtering a batch with the range filter."""
+        self.assert_batch_matches(
+            lambda: RangeFilter(
+                entity=None, precision=2, lower_bound=15, upper_bound=25
+            ),
+            self.random_states(),
+        )
+
+    def test_batch_throttle(self):
+        """Test filtering a batch with the throttle filter."""
+        for window_size in (1, 3):
+            for count in (2, 3, 4, 500):
+                self.assert_batch_matches(
+                    lambda: ThrottleFilter(
+                        window_size=window_size, precision=2, entity=None
+                    ),
+                    self.random_states(count),
+                )
+
+    def test_batch_time_throttle(self):
+        """Test filtering a batch with the time throttle filter."""
+        self.assert_batch_matches(
+            lambda: TimeThrottleFilter(
+                window_size=timedelta(minutes=2), precision=2, entity=None
+            ),
+            self.random_states(),
+        )
+
+    def test_batch_time_sma(self):
+        """Test filtering a batch with the time SMA filter."""
+        for minutes in (1, 2, 5):
+            self.assert_batch_matches(
+                lambda: TimeSMAFilter(
+                    window_size=timedelta(minutes=minutes),
+                    precision=2,
+                    entity=None,
+                    type="last",
+                ),
+                self.random_states(),
+            )
@@ -416,7 +416,10 @@ class TestComponentsGroup(unittest.TestCase):
             "group.second_group",
             "group.test_group",
         ]
-        assert self.hass.bus.listeners["state_changed"] == 3
+
+        self.hass.states.set("light.bowl", STATE_ON)
+        self.hass.block_till_done()
+        assert self.hass.states.get("group.second_group").state == STATE_ON
 
         with patch(
             "homeassistant.config.load_yaml_config_file",
@@ -438,7 +441,19 @@ class TestComponentsGroup(unittest.TestCase):
             "group.all_tests",
             "group.hello",
         ]
-        assert self.hass.bus.listeners["state_changed"] == 2
+
+        # The removed groups no longer follow their entities
+        self.hass.states.set("light.bowl", STATE_OFF)
+        self.hass.states.set("sensor.happy", STATE_ON)
+        self.hass.block_till_done()
+
+        assert sorted(self.hass.states.entity_ids()) == [
+            "group.all_tests",
+            "group.hello",
+            "light.bowl",
+            "sensor.happy",
+        ]
+        assert self.hass.states.get("group.hello").state == STATE_OFF
 
     def test_changing_group_visibility(self):
         """Test that a group can be hidden and shown."""
@@ -5,6 +5,8 @@ import unittest
 from unittest.mock import patch, sentinel
 
 from homeassistant.components import history, recorder
+from homeassistant.components.recorder.models import States
+from homeassistant.components.recorder.util import session_scope
 import homeassistant.core as ha
 from homeassistant.setup import async_setup_component, setup_component
 import homeassistant.util.dt as dt_util
@@ -196,6 +198,168 @@ class TestComponentHistory(unittest.TestCase):
         )
         assert states == hist
 
+    def test_stream_significant_states(self):
+        """Test streaming returns the same states in bounded batches."""
+        zero, four, states = self.record_states()
+        one = zero + timedelta(seconds=1)
+        expected = history.get_significant_states(
+            self.hass, one, four, filters=history.Filters()
+        )
+
+        with patch.object(history, "STREAM_BATCH_SIZE", 2):
+            batches = list(
+                history.stream_significant_states(
+                    self.hass, one, four, filters=history.Filters()
+                )
+            )
+
+        assert all(len(batch) <= 2 for _, batch in batches)
+        entity_ids = [entity_id for entity_id, _ in batches]
+        assert entity_ids == sorted(entity_ids)
+
+        hist = {}
+        for entity_id, batch in batches:
+            hist.setdefault(entity_id, []).extend(batch)
+        assert hist == expected
+
+    def test_stream_significant_states_order(self):
+        """Test streamed entities are ordered like the regular response."""
+        self.init_recorder()
+        zero = dt_util.utcnow()
+        one = zero + timedelta(seconds=1)
+        two = one + timedelta(seconds=1)
+        three = two + timedelta(seconds=1)
+
+        for entity_id, state, point in (
+            ("light.a", "on", zero),
+            ("light.c", "on", zero),
+            ("light.b", "on", zero),
+            ("light.b", "off", two),
+        ):
+            with patch(
+                "homeassistant.components.recorder.dt_util.utcnow", return_value=point
+            ):
+                self.hass.states.set(entity_id, state)
+                self.wait_recording_done()
+
+        batches = list(
+            history.stream_significant_states(
+                self.hass, one, three, filters=history.Filters()
+            )
+        )
+        assert [
+            (entity_id, [state.state for state in states])
+            for entity_id, states in batches
+        ] == [("light.a", ["on"]), ("light.b", ["on", "off"]), ("light.c", ["on"])]
+
+        batches = list(
+            history.stream_significant_states(
+                self.hass,
+                one,
+                three,
+                filters=history.Filters(),
+                leading_entity_ids=["light.c", "light.b"],
+            )
+        )
+        assert [entity_id for entity_id, _ in batches] == [
+            "light.c",
+            "light.b",
+            "light.a",
+        ]
+
+    def test_get_significant_states_minimal_response(self):
+        """Test minimal response only has full states at both ends."""
+        zero, four, states = self.record_states()
+        hist = history.get_significant_states(
+            self.hass, zero, four, filters=history.Filters(), minimal_response=True
+        )
+
+        assert hist.keys() == states.keys()
+        for entity_id, entity_states in states.items():
+            assert hist[entity_id][0] == entity_states[0]
+            assert hist[entity_id][-1] == entity_states[-1]
+
+        # Thermostats graph their attributes, every point is a full state
+        assert hist["thermostat.test"] == states["thermostat.test"]
+
+        mp_states = states["media_player.test"]
+        assert len(mp_states) == 3
+        assert hist["media_player.test"][1] == {
+            "state": mp_states[1].state,
+            "last_changed": mp_states[1].last_changed,
+        }
+
+    def test_get_significant_states_minimal_response_time_zone(self):
+        """Test minimal points keep their UTC time in other time zones."""
+        orig_time_zone = dt_util.DEFAULT_TIME_ZONE
+        dt_util.set_default_time_zone(dt_util.get_time_zone("America/New_York"))
+        try:
+            zero, four, states = self.record_states()
+            hist = history.get_significant_states(
+                self.hass, zero, four, filters=history.Filters(), minimal_response=True
+            )
+        finally:
+            dt_util.set_default_time_zone(orig_time_zone)
+
+        mp_states = states["media_player.test"]
+        assert hist["media_player.test"][1] == {
+            "state": mp_states[1].state,
+            "last_changed": mp_states[1].last_changed,
+        }
+
+    def test_get_significant_states_minimal_response_hidden(self):
+        """Test minimal response leaves out every point of hidden entities."""
+        self.init_recorder()
+        start = dt_util.utcnow() - timedelta(seconds=1)
+        for state in ("on", "off", "on", "off"):
+            self.hass.states.set("light.hidden", state, {"hidden": True})
+            self.wait_recording_done()
+        self.hass.states.set("light.visible", "on")
+        self.wait_recording_done()
+
+        hist = history.get_significant_states(
+            self.hass,
+            start,
+            filters=history.Filters(),
+            include_start_time_state=False,
+            minimal_response=True,
+        )
+
+        assert list(hist) == ["light.visible"]
+
+    def test_get_significant_states_minimal_response_hidden_first(self):
+        """Test the first minimal point is a state after a hidden old row."""
+        self.init_recorder()
+        start = dt_util.utcnow() - timedelta(seconds=1)
+        for state in ("on", "off", "on", "off"):
+            self.hass.states.set("light.test", state)
+            self.wait_recording_done()
+
+        # A row stored before the shared attributes table
+        with session_scope(hass=self.hass) as session:
+            db_state = (
+                session.query(States)
+                .filter(States.entity_id == "light.test")
+                .order_by(States.state_id)
+                .first()
+            )
+            db_state.attributes = '{"hidden": true}'
+            db_state.attributes_id = None
+
+        hist = history.get_significant_states(
+            self.hass,
+            start,
+            filters=history.Filters(),
+            include_start_time_state=False,
+            minimal_response=True,
+        )
+
+        first, middle, last = hist["light.test"]
+        assert isinstance(first, ha.State)
+        assert first.state == "off"
+        assert middle.keys() == {"state", "last_changed"}
+        assert isinstance(last, ha.State)
+
     def test_get_significant_states_with_initial(self):
         """Test that only significant states are returned.
 
@@ -650,3 +814,135 @@ async def test_fetch_period_api_with_include_order(hass, hass_client):
         params={"filter_entity_id": "non.existing,something.else"},
     )
     assert response.status == 200
+
+
+async def test_fetch_period_api_stream(hass, hass_client):
+    """Test the fetch period view streams the same history."""
+    await hass.async_add_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    start = dt_util.utcnow()
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("light.kitchen", "off")
+    hass.states.async_set("sensor.temperature", "20")
+    await hass.async_block_till_done()
+    await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    url = "/api/history/period/{}".format(start.isoformat())
+    response = await client.get(url)
+    assert response.status == 200
+    expected = await response.json()
+
+    response = await client.get(url, params={"stream": ""})
+    assert response.status == 200
+    result = await response.json()
+
+    assert [[state["state"] for state in states] for states in result] == [
+        ["on", "off"],
+        ["20"],
+    ]
+    assert sorted(result, key=lambda states: states[0]["entity_id"]) == sorted(
+        expected, key=lambda states: states[0]["entity_id"]
+    )
+
+
+async def test_fetch_period_api_minimal_response(hass, hass_client):
+    """Test the fetch period view with minimal_response."""
+    await hass.async_add_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    start = dt_util.utcnow()
+    for state in ("on", "off", "on"):
+        hass.states.async_set("light.kitchen", state, {"brightness": 100})
+        await hass.async_block_till_done()
+        await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    response = await client.get(
+        "/api/history/period/{}".format(start.isoformat()),
+        params={"minimal_response": "", "skip_initial_state": ""},
+    )
+    assert response.status == 200
+    result = await response.json()
+
+    assert len(result) == 1
+    first, middle, last = result[0]
+    assert first["attributes"] == {"brightness": 100}
+    assert middle.keys() == {"state", "last_changed"}
+    assert middle["state"] == "off"
+    assert last["attributes"] == {"brightness": 100}
+
+
+async def test_fetch_period_api_stream_order(hass, hass_client):
+    """Test the streamed history keeps the order of the request."""
+    await hass.async_add_job(init_recorder_component, hass)
+    await async_setup_component(
+        hass,
+        "history",
+        {
+            "history": {
+                "use_include_order": True,
+                "include": {"entities": ["switch.c", "light.kitchen"]},
+            }
+        },
+    )
+    start = dt_util.utcnow()
+    for entity_id in ("light.kitchen", "sensor.temperature", "switch.c"):
+        hass.states.async_set(entity_id, "on")
+    await hass.async_block_till_done()
+    await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    url = "/api/history/period/{}".format(start.isoformat())
+    params = {"filter_entity_id": "sensor.temperature,light.kitchen,switch.c"}
+    response = await client.get(url, params=params)
+    assert response.status == 200
+    expected = await response.json()
+
+    response = await client.get(url, params={**params, "stream": ""})
+    assert response.status == 200
+    result = await response.json()
+
+    assert [states[0]["entity_id"] for states in result] == [
+        "switch.c",
+        "light.kitchen",
+        "sensor.temperature",
+    ]
+    assert result == expected
+
+
+async def test_fetch_period_api_stream_minimal_response(hass, hass_client):
+    """Test the streamed history honours minimal_response."""
+    await hass.async_add_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    start = dt_util.utcnow()
+    for state in ("on", "off", "on", "off"):
+        hass.states.async_set("light.kitchen", state, {"brightness": 100})
+        hass.states.async_set("sensor.temperature", state)
+        await hass.async_block_till_done()
+        await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    url = "/api/history/period/{}".format(start.isoformat())
+    params = {"minimal_response": "", "skip_initial_state": ""}
+    response = await client.get(url, params=params)
+    assert response.status == 200
+    expected = await response.json()
+
+    with patch.object(history, "STREAM_BATCH_SIZE", 3):
+        response = await client.get(url, params={**params, "stream": ""})
+    assert response.status == 200
+    result = await response.json()
+
+    assert [[point["state"] for point in states] for states in result] == [
+        ["on", "off", "on", "off"],
+        ["on", "off", "on", "off"],
+    ]
+    for states in result:
+        assert "attributes" in states[0]
+        assert [point.keys() for point in states[1:-1]] == [
+            {"state", "last_changed"}
+        ] * 2
+        assert "attributes" in states[-1]
+    assert sorted(result, key=lambda states: states[0]["entity_id"]) == sorted(
+        expected, key=lambda states: states[0]["entity_id"]
+    )
@@ -1,5 +1,6 @@
 """The test for the History Statistics sensor platform."""
 # pylint: disable=protected-access
+import asyncio
 from datetime import datetime, timedelta
 import unittest
 from unittest.mock import patch
@@ -97,6 +98,7 @@ class TestHistoryStatsSensor(unittest.TestCase):
 
     def test_measure(self):
         """Test the history statistics sensor measure."""
+        self.init_recorder()
         t0 = dt_util.utcnow() - timedelta(minutes=40)
         t1 = t0 + timedelta(minutes=20)
         t2 = dt_util.utcnow() - timedelta(minutes=10)
@@ -141,10 +143,11 @@ class TestHistoryStatsSensor(unittest.TestCase):
             return_value=fake_states,
         ):
             with patch("homeassistant.components.history.get_state", return_value=None):
-                sensor1.update()
-                sensor2.update()
-                sensor3.update()
-                sensor4.update()
+                for sensor in (sensor1, sensor2, sensor3, sensor4):
+                    sensor.hass = self.hass
+                    asyncio.run_coroutine_threadsafe(
+                        sensor.async_update(), self.hass.loop
+                    ).result()
 
         assert sensor1.state == 0.5
         assert sensor2.state is None
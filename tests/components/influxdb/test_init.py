@@ -6,9 +6,20 @@ from unittest import mock
 import homeassistant.components.influxdb as influxdb
 from homeassistant.const import EVENT_STATE_CHANGED, STATE_OFF, STATE_ON, STATE_STANDBY
 from homeassistant.setup import setup_component
+import homeassistant.util.dt as dt_util
 
 from tests.common import get_test_home_assistant
 
+TIME_FIRED = datetime.datetime(2020, 1, 1, 0, 0, 0, 250000, tzinfo=dt_util.UTC)
+TIME_FIRED_NS = 1577836800250000000
+
+
+def _written_lines(mock_client):
+    """Return the lines of the last write."""
+    args, kwargs = mock_client.return_value.write_points.call_args
+    assert kwargs == {"protocol": "line"}
+    return args[0]
+
 
 @mock.patch("homeassistant.components.influxdb.InfluxDBClient")
 @mock.patch(
@@ -88,14 +99,14 @@ class TestInfluxDB(unittest.TestCase):
         """Test the event listener."""
         self._setup(mock_client)
 
-        # map of HA State to valid influxdb [state, value] fields
+        # map of HA State to valid influxdb state and value fields
         valid = {
-            "1": [None, 1],
-            "1.0": [None, 1.0],
-            STATE_ON: [STATE_ON, 1],
-            STATE_OFF: [STATE_OFF, 0],
-            STATE_STANDBY: [STATE_STANDBY, None],
-            "foo": ["foo", None],
+            "1": "value=1.0",
+            "1.0": "value=1.0",
+            STATE_ON: 'state="on",value=1.0',
+            STATE_OFF: 'state="off",value=0.0',
+            STATE_STANDBY: 'state="standby"',
+            "foo": 'state="foo"',
         }
         for in_, out in valid.items():
             attrs = {
@@ -115,37 +126,22 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="entity",
                 attributes=attrs,
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "foobars",
-                    "tags": {"domain": "fake", "entity_id": "entity"},
-                    "time": 12345,
-                    "fields": {
-                        "longitude": 1.1,
-                        "latitude": 2.2,
-                        "battery_level_str": "99%",
-                        "battery_level": 99.0,
-                        "temperature_str": "20c",
-                        "temperature": 20.0,
-                        "last_seen_str": "Last seen 23 minutes ago",
-                        "last_seen": 23.0,
-                        "updated_at_str": "2017-01-01 00:00:00",
-                        "updated_at": 20170101000000,
-                        "multi_periods_str": "0.120.240.2023873",
-                    },
-                }
+                f"foobars,domain=fake,entity_id=entity {out},"
+                "longitude=1.1,latitude=2.2,"
+                'battery_level_str="99%",battery_level=99.0,'
+                'temperature_str="20c",temperature=20.0,'
+                'last_seen_str="Last seen 23 minutes ago",last_seen=23.0,'
+                'updated_at_str="2017-01-01 00:00:00",updated_at=20170101000000.0,'
+                f'multi_periods_str="0.120.240.2023873" {TIME_FIRED_NS}'
             ]
-            if out[0] is not None:
-                body[0]["fields"]["state"] = out[0]
-            if out[1] is not None:
-                body[0]["fields"]["value"] = out[1]
 
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
 
             assert mock_client.return_value.write_points.call_count == 1
-            assert mock_client.return_value.write_points.call_args == mock.call(body)
+            assert _written_lines(mock_client) == body
             mock_client.return_value.write_points.reset_mock()
 
     def test_event_listener_no_units(self, mock_client):
@@ -164,19 +160,15 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="entity",
                 attributes=attrs,
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "fake.entity-id",
-                    "tags": {"domain": "fake", "entity_id": "entity"},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                "fake.entity-id,domain=fake,entity_id=entity "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             assert mock_client.return_value.write_points.call_count == 1
-            assert mock_client.return_value.write_points.call_args == mock.call(body)
+            assert _written_lines(mock_client) == body
             mock_client.return_value.write_points.reset_mock()
 
     def test_event_listener_inf(self, mock_client):
@@ -191,19 +183,14 @@ class TestInfluxDB(unittest.TestCase):
             object_id="entity",
             attributes=attrs,
         )
-        event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+        event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
         body = [
-            {
-                "measurement": "fake.entity-id",
-                "tags": {"domain": "fake", "entity_id": "entity"},
-                "time": 12345,
-                "fields": {"value": 8},
-            }
+            f"fake.entity-id,domain=fake,entity_id=entity value=8.0 {TIME_FIRED_NS}"
         ]
         self.handler_method(event)
         self.hass.data[influxdb.DOMAIN].block_till_done()
         assert mock_client.return_value.write_points.call_count == 1
-        assert mock_client.return_value.write_points.call_args == mock.call(body)
+        assert _written_lines(mock_client) == body
         mock_client.return_value.write_points.reset_mock()
 
     def test_event_listener_states(self, mock_client):
@@ -218,22 +205,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="entity",
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "fake.entity-id",
-                    "tags": {"domain": "fake", "entity_id": "entity"},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                "fake.entity-id,domain=fake,entity_id=entity "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if state_state == 1:
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -250,22 +231,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id=entity_id,
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "fake.{}".format(entity_id),
-                    "tags": {"domain": "fake", "entity_id": entity_id},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"fake.{entity_id},domain=fake,entity_id={entity_id} "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == "ok":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -282,22 +257,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="something",
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "{}.something".format(domain),
-                    "tags": {"domain": domain, "entity_id": "something"},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"{domain}.something,domain={domain},entity_id=something "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if domain == "ok":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -324,22 +293,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id=entity_id,
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "fake.{}".format(entity_id),
-                    "tags": {"domain": "fake", "entity_id": entity_id},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"fake.{entity_id},domain=fake,entity_id={entity_id} "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == "included":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -366,22 +329,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="something",
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "{}.something".format(domain),
-                    "tags": {"domain": domain, "entity_id": "something"},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"{domain}.something,domain={domain},entity_id=something "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if domain == "fake":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -408,22 +365,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="something",
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "{}.something".format(domain),
-                    "tags": {"domain": domain, "entity_id": "something"},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"{domain}.something,domain={domain},entity_id=something "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if domain == "fake":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -436,22 +387,16 @@ class TestInfluxDB(unittest.TestCase):
                 object_id=entity_id,
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "other.{}".format(entity_id),
-                    "tags": {"domain": "other", "entity_id": entity_id},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"other.{entity_id},domain=other,entity_id={entity_id} "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == "one":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -460,14 +405,14 @@ class TestInfluxDB(unittest.TestCase):
         """Test the event listener when an attribute has an invalid type."""
         self._setup(mock_client)
 
-        # map of HA State to valid influxdb [state, value] fields
+        # map of HA State to valid influxdb state and value fields
         valid = {
-            "1": [None, 1],
-            "1.0": [None, 1.0],
-            STATE_ON: [STATE_ON, 1],
-            STATE_OFF: [STATE_OFF, 0],
-            STATE_STANDBY: [STATE_STANDBY, None],
-            "foo": ["foo", None],
+            "1": "value=1.0",
+            "1.0": "value=1.0",
+            STATE_ON: 'state="on",value=1.0',
+            STATE_OFF: 'state="off",value=0.0',
+            STATE_STANDBY: 'state="standby"',
+            "foo": 'state="foo"',
         }
         for in_, out in valid.items():
             attrs = {
@@ -483,28 +428,17 @@ class TestInfluxDB(unittest.TestCase):
                 object_id="entity",
                 attributes=attrs,
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "foobars",
-                    "tags": {"domain": "fake", "entity_id": "entity"},
-                    "time": 12345,
-                    "fields": {
-                        "longitude": 1.1,
-                        "latitude": 2.2,
-                        "invalid_attribute_str": "['value1', 'value2']",
-                    },
-                }
+                f"foobars,domain=fake,entity_id=entity {out},"
+                "longitude=1.1,latitude=2.2,"
+                f"invalid_attribute_str=\"['value1', 'value2']\" {TIME_FIRED_NS}"
             ]
-            if out[0] is not None:
-                body[0]["fields"]["state"] = out[0]
-            if out[1] is not None:
-                body[0]["fields"]["value"] = out[1]
 
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             assert mock_client.return_value.write_points.call_count == 1
-            assert mock_client.return_value.write_points.call_args == mock.call(body)
+            assert _written_lines(mock_client) == body
             mock_client.return_value.write_points.reset_mock()
 
     def test_event_listener_default_measurement(self, mock_client):
@@ -530,22 +464,15 @@ class TestInfluxDB(unittest.TestCase):
                 object_id=entity_id,
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": "state",
-                    "tags": {"domain": "fake", "entity_id": entity_id},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"state,domain=fake,entity_id={entity_id} value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == "ok":
                 assert mock_client.return_value.write_points.call_count == 1
-                assert mock_client.return_value.write_points.call_args == mock.call(
-                    body
-                )
+                assert _written_lines(mock_client) == body
             else:
                 assert not mock_client.return_value.write_points.called
             mock_client.return_value.write_points.reset_mock()
@@ -572,19 +499,15 @@ class TestInfluxDB(unittest.TestCase):
             object_id="entity",
             attributes=attrs,
         )
-        event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+        event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
         body = [
-            {
-                "measurement": "state",
-                "tags": {"domain": "fake", "entity_id": "entity"},
-                "time": 12345,
-                "fields": {"state": "foo", "unit_of_measurement_str": "foobars"},
-            }
+            'state,domain=fake,entity_id=entity state="foo",'
+            f'unit_of_measurement_str="foobars" {TIME_FIRED_NS}'
         ]
         self.handler_method(event)
         self.hass.data[influxdb.DOMAIN].block_till_done()
         assert mock_client.return_value.write_points.call_count == 1
-        assert mock_client.return_value.write_points.call_args == mock.call(body)
+        assert _written_lines(mock_client) == body
         mock_client.return_value.write_points.reset_mock()
 
     def test_event_listener_tags_attributes(self, mock_client):
@@ -609,23 +532,15 @@ class TestInfluxDB(unittest.TestCase):
             object_id="something",
             attributes=attrs,
         )
-        event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+        event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
         body = [
-            {
-                "measurement": "fake.something",
-                "tags": {
-                    "domain": "fake",
-                    "entity_id": "something",
-                    "friendly_fake": "tag_str",
-                },
-                "time": 12345,
-                "fields": {"value": 1, "field_fake_str": "field_str"},
-            }
+            "fake.something,domain=fake,entity_id=something,friendly_fake=tag_str "
+            f'value=1.0,field_fake_str="field_str" {TIME_FIRED_NS}'
         ]
         self.handler_method(event)
         self.hass.data[influxdb.DOMAIN].block_till_done()
         assert mock_client.return_value.write_points.call_count == 1
-        assert mock_client.return_value.write_points.call_args == mock.call(body)
+        assert _written_lines(mock_client) == body
         mock_client.return_value.write_points.reset_mock()
 
     def test_event_listener_component_override_measurement(self, mock_client):
@@ -664,19 +579,15 @@ class TestInfluxDB(unittest.TestCase):
                 object_id=comp["id"],
                 attributes={},
             )
-            event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
             body = [
-                {
-                    "measurement": comp["res"],
-                    "tags": {"domain": comp["domain"], "entity_id": comp["id"]},
-                    "time": 12345,
-                    "fields": {"value": 1},
-                }
+                f"{comp['res']},domain={comp['domain']},entity_id={comp['id']} "
+                f"value=1.0 {TIME_FIRED_NS}"
             ]
             self.handler_method(event)
             self.hass.data[influxdb.DOMAIN].block_till_done()
             assert mock_client.return_value.write_points.call_count == 1
-            assert mock_client.return_value.write_points.call_args == mock.call(body)
+            assert _written_lines(mock_client) == body
             mock_client.return_value.write_points.reset_mock()
 
     def test_scheduled_write(self, mock_client):
@@ -700,7 +611,7 @@ class TestInfluxDB(unittest.TestCase):
             object_id="entity",
             attributes={},
         )
-        event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+        event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
         mock_client.return_value.write_points.side_effect = IOError("foo")
 
         # Write fails
@@ -710,7 +621,9 @@ class TestInfluxDB(unittest.TestCase):
             assert mock_sleep.called
         json_data = mock_client.return_value.write_points.call_args[0][0]
         assert mock_client.return_value.write_points.call_count == 2
-        mock_client.return_value.write_points.assert_called_with(json_data)
+        mock_client.return_value.write_points.assert_called_with(
+            json_data, protocol="line"
+        )
 
         # Write works again
         mock_client.return_value.write_points.side_effect = None
@@ -720,6 +633,10 @@ class TestInfluxDB(unittest.TestCase):
             assert not mock_sleep.called
         assert mock_client.return_value.write_points.call_count == 3
 
+        info = self.hass.data[influxdb.DOMAIN].info()
+        assert info["lost_events"] == 1
+        assert info["written_events"] == 1
+
     def test_queue_backlog_full(self, mock_client):
         """Test the event listener to drop old events."""
         self._setup(mock_client)
@@ -731,7 +648,7 @@ class TestInfluxDB(unittest.TestCase):
             object_id="entity",
             attributes={},
         )
-        event = mock.MagicMock(data={"new_state": state}, time_fired=12345)
+        event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
 
         monotonic_time = 0
 
@@ -748,5 +665,57 @@ class TestInfluxDB(unittest.TestCase):
             self.hass.data[influxdb.DOMAIN].block_till_done()
 
             assert mock_client.return_value.write_points.call_count == 0
+            assert self.hass.data[influxdb.DOMAIN].info()["dropped_events"] == 1
 
         mock_client.return_value.write_points.reset_mock()
+
+    def test_event_listener_escaping(self, mock_client):
+        """Test names and values are escaped in the line protocol."""
+        self._setup(mock_client, tags={"site": "main hall"}, tags_attributes=["room"])
+
+        state = mock.MagicMock(
+            state="open, mostly",
+            domain="fake",
+            entity_id="fake.entity",
+            object_id="entity",
+            attributes={
+                "unit_of_measurement": "m, s",
+                "room": "living=room",
+                "quoted": 'say "hi"',
+                "air quality": "good",
+            },
+        )
+        for room, escaped_room in (
+            ("living=room", r"living\=room"),
+            ("kitchen", "kitchen"),
+        ):
+            state.attributes["room"] = room
+            event = mock.MagicMock(data={"new_state": state}, time_fired=TIME_FIRED)
+            self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
+
+            assert _written_lines(mock_client) == [
+                r"m\,\ s,domain=fake,entity_id=entity,"
+                rf"room={escaped_room},site=main\ hall "
+                r'state="open, mostly",quoted_str="say \"hi\"",'
+                rf'air\ quality_str="good" {TIME_FIRED_NS}'
+            ]
+
+    def test_batch_limits(self, mock_client):
+        """Test batches are cut at the configured size and bytes."""
+        hass = mock.MagicMock()
+        thread = influxdb.InfluxThread(
+            hass, mock_client, lambda event: event, 0, batch_size=3
+        )
+        for line in ("a", "b", "c", "d"):
+            thread.queue.put((influxdb.time.monotonic(), line))
+        assert thread.get_events_lines() == (3, ["a", "b", "c"])
+        assert thread.get_events_lines() == (1, ["d"])
+
+        thread = influxdb.InfluxThread(
+            hass, mock_client, lambda event: event, 0, batch_max_bytes=8
+        )
+        for line in ("aaa", "bbb", "ccc"):
+            thread.queue.put((influxdb.time.monotonic(), line))
+        assert thread.get_events_lines() == (2, ["aaa", "bbb"])
+        assert thread.get_events_lines() == (1, ["ccc"])
@@ -2,6 +2,7 @@
 # pylint: disable=protected-access,invalid-name
 from datetime import datetime, timedelta
 import logging
+from types import SimpleNamespace
 import unittest
 
 import pytest
@@ -1334,6 +1335,71 @@ async def test_logbook_view_period_entity(hass, hass_client):
     assert json[0]["entity_id"] == entity_id_test
 
 
+async def test_logbook_view_entity_excluded(hass, hass_client):
+    """Test the logbook view does not show an excluded entity by entity_id."""
+    await hass.async_add_job(init_recorder_component, hass)
+    config = logbook.CONFIG_SCHEMA(
+        {
+            ha.DOMAIN: {},
+            logbook.DOMAIN: {
+                logbook.CONF_EXCLUDE: {logbook.CONF_ENTITIES: ["switch.test"]}
+            },
+        }
+    )
+    await async_setup_component(hass, "logbook", config)
+    await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    hass.states.async_set("switch.test", STATE_OFF)
+    hass.states.async_set("switch.test", STATE_ON)
+    await hass.async_block_till_done()
+    await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+
+    start = dt_util.utcnow().date()
+    start_date = datetime(start.year, start.month, start.day)
+
+    response = await client.get(
+        "/api/logbook/{}?entity=switch.test".format(start_date.isoformat())
+    )
+    assert response.status == 200
+    json = await response.json()
+    assert len(json) == 0
+
+
+async def test_logbook_view_filters_state_rows(hass, hass_client):
+    """Test the logbook view filters state changes read from the database."""
+    await hass.async_add_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    hass.states.async_set("switch.test", STATE_OFF, {"friendly_name": "Test"})
+    hass.states.async_set("switch.test", STATE_ON, {"friendly_name": "Test"})
+    # Attribute only changes are not shown
+    hass.states.async_set("switch.test", STATE_ON, {"friendly_name": "Renamed"})
+    hass.states.async_set("switch.hidden", STATE_OFF, {ATTR_HIDDEN: True})
+    hass.states.async_set("switch.hidden", STATE_ON, {ATTR_HIDDEN: True})
+    hass.states.async_set("group.auto", STATE_OFF, {"auto": True})
+    hass.states.async_set("group.auto", STATE_ON, {"auto": True})
+    hass.states.async_set("switch.removed", STATE_OFF)
+    hass.states.async_remove("switch.removed")
+    await hass.async_block_till_done()
+    await hass.async_add_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    start = dt_util.utcnow().date()
+    start_date = datetime(start.year, start.month, start.day)
+
+    response = await client.get("/api/logbook/{}".format(start_date.isoformat()))
+    assert response.status == 200
+    json = await response.json()
+    assert len(json) == 1
+    assert json[0]["entity_id"] == "switch.test"
+    assert json[0]["name"] == "Test"
+    assert json[0]["message"] == "turned on"
+    assert json[0]["context_id"] is not None
+
+
 async def test_humanify_alexa_event(hass):
     """Test humanifying Alexa event."""
     hass.states.async_set("light.kitchen", "on", {"friendly_name": "Kitchen Light"})
@@ -1485,3 +1551,26 @@ async def test_humanify_script_started_event(hass):
     assert event2["domain"] == "script"
     assert event2["message"] == "started"
     assert event2["entity_id"] == "script.bye"
+
+
+def test_lazy_event_partial_state():
+    """Test events read from rows keep UTC times and find null data values."""
+    row = SimpleNamespace(
+        event_type=EVENT_STATE_CHANGED,
+        event_data='{"entity_id":"light.kitchen","old_state":null,"new_state":{}}',
+        entity_id="light.kitchen",
+        state=STATE_ON,
+        domain="light",
+        time_fired=datetime(2020, 1, 1, 12, 0),
+    )
+
+    orig_time_zone = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(dt_util.get_time_zone("America/New_York"))
+    try:
+        event = logbook.LazyEventPartialState(row)
+    finally:
+        dt_util.set_default_time_zone(orig_time_zone)
+
+    assert event.time_fired == datetime(2020, 1, 1, 12, 0, tzinfo=dt_util.UTC)
+    assert event.data_value_is_null("old_state")
+    assert not event.data_value_is_null("new_state")
@@ -808,3 +808,51 @@ async def test_mqtt_ws_subscription(hass, hass_ws_client):
     await client.send_json({"id": 8, "type": "unsubscribe_events", "subscription": 5})
     response = await client.receive_json()
     assert response["success"]
+
+
+def test_subscription_matcher():
+    """Test the subscription trie returns every matching subscription."""
+    matcher = mqtt.SubscriptionMatcher()
+    subscriptions = {
+        topic: mqtt.Subscription(topic, None)
+        for topic in (
+            "home/kitchen/temp",
+            "home/+/temp",
+            "home/#",
+            "#",
+            "+/kitchen/+",
+            "home/kitchen",
+            "$SYS/#",
+        )
+    }
+    for subscription in subscriptions.values():
+        matcher.add(subscription)
+
+    def matching(topic):
+        return sorted(sub.topic for sub in matcher.match(topic))
+
+    assert matching("home/kitchen/temp") == [
+        "#",
+        "+/kitchen/+",
+        "home/#",
+        "home/+/temp",
+        "home/kitchen/temp",
+    ]
+    assert matching("home") == ["#", "home/#"]
+    assert matching("home/kitchen") == ["#", "home/#", "home/kitchen"]
+    assert matching("garden/kitchen/temp") == ["#", "+/kitchen/+"]
+    assert matching("$SYS/broker/uptime") == ["$SYS/#"]
+
+    matcher.remove(subscriptions["home/kitchen/temp"])
+    matcher.remove(subscriptions["home/kitchen"])
+    assert matching("home/kitchen/temp") == [
+        "#",
+        "+/kitchen/+",
+        "home/#",
+        "home/+/temp",
+    ]
+    assert "kitchen" not in matcher._root.children["home"].children
+
+    for topic in ("home/+/temp", "home/#", "#", "+/kitchen/+", "$SYS/#"):
+        matcher.remove(subscriptions[topic])
+    assert not matcher._root.children
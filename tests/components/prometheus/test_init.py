@@ -116,3 +116,62 @@ def test_view(prometheus_client):  # pylint: disable=redefined-outer-name
         'entity="sensor.wind_direction",'
         'friendly_name="Wind Direction"} 25.0' in body
     )
+
+
+async def test_collect_on_scrape(hass, hass_client):
+    """Test the metrics are built from the states when scraped."""
+    assert await async_setup_component(
+        hass,
+        prometheus.DOMAIN,
+        {prometheus.DOMAIN: {"namespace": "scraped", "collect_on_scrape": True}},
+    )
+    await hass.async_block_till_done()
+
+    hass.states.async_set("switch.kitchen", "on", {"friendly_name": "Kitchen"})
+    hass.states.async_set("switch.hall", "off")
+    hass.states.async_set("automation.alarm", "on", {"friendly_name": "Alarm"})
+    hass.states.async_set(
+        "automation.alarm", "on", {"friendly_name": "Alarm", "last_triggered": 1}
+    )
+    hass.states.async_remove("switch.hall")
+    await hass.async_block_till_done()
+
+    client = await hass_client()
+    resp = await client.get(prometheus.API_ENDPOINT)
+    assert resp.status == 200
+    body = (await resp.text()).split("\n")
+
+    assert (
+        'scraped_switch_state{domain="switch",'
+        'entity="switch.kitchen",'
+        'friendly_name="Kitchen"} 1.0' in body
+    )
+    assert not any(
+        line.startswith("scraped_switch_state") and "switch.hall" in line
+        for line in body
+    )
+    assert (
+        'scraped_state_change_total{domain="switch",'
+        'entity="switch.hall",'
+        'friendly_name="None"} 1.0' in body
+    )
+    assert (
+        'scraped_state_change_total{domain="automation",'
+        'entity="automation.alarm",'
+        'friendly_name="Alarm"} 2.0' in body
+    )
+    assert (
+        'scraped_automation_triggered_count_total{domain="automation",'
+        'entity="automation.alarm",'
+        'friendly_name="Alarm"} 2.0' in body
+    )
+
+    hass.states.async_set("switch.kitchen", "off", {"friendly_name": "Kitchen"})
+    await hass.async_block_till_done()
+
+    body = (await (await client.get(prometheus.API_ENDPOINT)).text()).split("\n")
+    assert (
+        'scraped_switch_state{domain="switch",'
+        'entity="switch.kitchen",'
+        'friendly_name="Kitchen"} 0.0' in body
+    )
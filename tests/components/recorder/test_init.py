@@ -1,15 +1,17 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
+import threading
 import unittest
 from unittest.mock import patch
 
 import pytest
+from sqlalchemy import exc
 
-from homeassistant.components.recorder import Recorder
+from homeassistant.components.recorder import Recorder, RecorderQueue, get_instance
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, States
+from homeassistant.components.recorder.models import Events, StateAttributes, States
 from homeassistant.components.recorder.util import session_scope
-from homeassistant.const import MATCH_ALL
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED, MATCH_ALL
 from homeassistant.core import callback
 from homeassistant.setup import async_setup_component
 
@@ -222,3 +224,282 @@ async def test_defaults_set(hass):
     assert recorder_config is not None
     assert recorder_config["purge_keep_days"] == 10
     assert recorder_config["purge_interval"] == 1
+    assert recorder_config["commit_interval"] == 0
+    assert recorder_config["commit_batch_size"] == 100
+    assert recorder_config["purge_repack_threshold"] == 0
+
+
+def test_saving_events_in_one_commit(hass_recorder):
+    """Test queued events are written in a single batched commit."""
+    hass = hass_recorder({"commit_interval": 30})
+    instance = hass.data[DATA_INSTANCE]
+    commits = instance.commit_stats.commits
+
+    for idx in range(5):
+        hass.states.set("test.recorder{}".format(idx), "on")
+    hass.block_till_done()
+    # The flush requested here commits the batch before the interval passes
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 5
+
+    assert instance.commit_stats.commits == commits + 1
+    assert instance.commit_stats.last_batch_size == 5
+    assert instance.commit_stats.as_dict()["max_batch_size"] >= 5
+
+
+def test_saving_events_after_failed_commit(hass_recorder):
+    """Test a failed batch is written again one event at a time."""
+    hass = hass_recorder({"commit_interval": 30})
+    instance = hass.data[DATA_INSTANCE]
+    add_events = instance._add_events
+
+    def _add_events(session, events):
+        """Fail batches and the state change of test.bad."""
+        if len(events) > 1 or events[0].data.get("entity_id") == "test.bad":
+            raise exc.SQLAlchemyError("failed")
+        return add_events(session, events)
+
+    with patch.object(instance, "_add_events", side_effect=_add_events):
+        hass.states.set("test.good1", "on")
+        hass.states.set("test.bad", "on")
+        hass.states.set("test.good2", "on")
+        hass.block_till_done()
+        instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        entity_ids = {state.entity_id for state in session.query(States)}
+
+    assert entity_ids == {"test.good1", "test.good2"}
+
+
+def test_commit_batch_size_limit(hass_recorder):
+    """Test a full batch is committed without waiting for the interval."""
+    hass = hass_recorder({"commit_interval": 30, "commit_batch_size": 2})
+    instance = hass.data[DATA_INSTANCE]
+    commits = instance.commit_stats.commits
+
+    for idx in range(4):
+        hass.states.set("test.recorder{}".format(idx), "on")
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 4
+
+    assert instance.commit_stats.commits == commits + 2
+    assert instance.commit_stats.max_batch_size == 2
+
+
+def test_saving_states_share_attributes(hass_recorder):
+    """Test states with identical attributes share one attributes row."""
+    hass = hass_recorder()
+    attributes = {"test_attr": 5, "test_attr_10": "nice"}
+
+    hass.states.set("test.recorder1", "on", attributes)
+    hass.states.set("test.recorder2", "on", attributes)
+    hass.states.set("test.recorder1", "off", attributes)
+    hass.states.set("test.recorder2", "off", {"test_attr": 6})
+    hass.block_till_done()
+    hass.data[DATA_INSTANCE].block_till_done()
+
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States).order_by(States.state_id))
+        assert len(db_states) == 4
+        assert all(db_state.attributes is None for db_state in db_states)
+        assert session.query(StateAttributes).count() == 2
+        assert (
+            db_states[0].attributes_id
+            == db_states[1].attributes_id
+            == db_states[2].attributes_id
+        )
+        assert db_states[3].attributes_id != db_states[0].attributes_id
+        native = [db_state.to_native() for db_state in db_states]
+
+    assert native[2] == hass.states.get("test.recorder1")
+    assert native[3] == hass.states.get("test.recorder2")
+
+
+def test_queue_overflow_drop(hass_recorder):
+    """Test events are dropped when the queue is full."""
+    hass = hass_recorder({"queue_limit": 2})
+    instance = hass.data[DATA_INSTANCE]
+    dropped = instance.dropped_events
+
+    with patch.object(instance.queue, "qsize", return_value=2):
+        hass.states.set("test.recorder", "on")
+        hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 0
+
+    assert instance.dropped_events == dropped + 1
+
+
+def test_queue_overflow_drop_evicts_other_events(hass_recorder):
+    """Test a full queue gives up other events before state changes."""
+    hass = hass_recorder({"queue_limit": 2})
+    instance = hass.data[DATA_INSTANCE]
+    dropped = instance.dropped_events
+    # A queue the recorder thread does not consume from
+    pending = RecorderQueue()
+
+    with patch.object(instance, "queue", pending):
+        hass.bus.fire("test_event")
+        hass.states.set("test.recorder", "on")
+        hass.block_till_done()
+        hass.bus.fire("test_event")
+        hass.states.set("test.recorder", "off")
+        hass.states.set("test.recorder", "on")
+        hass.block_till_done()
+
+    queued = list(pending.queue)
+    assert [event.event_type for event in queued] == [EVENT_STATE_CHANGED] * 2
+    assert [event.data["new_state"].state for event in queued] == ["on", "off"]
+    assert pending.evictable == 0
+    assert instance.dropped_events == dropped + 3
+
+
+def test_queue_overflow_coalesce(hass_recorder):
+    """Test state changes are coalesced per entity when the queue is full."""
+    hass = hass_recorder({"queue_limit": 2, "queue_overflow": "coalesce"})
+    instance = hass.data[DATA_INSTANCE]
+    dropped = instance.dropped_events
+
+    with patch.object(instance.queue, "qsize", return_value=2):
+        hass.states.set("test.recorder", "on")
+        hass.states.set("test.recorder", "off")
+        hass.states.set("test.other", "on")
+        hass.bus.fire("test_event")
+        hass.block_till_done()
+
+    info = instance.async_queue_info()
+    assert info["overflow_pending"] == 2
+    assert info["coalesced_events"] == 1
+    assert info["dropped_events"] == dropped + 1
+
+    # The next commit makes room for the coalesced state changes
+    hass.states.set("test.trigger", "on")
+    hass.block_till_done()
+    instance.block_till_done()
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        states = {state.entity_id: state.state for state in session.query(States)}
+
+    assert states == {"test.trigger": "on", "test.recorder": "off", "test.other": "on"}
+    assert instance.async_queue_info()["overflow_pending"] == 0
+
+
+def test_queue_overflow_coalesce_keeps_order(hass_recorder):
+    """Test a state change does not overtake a pending coalesced one."""
+    hass = hass_recorder({"queue_limit": 2, "queue_overflow": "coalesce"})
+    instance = hass.data[DATA_INSTANCE]
+
+    with patch.object(instance.queue, "qsize", return_value=2):
+        hass.states.set("test.recorder", "on")
+        hass.block_till_done()
+
+    # The queue has room again, but the entity still has a pending state
+    hass.states.set("test.recorder", "off")
+    hass.block_till_done()
+    assert instance.async_queue_info()["overflow_pending"] == 1
+
+    hass.states.set("test.trigger", "on")
+    hass.block_till_done()
+    instance.block_till_done()
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        states = [
+            state.state
+            for state in session.query(States)
+            .filter(States.entity_id == "test.recorder")
+            .order_by(States.state_id)
+        ]
+
+    assert states == ["off"]
+    assert instance.async_queue_info()["overflow_pending"] == 0
+
+
+def test_queue_overflow_block_till_done(hass_recorder):
+    """Test waiting for the recorder writes the coalesced state changes."""
+    hass = hass_recorder({"queue_limit": 2, "queue_overflow": "coalesce"})
+    instance = hass.data[DATA_INSTANCE]
+
+    with patch.object(instance.queue, "qsize", return_value=2):
+        hass.states.set("test.recorder", "on")
+        hass.block_till_done()
+
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        states = [state.entity_id for state in session.query(States)]
+
+    assert states == ["test.recorder"]
+    assert instance.async_queue_info()["overflow_pending"] == 0
+
+
+def test_queue_overflow_written_on_stop(hass_recorder):
+    """Test the coalesced state changes are written before shutting down."""
+    hass = hass_recorder({"queue_limit": 2, "queue_overflow": "coalesce"})
+    instance = hass.data[DATA_INSTANCE]
+    commit_events = instance._commit_events
+    committed = []
+
+    def mock_commit_events(events):
+        """Record the events of each commit."""
+        committed.extend(events)
+        commit_events(events)
+
+    with patch.object(instance.queue, "qsize", return_value=2):
+        hass.states.set("test.recorder", "on")
+        hass.block_till_done()
+
+    with patch.object(instance, "_commit_events", mock_commit_events):
+        hass.bus.fire(EVENT_HOMEASSISTANT_STOP)
+        hass.block_till_done()
+
+    assert not instance.is_alive()
+    assert [
+        event.data["entity_id"]
+        for event in committed
+        if event.event_type == EVENT_STATE_CHANGED
+    ] == ["test.recorder"]
+
+
+async def test_websocket_info(hass, hass_ws_client):
+    """Test the recorder info websocket command."""
+    await hass.async_add_job(init_recorder_component, hass, {"queue_limit": 10})
+    client = await hass_ws_client(hass)
+
+    await client.send_json({"id": 5, "type": "recorder/info"})
+    response = await client.receive_json()
+
+    assert response["success"]
+    assert response["result"]["queue_limit"] == 10
+    assert response["result"]["queue_overflow"] == "drop"
+    assert "last_lag" in response["result"]["commits"]
+
+
+async def test_async_add_executor_job(hass):
+    """Test queries run in the read executor of the recorder."""
+    await hass.async_add_job(init_recorder_component, hass)
+    hass.states.async_set("test.recorder", "on")
+    await hass.async_block_till_done()
+    await hass.async_add_job(hass.data[DATA_INSTANCE].block_till_done)
+
+    def _query():
+        """Return the recorded states and the name of the running thread."""
+        with session_scope(hass=hass) as session:
+            states = [state.state for state in session.query(States)]
+        return states, threading.current_thread().name
+
+    states, thread_name = await get_instance(hass).async_add_executor_job(_query)
+
+    assert states == ["on"]
+    assert thread_name.startswith("Recorder Read")
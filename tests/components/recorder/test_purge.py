@@ -6,7 +6,7 @@ from unittest.mock import patch
 
 from homeassistant.components import recorder
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, States
+from homeassistant.components.recorder.models import Events, StateAttributes, States
 from homeassistant.components.recorder.purge import purge_old_data
 from homeassistant.components.recorder.util import session_scope
 
@@ -107,6 +107,100 @@ class TestRecorderPurge(unittest.TestCase):
             # we should only have 2 states left after purging
             assert states.count() == 2
 
+    def test_purge_old_states_in_batches(self):
+        """Test deleting old states a batch at a time."""
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+
+        with session_scope(hass=self.hass) as session, patch(
+            "homeassistant.components.recorder.purge.PURGE_BATCH_SIZE", 3
+        ):
+            states = session.query(States)
+            assert states.count() == 6
+
+            assert not purge_old_data(instance, 4, repack=False)
+            assert states.count() == 3
+            assert instance.purge_progress.states == 3
+
+            assert purge_old_data(instance, 4, repack=False)
+            assert states.count() == 2
+            assert instance.purge_progress.states == 0
+            assert instance.purge_progress.rows_since_repack >= 4
+
+    def test_purge_repack_threshold(self):
+        """Test repacking once enough rows got purged."""
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+        instance.purge_repack_threshold = 4
+
+        with patch.object(instance.engine, "execute") as mock_execute:
+            assert purge_old_data(instance, 4, repack=False)
+
+        mock_execute.assert_called_once_with("VACUUM")
+        assert instance.purge_progress.rows_since_repack == 0
+
+    def test_purge_orphaned_attributes(self):
+        """Test deleting shared attributes no state refers to."""
+        now = datetime.now()
+        eleven_days_ago = now - timedelta(days=11)
+
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+
+        with recorder.session_scope(hass=self.hass) as session:
+            for timestamp, attrs in ((eleven_days_ago, "{}"), (now, '{"a": 1}')):
+                session.add(
+                    States(
+                        entity_id="test.recorder2",
+                        domain="sensor",
+                        state="on",
+                        state_attributes=StateAttributes(
+                            hash=StateAttributes.hash_shared_attrs(attrs),
+                            shared_attrs=attrs,
+                        ),
+                        last_changed=timestamp,
+                        last_updated=timestamp,
+                        created=timestamp,
+                    )
+                )
+
+        with session_scope(hass=self.hass) as session:
+            attributes = session.query(StateAttributes)
+            assert attributes.count() == 2
+
+            purge_old_data(self.hass.data[DATA_INSTANCE], 4, repack=False)
+
+            assert attributes.count() == 1
+            assert attributes.one().shared_attrs == '{"a": 1}'
+
+    def test_purge_orphaned_attributes_in_batches(self):
+        """Test deleting orphaned shared attributes a batch at a time."""
+        instance = self.hass.data[DATA_INSTANCE]
+        self.hass.block_till_done()
+        instance.block_till_done()
+
+        with recorder.session_scope(hass=self.hass) as session:
+            referenced = session.query(StateAttributes).count()
+            for idx in range(5):
+                attrs = '{{"a": {}}}'.format(idx)
+                session.add(
+                    StateAttributes(
+                        hash=StateAttributes.hash_shared_attrs(attrs),
+                        shared_attrs=attrs,
+                    )
+                )
+
+        with session_scope(hass=self.hass) as session, patch(
+            "homeassistant.components.recorder.purge.PURGE_BATCH_SIZE", 3
+        ):
+            attributes = session.query(StateAttributes)
+
+            assert not purge_old_data(instance, 4, repack=False)
+            assert attributes.count() == referenced + 2
+
+            assert purge_old_data(instance, 4, repack=False)
+            assert attributes.count() == referenced
+
     def test_purge_old_events(self):
         """Test deleting old events."""
         self._add_test_events()
@@ -173,7 +267,4 @@ class TestRecorderPurge(unittest.TestCase):
                 self.hass.services.call("recorder", "purge", service_data=service_data)
                 self.hass.block_till_done()
                 self.hass.data[DATA_INSTANCE].block_till_done()
-                assert (
-                    mock_logger.debug.mock_calls[3][1][0]
-                    == "Vacuuming SQL DB to free space"
-                )
+                mock_logger.debug.assert_any_call("Vacuuming SQL DB to free space")
@@ -0,0 +1,73 @@
+"""The tests for the rolling statistics of the statistics sensor."""
+from collections import deque
+import random
+import statistics
+
+import pytest
+
+from homeassistant.components.statistics.rolling import RollingStatistics
+
+
+def _assert_matches(stats, values):
+    """Assert the rolling statistics match the statistics module."""
+    assert list(stats.values) == list(values)
+    assert stats.total == pytest.approx(sum(values))
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.median == statistics.median(values)
+    assert stats.min == min(values)
+    assert stats.max == max(values)
+    if len(values) > 1:
+        assert stats.variance == pytest.approx(statistics.variance(values))
+        assert stats.stdev == pytest.approx(statistics.stdev(values))
+    else:
+        assert stats.variance is None
+        assert stats.stdev is None
+
+
+def test_empty():
+    """Test the statistics of an empty window."""
+    stats = RollingStatistics(5)
+
+    assert len(stats) == 0
+    assert stats.total == 0
+    assert stats.mean is None
+    assert stats.median is None
+    assert stats.variance is None
+    assert stats.min is None
+    assert stats.max is None
+
+    stats.append(3.5)
+    assert stats.popleft() == 3.5
+    assert stats.mean is None
+    assert stats.total == 0
+
+
+@pytest.mark.parametrize("maxlen", [1, 2, 7, 100])
+def test_matches_statistics_module(maxlen):
+    """Test values added and aged out match a recomputation."""
+    rnd = random.Random(maxlen)
+    stats = RollingStatistics(maxlen)
+    values = deque(maxlen=maxlen)
+
+    for _ in range(1000):
+        if values and rnd.random() < 0.3:
+            assert stats.popleft() == values.popleft()
+        else:
+            value = round(rnd.uniform(-50, 1000), rnd.randint(0, 3))
+            stats.append(value)
+            values.append(value)
+
+        if values:
+            _assert_matches(stats, values)
+
+
+def test_duplicate_values():
+    """Test removing a value present more than once."""
+    stats = RollingStatistics(3)
+
+    for value in (2.0, 1.0, 2.0, 2.0, 5.0):
+        stats.append(value)
+
+    _assert_matches(stats, [2.0, 2.0, 5.0])
+    stats.popleft()
+    _assert_matches(stats, [2.0, 5.0])
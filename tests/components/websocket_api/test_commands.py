@@ -1,4 +1,6 @@
 """Tests for WebSocket API commands."""
+from unittest.mock import patch
+
 from async_timeout import timeout
 
 from homeassistant.components.websocket_api import const
@@ -185,6 +187,46 @@ async def test_subscribe_unsubscribe_events(hass, websocket_client):
     assert sum(hass.bus.async_listeners().values()) == init_count
 
 
+async def test_subscribe_events_shared_json(hass, websocket_client):
+    """Test an event is encoded once for all subscriptions."""
+    for iden in (5, 6):
+        await websocket_client.send_json(
+            {"id": iden, "type": "subscribe_events", "event_type": "test_event"}
+        )
+        msg = await websocket_client.receive_json()
+        assert msg["success"]
+
+    with patch("homeassistant.core.JSON_DUMP", wraps=const.JSON_DUMP) as mock_dump:
+        hass.bus.async_fire("test_event", {"hello": "world"})
+
+        with timeout(3):
+            first = await websocket_client.receive_json()
+            second = await websocket_client.receive_json()
+
+    assert len(mock_dump.mock_calls) == 1
+    assert {first["id"], second["id"]} == {5, 6}
+    assert first["event"] == second["event"]
+    assert first["event"]["data"] == {"hello": "world"}
+
+
+async def test_subscribe_events_invalid_json(hass, websocket_client):
+    """Test an event that cannot be serialized is reported."""
+    await websocket_client.send_json(
+        {"id": 5, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    hass.bus.async_fire("test_event", {"hello": float("nan")})
+
+    with timeout(3):
+        msg = await websocket_client.receive_json()
+
+    assert msg["id"] == 5
+    assert not msg["success"]
+    assert msg["error"]["code"] == const.ERR_UNKNOWN_ERROR
+
+
 async def test_get_states(hass, websocket_client):
     """Test get_states command."""
     hass.states.async_set("greeting.hello", "world")
@@ -199,7 +241,7 @@ async def test_get_states(hass, websocket_client):
 
     states = []
     for state in hass.states.async_all():
-        state = state.as_dict()
+        state = dict(state.as_dict())
         state["last_changed"] = state["last_changed"].isoformat()
         state["last_updated"] = state["last_updated"].isoformat()
         states.append(state)
@@ -207,6 +249,23 @@ async def test_get_states(hass, websocket_client):
     assert msg["result"] == states
 
 
+async def test_get_states_shared_json(hass, websocket_client):
+    """Test get_states reuses the JSON cached on the states."""
+    hass.states.async_set("greeting.hello", "world")
+
+    with patch("homeassistant.core.JSON_DUMP", wraps=const.JSON_DUMP) as mock_dump:
+        for iden in (5, 6):
+            await websocket_client.send_json({"id": iden, "type": "get_states"})
+            msg = await websocket_client.receive_json()
+            assert msg["id"] == iden
+            assert msg["success"]
+            assert {state["entity_id"]: state["state"] for state in msg["result"]}[
+                "greeting.hello"
+            ] == "world"
+
+    assert len(mock_dump.mock_calls) == len(hass.states.async_all())
+
+
 async def test_get_services(hass, websocket_client):
     """Test get_services command."""
     await websocket_client.send_json({"id": 5, "type": "get_services"})
@@ -313,6 +372,110 @@ async def test_states_filters_visible(hass, hass_admin_user, websocket_client):
     assert msg["result"][0]["entity_id"] == "test.entity"
 
 
+async def test_subscribe_entities(hass, websocket_client):
+    """Test subscribe entities sends a snapshot and then only changes."""
+    hass.states.async_set("light.permitted", "off", {"color": "red", "bright": 1})
+    state = hass.states.get("light.permitted")
+
+    await websocket_client.send_json({"id": 7, "type": "subscribe_entities"})
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 7
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 7
+    assert msg["type"] == "event"
+    assert msg["event"] == {
+        "a": {
+            "light.permitted": {
+                "s": "off",
+                "a": {"color": "red", "bright": 1},
+                "c": state.context.id,
+                "lc": state.last_changed.timestamp(),
+            }
+        }
+    }
+
+    hass.states.async_set("light.permitted", "on", {"color": "blue"})
+    state = hass.states.get("light.permitted")
+
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {
+        "c": {
+            "light.permitted": {
+                "+": {
+                    "s": "on",
+                    "a": {"color": "blue"},
+                    "c": state.context.id,
+                    "lc": state.last_changed.timestamp(),
+                },
+                "-": {"a": ["bright"]},
+            }
+        }
+    }
+
+    hass.states.async_set("light.new", "off")
+    hass.states.async_remove("light.permitted")
+    state = hass.states.get("light.new")
+
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {
+        "a": {
+            "light.new": {
+                "s": "off",
+                "a": {},
+                "c": state.context.id,
+                "lc": state.last_changed.timestamp(),
+            }
+        }
+    }
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {"r": ["light.permitted"]}
+
+
+async def test_subscribe_entities_filters(hass, websocket_client, hass_admin_user):
+    """Test subscribe entities only sends entities we may and want to see."""
+    hass_admin_user.groups = []
+    hass_admin_user.mock_policy(
+        {"entities": {"entity_ids": {"light.permitted": True, "light.unwanted": True}}}
+    )
+    hass.states.async_set("light.permitted", "off")
+    hass.states.async_set("light.unwanted", "off")
+    hass.states.async_set("light.not_permitted", "off")
+
+    await websocket_client.send_json(
+        {
+            "id": 7,
+            "type": "subscribe_entities",
+            "entity_ids": ["light.permitted", "light.not_permitted"],
+        }
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    msg = await websocket_client.receive_json()
+    assert list(msg["event"]["a"]) == ["light.permitted"]
+
+    with patch.object(
+        hass_admin_user.permissions, "check_entity", return_value=True
+    ) as mock_check:
+        hass.states.async_set("light.not_permitted", "on")
+        hass.states.async_set("light.unwanted", "on")
+        hass.states.async_set("light.permitted", "on")
+        hass.states.async_set("light.permitted", "off")
+
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["c"]["light.permitted"]["+"]["s"] == "on"
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["c"]["light.permitted"]["+"]["s"] == "off"
+
+    # Permissions were already checked while sending the snapshot
+    assert not mock_check.called
+
+
 async def test_get_states_not_allows_nan(hass, websocket_client):
     """Test get_states command not allows NaN floats."""
     hass.states.async_set("greeting.hello", "world", {"hello": float("NaN")})
@@ -103,3 +103,74 @@ async def test_invalid_vol(hass, websocket_client):
     assert not msg["success"]
     assert msg["error"]["code"] == const.ERR_INVALID_FORMAT
     assert "expected str for dictionary value" in msg["error"]["message"]
+
+
+async def test_coalesce_messages(hass, websocket_client):
+    """Test pending messages are sent as one frame when supported."""
+    await websocket_client.send_json(
+        {
+            "id": 5,
+            "type": "supported_features",
+            "features": {const.FEATURE_COALESCE_MESSAGES: 1},
+        }
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    await websocket_client.send_json(
+        {"id": 6, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.bus.async_fire("test_event", {"idx": idx})
+
+    msg = await websocket_client.receive_json()
+    assert [message["event"]["data"]["idx"] for message in msg] == [0, 1, 2]
+
+
+async def test_superseded_state_messages(hass, websocket_client):
+    """Test pending state changes of an entity are replaced by newer ones."""
+    await websocket_client.send_json(
+        {
+            "id": 4,
+            "type": "supported_features",
+            "features": {const.FEATURE_SUPERSEDE_STATES: 1},
+        }
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    await websocket_client.send_json(
+        {"id": 5, "type": "subscribe_events", "event_type": "state_changed"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.states.async_set("light.kitchen", str(idx))
+    hass.states.async_set("light.living_room", "on")
+
+    msg = await websocket_client.receive_json()
+    assert msg["event"]["data"]["entity_id"] == "light.kitchen"
+    assert msg["event"]["data"]["new_state"]["state"] == "2"
+
+    msg = await websocket_client.receive_json()
+    assert msg["event"]["data"]["entity_id"] == "light.living_room"
+
+
+async def test_state_messages_not_superseded_by_default(hass, websocket_client):
+    """Test every state change is sent unless the client opts in."""
+    await websocket_client.send_json(
+        {"id": 5, "type": "subscribe_events", "event_type": "state_changed"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.states.async_set("light.kitchen", str(idx))
+
+    for idx in range(3):
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["data"]["new_state"]["state"] == str(idx)
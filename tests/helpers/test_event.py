@@ -11,6 +11,7 @@ from homeassistant.components import sun
 from homeassistant.const import MATCH_ALL
 import homeassistant.core as ha
 from homeassistant.core import callback
+from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.event import (
     async_call_later,
     async_track_point_in_time,
@@ -20,6 +21,7 @@ from homeassistant.helpers.event import (
     async_track_sunrise,
     async_track_sunset,
     async_track_template,
+    async_track_template_result,
     async_track_time_change,
     async_track_time_interval,
     async_track_utc_time_change,
@@ -86,6 +88,33 @@ async def test_track_point_in_time(hass):
     assert len(runs) == 2
 
 
+async def test_track_point_in_time_single_listener(hass):
+    """Test point in time trackers share one time changed listener."""
+    birthday_paulus = datetime(1986, 7, 9, 12, 0, 0, tzinfo=dt_util.UTC)
+    runs = []
+
+    unsubs = [
+        async_track_point_in_utc_time(
+            hass,
+            callback(lambda x, idx=idx: runs.append(idx)),
+            birthday_paulus + timedelta(seconds=idx),
+        )
+        for idx in range(100)
+    ]
+    assert hass.bus.async_listeners()[ha.EVENT_TIME_CHANGED] == 1
+
+    for unsub in unsubs[::2]:
+        unsub()
+
+    _send_time_changed(hass, birthday_paulus + timedelta(seconds=10))
+    await hass.async_block_till_done()
+    assert runs == [1, 3, 5, 7, 9]
+
+    _send_time_changed(hass, birthday_paulus + timedelta(seconds=200))
+    await hass.async_block_till_done()
+    assert runs == list(range(1, 100, 2))
+
+
 async def test_track_state_change(hass):
     """Test track_state_change."""
     # 2 lists to track how often our callbacks get called
@@ -165,6 +194,40 @@ async def test_track_state_change(hass):
     assert len(wildercard_runs) == 6
 
 
+async def test_track_state_change_indexed_by_entity_id(hass, caplog):
+    """Test state change trackers share one bus listener keyed by entity_id."""
+    runs = []
+
+    @ha.callback
+    def failing_callback(entity_id, old_state, new_state):
+        raise ValueError("Oops")
+
+    unsubs = [
+        async_track_state_change(
+            hass,
+            "light.bowl_{}".format(idx),
+            ha.callback(lambda entity_id, old, new: runs.append(entity_id)),
+        )
+        for idx in range(50)
+    ]
+    unsubs.append(async_track_state_change(hass, "light.bowl_1", failing_callback))
+    assert hass.bus.async_listeners()[ha.EVENT_STATE_CHANGED] == 1
+
+    hass.states.async_set("light.bowl_1", "on")
+    hass.states.async_set("light.other", "on")
+    await hass.async_block_till_done()
+    assert runs == ["light.bowl_1"]
+    assert "Error while processing state changed for light.bowl_1" in caplog.text
+
+    for unsub in unsubs:
+        unsub()
+    assert ha.EVENT_STATE_CHANGED not in hass.bus.async_listeners()
+
+    hass.states.async_set("light.bowl_1", "off")
+    await hass.async_block_till_done()
+    assert runs == ["light.bowl_1"]
+
+
 async def test_track_template(hass):
     """Test tracking template."""
     specific_runs = []
@@ -233,6 +296,217 @@ async def test_track_template(hass):
     assert len(wildercard_runs) == 2
 
 
+async def test_track_template_iterating_domain_short_pulse(hass):
+    """Test a template iterating a domain triggers on a short true pulse."""
+    runs = []
+
+    template = Template(
+        "{{ states.switch | selectattr('state', 'eq', 'on') | list | count > 0 }}",
+        hass,
+    )
+
+    @ha.callback
+    def run_callback(entity_id, old_state, new_state):
+        runs.append(new_state.state)
+
+    hass.states.async_set("switch.test", "off")
+    async_track_template(hass, template, run_callback)
+
+    hass.states.async_set("switch.test", "on")
+    hass.states.async_set("switch.test", "off")
+    await hass.async_block_till_done()
+    assert runs == ["on"]
+
+
+async def test_track_template_result(hass):
+    """Test tracking template results follows the accessed entities."""
+    results = []
+
+    template = Template(
+        "{% if is_state('switch.test', 'on') %}"
+        "{{ states('sensor.on') }}"
+        "{% else %}"
+        "{{ states('sensor.off') }}"
+        "{% endif %}",
+        hass,
+    )
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append((event.data["entity_id"], result))
+
+    hass.states.async_set("switch.test", "off")
+    unsub = async_track_template_result(hass, template, result_callback)
+
+    hass.states.async_set("sensor.on", "1")
+    hass.states.async_set("sensor.off", "2")
+    await hass.async_block_till_done()
+    assert results == [("sensor.off", "2")]
+
+    hass.states.async_set("switch.test", "on")
+    await hass.async_block_till_done()
+    assert results[-1] == ("switch.test", "1")
+
+    hass.states.async_set("sensor.off", "3")
+    hass.states.async_set("sensor.on", "4")
+    await hass.async_block_till_done()
+    assert results[-1] == ("sensor.on", "4")
+    assert len(results) == 3
+
+    unsub()
+    hass.states.async_set("sensor.on", "5")
+    await hass.async_block_till_done()
+    assert len(results) == 3
+
+
+async def test_track_template_result_no_states(hass):
+    """Test a template that accesses no states follows every state change."""
+    results = []
+
+    template = Template("{{ now() is not none }}", hass)
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append((event.data["entity_id"], result))
+
+    async_track_template_result(hass, template, result_callback)
+
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("switch.kitchen", "on")
+    await hass.async_block_till_done()
+    assert results == [("light.kitchen", "True"), ("switch.kitchen", "True")]
+
+
+async def test_track_template_result_domain(hass):
+    """Test tracking a domain follows entities being added and removed."""
+    results = []
+
+    template = Template("{{ states.light | count }}", hass)
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append(result)
+
+    async_track_template_result(hass, template, result_callback, rate_limit=0)
+
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("switch.kitchen", "on")
+    await hass.async_block_till_done()
+    assert results == ["1"]
+
+    hass.states.async_set("light.kitchen", "off")
+    await hass.async_block_till_done()
+    assert results == ["1"]
+
+    hass.states.async_remove("light.kitchen")
+    await hass.async_block_till_done()
+    assert results == ["1", "0"]
+
+
+async def test_track_template_result_iterating_fresh_states(hass):
+    """Test a tracker set up before any render sees the changed states."""
+    results = []
+
+    template = Template(
+        "{{ states.sensor | map(attribute='state') | join(',') }}", hass
+    )
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append(result)
+
+    hass.states.async_set("sensor.a", "1")
+    async_track_template_result(hass, template, result_callback, rate_limit=0)
+
+    hass.states.async_set("sensor.a", "2")
+    await hass.async_block_till_done()
+    assert results == ["2"]
+
+    hass.states.async_set("sensor.b", "3")
+    await hass.async_block_till_done()
+    assert results == ["2", "2,3"]
+
+
+async def test_track_template_result_all_states_rate_limit(hass):
+    """Test templates iterating all states are rendered at most every second."""
+    results = []
+
+    template = Template("{{ states | count }}", hass)
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append((event.data["entity_id"], result))
+
+    async_track_template_result(hass, template, result_callback)
+
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("switch.kitchen", "on")
+    await hass.async_block_till_done()
+    assert results == []
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2))
+    await hass.async_block_till_done()
+    assert results == [("switch.kitchen", "2")]
+
+    with patch(
+        "homeassistant.helpers.event.dt_util.utcnow",
+        return_value=dt_util.utcnow() + timedelta(seconds=4),
+    ):
+        hass.states.async_set("light.living_room", "on")
+        await hass.async_block_till_done()
+    assert results[-1] == ("light.living_room", "3")
+
+
+async def test_track_template_result_rate_limit(hass):
+    """Test a rate limit holds back renders and sends the last change."""
+    results = []
+
+    template = Template("{{ states('sensor.test') }}", hass)
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append(result)
+
+    async_track_template_result(hass, template, result_callback, rate_limit=5)
+
+    hass.states.async_set("sensor.test", "1")
+    hass.states.async_set("sensor.test", "2")
+    await hass.async_block_till_done()
+    assert results == []
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=3))
+    await hass.async_block_till_done()
+    assert results == []
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=6))
+    await hass.async_block_till_done()
+    assert results == ["2"]
+
+
+async def test_track_template_result_error(hass):
+    """Test render errors are passed to the action."""
+    results = []
+
+    template = Template(
+        "{% if is_state('sensor.test', 'bad') %}{{ states(keyword) }}{% endif %}", hass,
+    )
+
+    @ha.callback
+    def result_callback(event, result):
+        results.append(result)
+
+    async_track_template_result(hass, template, result_callback)
+
+    hass.states.async_set("sensor.test", "bad")
+    await hass.async_block_till_done()
+    assert len(results) == 1
+    assert isinstance(results[0], TemplateError)
+
+    hass.states.async_set("sensor.test", "good")
+    await hass.async_block_till_done()
+    assert results[-1] == ""
+
+
 async def test_track_same_state_simple_trigger(hass):
     """Test track_same_change with trigger simple."""
     thread_runs = []
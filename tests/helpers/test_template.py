@@ -1,8 +1,10 @@
 """Test Home Assistant template helper methods."""
 from datetime import datetime
+import gc
 import math
 import random
 from unittest.mock import patch
+import weakref
 
 import pytest
 import pytz
@@ -101,6 +103,38 @@ def test_invalid_template(hass):
         tmpl.async_render()
 
 
+def test_compile_cache(hass):
+    """Test templates with the same source share one compilation."""
+    source = "{{ states('sensor.compile_cache') | float * 2 }}"
+    hass.states.async_set("sensor.compile_cache", "21")
+
+    first = template.Template(source, hass)
+    second = template.Template(source, hass)
+    compile_cached = first._env.compile_cached
+    info = compile_cached.cache_info()
+    first.ensure_valid()
+    second.ensure_valid()
+
+    assert compile_cached.cache_info().misses == info.misses + 1
+    assert compile_cached.cache_info().hits == info.hits + 1
+    assert first._compiled_code is second._compiled_code
+    assert first.async_render() == second.async_render() == "42.0"
+
+
+def test_compile_cache_per_environment(hass):
+    """Test the compile cache does not keep the environment alive."""
+    source = "{{ 1 + 1 }}"
+    env = template.TemplateEnvironment(hass)
+    env.compile_cached(source)
+    env_ref = weakref.ref(env)
+
+    del env
+    gc.collect()
+
+    assert env_ref() is None
+    assert template.Template(source).render() == "2"
+
+
 def test_referring_states_by_entity_id(hass):
     """Test referring states by entity id."""
     hass.states.async_set("test.object", "happy")
@@ -151,6 +185,33 @@ def test_iterating_all_states(hass):
     )
 
 
+def test_iterating_states_shares_sorted_snapshot(hass):
+    """Test renders share the sorted states until a state changes."""
+    hass.states.async_set("sensor.b", "2")
+    hass.states.async_set("light.a", "1")
+    hass.states.async_set("sensor.a", "3")
+
+    all_states = list(template.AllStates(hass))
+    assert [state.entity_id for state in all_states] == [
+        "light.a",
+        "sensor.a",
+        "sensor.b",
+    ]
+    sensors = list(template.DomainStates(hass, "sensor"))
+    assert [state.state for state in sensors] == ["3", "2"]
+
+    assert list(template.AllStates(hass)) == all_states
+    assert list(template.AllStates(hass))[0] is all_states[0]
+    assert list(template.DomainStates(hass, "sensor"))[0] is sensors[0]
+
+    hass.states.async_set("sensor.a", "4")
+    assert [state.state for state in template.DomainStates(hass, "sensor")] == [
+        "4",
+        "2",
+    ]
+    assert list(template.AllStates(hass))[0] is not all_states[0]
+
+
 def test_iterating_domain_states(hass):
     """Test iterating domain states."""
     tmpl_str = "{% for state in states.sensor %}" "{{ state.state }}{% endfor %}"
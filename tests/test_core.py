@@ -3,6 +3,7 @@
 import asyncio
 from datetime import datetime, timedelta
 import functools
+import json
 import logging
 import os
 from tempfile import TemporaryDirectory
@@ -30,7 +31,11 @@ from homeassistant.const import (
     __version__,
 )
 import homeassistant.core as ha
-from homeassistant.exceptions import InvalidEntityFormatError, InvalidStateError
+from homeassistant.exceptions import (
+    HomeAssistantError,
+    InvalidEntityFormatError,
+    InvalidStateError,
+)
 import homeassistant.util.dt as dt_util
 from homeassistant.util.unit_system import METRIC_SYSTEM
 
@@ -44,12 +49,40 @@ def test_split_entity_id():
     assert ha.split_entity_id("domain.object_id") == ["domain", "object_id"]
 
 
+def test_async_add_job_creates_hass_job():
+    """Test that async_add_job classifies the target and delegates."""
+    hass = MagicMock()
+
+    def job():
+        pass
+
+    ha.HomeAssistant.async_add_job(hass, job)
+    assert len(hass.async_add_hass_job.mock_calls) == 1
+    hassjob = hass.async_add_hass_job.mock_calls[0][1][0]
+    assert hassjob.target is job
+    assert hassjob.job_type == ha.HassJobType.Executor
+
+
+def test_hass_job_type():
+    """Test that jobs are classified once when created."""
+
+    async def coro_func():
+        pass
+
+    assert ha.HassJob(ha.callback(lambda: None)).job_type == ha.HassJobType.Callback
+    assert (
+        ha.HassJob(functools.partial(coro_func)).job_type
+        == ha.HassJobType.Coroutinefunction
+    )
+    assert ha.HassJob(lambda: None).job_type == ha.HassJobType.Executor
+
+
 def test_async_add_job_schedule_callback():
     """Test that we schedule coroutines and add jobs to the job pool."""
     hass = MagicMock()
     job = MagicMock()
 
-    ha.HomeAssistant.async_add_job(hass, ha.callback(job))
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(ha.callback(job)))
     assert len(hass.loop.call_soon.mock_calls) == 1
     assert len(hass.loop.create_task.mock_calls) == 0
     assert len(hass.add_job.mock_calls) == 0
@@ -61,7 +94,7 @@ def test_async_add_job_schedule_partial_callback():
     job = MagicMock()
     partial = functools.partial(ha.callback(job))
 
-    ha.HomeAssistant.async_add_job(hass, partial)
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(partial))
     assert len(hass.loop.call_soon.mock_calls) == 1
     assert len(hass.loop.create_task.mock_calls) == 0
     assert len(hass.add_job.mock_calls) == 0
@@ -74,7 +107,7 @@ def test_async_add_job_schedule_coroutinefunction(loop):
     async def job():
         pass
 
-    ha.HomeAssistant.async_add_job(hass, job)
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(job))
     assert len(hass.loop.call_soon.mock_calls) == 0
     assert len(hass.loop.create_task.mock_calls) == 1
     assert len(hass.add_job.mock_calls) == 0
@@ -89,7 +122,7 @@ def test_async_add_job_schedule_partial_coroutinefunction(loop):
 
     partial = functools.partial(job)
 
-    ha.HomeAssistant.async_add_job(hass, partial)
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(partial))
     assert len(hass.loop.call_soon.mock_calls) == 0
     assert len(hass.loop.create_task.mock_calls) == 1
     assert len(hass.add_job.mock_calls) == 0
@@ -102,7 +135,7 @@ def test_async_add_job_add_threaded_job_to_pool():
     def job():
         pass
 
-    ha.HomeAssistant.async_add_job(hass, job)
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(job))
     assert len(hass.loop.call_soon.mock_calls) == 0
     assert len(hass.loop.create_task.mock_calls) == 0
     assert len(hass.loop.run_in_executor.mock_calls) == 1
@@ -147,6 +180,32 @@ def test_async_run_job_delegates_non_async():
     assert len(hass.async_add_job.mock_calls) == 1
 
 
+def test_async_run_hass_job_calls_callback():
+    """Test that a callback job is run right away."""
+    hass = MagicMock()
+    calls = []
+
+    def job():
+        calls.append(1)
+
+    ha.HomeAssistant.async_run_hass_job(hass, ha.HassJob(ha.callback(job)))
+    assert len(calls) == 1
+    assert len(hass.async_add_hass_job.mock_calls) == 0
+
+
+def test_async_run_hass_job_delegates_non_async():
+    """Test that a non callback job is added as a job."""
+    hass = MagicMock()
+    calls = []
+
+    def job():
+        calls.append(1)
+
+    ha.HomeAssistant.async_run_hass_job(hass, ha.HassJob(job))
+    assert len(calls) == 0
+    assert len(hass.async_add_hass_job.mock_calls) == 1
+
+
 def test_stage_shutdown():
     """Simulate a shutdown, test calling stuff."""
     hass = get_test_home_assistant()
@@ -324,6 +383,24 @@ class TestEvent(unittest.TestCase):
         }
         assert expected == event.as_dict()
 
+    def test_as_json(self):
+        """Test the JSON of an event is encoded once."""
+        now = dt_util.utcnow()
+        event = ha.Event("some_type", {"some": "attr"}, ha.EventOrigin.local, now)
+
+        as_json = event.as_json()
+        assert json.loads(as_json) == {
+            "event_type": "some_type",
+            "data": {"some": "attr"},
+            "origin": "LOCAL",
+            "time_fired": now.isoformat(),
+            "context": {"id": event.context.id, "parent_id": None, "user_id": None},
+        }
+
+        with patch.object(ha.Event, "as_dict") as mock_as_dict:
+            assert event.as_json() is as_json
+        assert not mock_as_dict.called
+
 
 class TestEventBus(unittest.TestCase):
     """Test EventBus methods."""
@@ -510,6 +587,46 @@ def test_state_dict_conversion():
     assert state == ha.State.from_dict(state.as_dict())
 
 
+def test_state_as_json():
+    """Test the JSON of a state is encoded once."""
+    state = ha.State("domain.hello", "world", {"some": "attr"})
+
+    as_json = state.as_json()
+    assert ha.State.from_dict(json.loads(as_json)) == state
+    assert state.as_json() is as_json
+
+
+def test_state_as_dict_cached():
+    """Test the dict of a state is only created once and read-only."""
+    state = ha.State("domain.hello", "world", {"some": "attr"})
+
+    as_dict = state.as_dict()
+    assert as_dict["attributes"] == {"some": "attr"}
+    assert state.as_dict() is as_dict
+
+    with pytest.raises(RuntimeError):
+        as_dict["state"] = "universe"
+
+    with pytest.raises(RuntimeError):
+        as_dict["attributes"]["some"] = "other"
+
+
+def test_state_reuses_read_only_attributes():
+    """Test the attributes of a previous state are reused as is."""
+    state = ha.State("domain.hello", "world", {"some": "attr"})
+    new_state = ha.State("domain.hello", "universe", state.attributes)
+
+    assert new_state.attributes is state.attributes
+
+
+def test_state_as_json_invalid():
+    """Test a state that cannot be serialized raises."""
+    state = ha.State("domain.hello", "world", {"some": float("nan")})
+
+    with pytest.raises(ValueError):
+        state.as_json()
+
+
 def test_state_dict_conversion_with_wrong_data():
     """Test conversion with wrong data."""
     assert ha.State.from_dict(None) is None
@@ -659,6 +776,36 @@ class TestStateMachine(unittest.TestCase):
         self.hass.block_till_done()
         assert 1 == len(events)
 
+    def test_version(self):
+        """Test the version changes when a state is set or removed."""
+        version = self.states.version
+
+        self.states.set("light.bowl", "on")
+        assert self.states.version == version
+
+        self.states.set("light.bowl", "off")
+        assert self.states.version == version + 1
+
+        assert self.states.remove("light.bowl")
+        assert self.states.version == version + 2
+
+        assert not self.states.remove("light.bowl")
+        assert self.states.version == version + 2
+
+    def test_set_same_attributes_reuses_mapping(self):
+        """Test unchanged attributes are shared with the old state."""
+        self.states.set("light.bowl", "on", {"brightness": 100})
+        old_state = self.states.get("light.bowl")
+
+        self.states.set("light.bowl", "off", {"brightness": 100})
+        new_state = self.states.get("light.bowl")
+
+        assert new_state.state == "off"
+        assert new_state.attributes is old_state.attributes
+
+        self.states.set("light.bowl", "off", {"brightness": 200})
+        assert self.states.get("light.bowl").attributes == {"brightness": 200}
+
 
 def test_service_call_repr():
     """Test ServiceCall repr."""
@@ -1181,3 +1328,106 @@ def test_context():
     assert c.user_id == 23
     assert c.parent_id == 100
     assert c.id is not None
+
+
+async def test_listener_run_immediately(hass, caplog):
+    """Test callback listeners can be run inside async_fire."""
+    calls = []
+
+    @ha.callback
+    def failing_listener(event):
+        """Raise an error."""
+        raise ValueError("boom")
+
+    @ha.callback
+    def listener(event):
+        """Record the event."""
+        calls.append(event)
+
+    hass.bus.async_listen("test_event", failing_listener, run_immediately=True)
+    unsub = hass.bus.async_listen("test_event", listener, run_immediately=True)
+
+    hass.bus.async_fire("test_event")
+    # Ran before the event loop got a chance to run anything
+    assert len(calls) == 1
+    assert "Error running listener" in caplog.text
+
+    timings = hass.bus.async_listener_timings()
+    assert len(timings) == 2
+    assert all(timing["calls"] == 1 for timing in timings)
+
+    unsub()
+    hass.bus.async_fire("test_event")
+    assert len(calls) == 1
+    assert len(hass.bus.async_listener_timings()) == 1
+
+
+async def test_listener_run_immediately_changes_listeners(hass):
+    """Test immediate listeners can add and remove listeners of the event."""
+    calls = []
+
+    @ha.callback
+    def first(event):
+        """Replace this listener with another one."""
+        calls.append("first")
+        unsub_first()
+        hass.bus.async_listen("test_event", third, run_immediately=True)
+
+    @ha.callback
+    def second(event):
+        """Record the call."""
+        calls.append("second")
+
+    @ha.callback
+    def third(event):
+        """Record the call."""
+        calls.append("third")
+
+    unsub_first = hass.bus.async_listen("test_event", first, run_immediately=True)
+    hass.bus.async_listen("test_event", second, run_immediately=True)
+
+    hass.bus.async_fire("test_event")
+    assert calls == ["first", "second"]
+
+    hass.bus.async_fire("test_event")
+    assert calls == ["first", "second", "second", "third"]
+
+
+async def test_listener_run_immediately_sets_state(hass):
+    """Test immediate listeners can write states while a state is written."""
+    changed = []
+
+    @ha.callback
+    def mirror(event):
+        """Copy the state of light.source to light.mirror."""
+        if event.data["entity_id"] == "light.source":
+            hass.states.async_set("light.mirror", event.data["new_state"].state)
+
+    @ha.callback
+    def record(event):
+        """Record the changed entity."""
+        changed.append(event.data["entity_id"])
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, mirror, run_immediately=True)
+    hass.bus.async_listen(EVENT_STATE_CHANGED, record, run_immediately=True)
+
+    hass.states.async_set("light.source", "on")
+
+    assert hass.states.get("light.mirror").state == "on"
+    # The nested write is dispatched before the rest of the outer one
+    assert changed == ["light.mirror", "light.source"]
+
+    hass.states.async_set("light.source", "off")
+
+    assert hass.states.get("light.mirror").state == "off"
+    assert changed == ["light.mirror", "light.source"] * 2
+
+
+async def test_listener_run_immediately_requires_callback(hass):
+    """Test only callbacks can be run inside async_fire."""
+
+    async def listener(event):
+        """Handle an event."""
+
+    with pytest.raises(HomeAssistantError):
+        hass.bus.async_listen("test_event", listener, run_immediately=True)
@@ -1,4 +1,7 @@
 """Test to verify that we can load components."""
+import json
+import os
+
 from asynctest.mock import ANY, patch
 import pytest
 
@@ -126,6 +129,62 @@ async def test_get_integration(hass):
     assert hue_light == integration.get_platform("light")
 
 
+async def test_get_integration_from_manifest_index(hass):
+    """Test resolving a built-in integration without reading its manifest."""
+    with patch(
+        "homeassistant.loader.async_get_custom_components", return_value={}
+    ), patch.object(loader.Integration, "resolve_from_root") as mock_resolve:
+        integration = await loader.async_get_integration(hass, "hue")
+
+    assert not mock_resolve.called
+    assert integration.name == "Philips Hue"
+    assert integration.config_flow is True
+    assert integration.pkg_path == "homeassistant.components.hue"
+    assert integration.file_path == loader.BUILTIN_PATH / "hue"
+    assert integration.get_component() == hue
+
+
+async def test_component_dependencies_from_manifest_index(hass):
+    """Test resolving dependencies does not read manifests from disk."""
+    with patch(
+        "homeassistant.loader.async_get_custom_components", return_value={}
+    ), patch.object(loader.Integration, "resolve_from_root") as mock_resolve:
+        deps = await loader.async_component_dependencies(hass, "automation")
+
+    assert not mock_resolve.called
+    assert {"automation", "group", "device_automation"} <= deps
+
+
+def test_load_manifest_index(tmp_path):
+    """Test manifests changed after generating the index are left out."""
+    # pylint: disable=protected-access
+    components_path = tmp_path / "components"
+    for domain in ("fresh", "outdated"):
+        (components_path / domain).mkdir(parents=True)
+        (components_path / domain / "manifest.json").write_text("{}")
+
+    index_path = tmp_path / "manifests.json"
+    index_path.write_text(
+        json.dumps(
+            {
+                "fresh": {"domain": "fresh"},
+                "outdated": {"domain": "outdated"},
+                "removed": {"domain": "removed"},
+            }
+        )
+    )
+    index_mtime = index_path.stat().st_mtime
+    os.utime(
+        str(components_path / "outdated" / "manifest.json"),
+        (index_mtime + 10, index_mtime + 10),
+    )
+
+    assert loader._load_manifest_index(index_path, components_path) == {
+        "fresh": {"domain": "fresh"}
+    }
+    assert loader._load_manifest_index(tmp_path / "missing.json", components_path) == {}
+
+
 async def test_get_integration_legacy(hass):
     """Test resolving integration."""
     integration = await loader.async_get_integration(hass, "test_embedded")
@@ -232,6 +232,15 @@ def test_get_random_string(mock_random):
     assert util.get_random_string(length=3) == "ABC"
 
 
+def test_random_uuid_hex():
+    """Test random uuid hex strings."""
+    with patch("random.getrandbits", return_value=255):
+        assert util.random_uuid_hex() == "0" * 30 + "ff"
+
+    assert len(util.random_uuid_hex()) == 32
+    assert util.random_uuid_hex() != util.random_uuid_hex()
+
+
 async def test_throttle_async():
     """Test Throttle decorator with async method."""
 